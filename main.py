@@ -1,6 +1,11 @@
+import argparse
+import random
+from pathlib import Path
+
 import arcade
 
 from src.gameview import GameView
+from src.res.replay import Recording
 
 # Constants
 WINDOW_WIDTH = 1280
@@ -10,13 +15,33 @@ WINDOW_TITLE = "Platformer"
 
 def main() -> None:
     """Main function."""
+    parser = argparse.ArgumentParser(description=WINDOW_TITLE)
+    parser.add_argument(
+        "--record",
+        type=Path,
+        default=None,
+        help="records the input in this file, to be replayed by src.simulation",
+    )
+    args = parser.parse_args()
+
+    recording = None
+    if args.record is not None:
+        recording = Recording(
+            GameView.FIRST_MAP,
+            GameView.TICK_RATE,
+            random.getrandbits(32),
+            GameView.ACTIVATION_RADIUS,
+        )
 
     # Create the (unique) Window, setup our GameView, and launch
     window = arcade.Window(WINDOW_WIDTH, WINDOW_HEIGHT, WINDOW_TITLE)
-    game_view = GameView()
+    game_view = GameView(recording)
     window.show_view(game_view)
     arcade.run()
 
+    if recording is not None:
+        recording.save(args.record)
+
 
 if __name__ == "__main__":
     main()
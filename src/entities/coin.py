@@ -1,3 +1,4 @@
+import functools
 from typing import Any
 
 import arcade
@@ -7,27 +8,27 @@ from src.res.map import Map
 
 
 class Coin(GameObject):
-    """Generic coin object. Currently only self destroys."""
+    """Generic coin object. Currently only self destroys, once picked up
+    by the player (see Player#update)."""
 
-    coin_sound: arcade.Sound
-    """Sound for when collecting a coin.
-    """
+    # Picked up by the player at every tick : nothing else to update often
+    update_rate = 10
+
+    @classmethod
+    @functools.cache
+    def coin_sound(cls) -> arcade.Sound:
+        """Sound for when collecting a coin, loaded on its first use (not
+        when importing), once for all the coins."""
+        return arcade.Sound(":resources:sounds/coin1.wav")
 
     def __init__(self, map: list[Map], **kwargs: Any) -> None:
         super().__init__(map, 1.0, ":resources:/images/items/coinGold.png", **kwargs)
-        self.coin_sound = arcade.Sound(":resources:sounds/coin1.wav")
-
-    def update(self, delta_time: float = 1 / 60, *args: Any, **kwargs: Any) -> None:
-        super().update(delta_time, **kwargs)
-
-        if arcade.check_for_collision(self.map.player, self):
-            self.damage(None, DamageSource.PLAYER, 10)
 
     def _on_damage(self, other: GameObject | None, source: DamageSource) -> bool:
         return source in {DamageSource.PLAYER}
 
     def destroy(self, is_health_death: bool = False) -> None:
         if is_health_death:
-            arcade.play_sound(self.coin_sound)
+            arcade.play_sound(self.coin_sound())
             self.game_view.score += 1
         super().destroy()
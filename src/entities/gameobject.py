@@ -1,14 +1,13 @@
 from __future__ import annotations
 
 import enum
-from typing import Any
+from typing import Any, Callable, ClassVar, Self, cast
 
 import arcade
+from arcade.camera import Projector
 from arcade.types import PathOrTexture, Point2
 
-from src.gameview import GameView
-from src.res.camera import BetterCamera
-from src.res.map import Map
+from src.res.map import Game, Layer, Map
 
 
 class DamageSource(enum.Enum):
@@ -26,6 +25,10 @@ class DamageSource(enum.Enum):
 
 DEFAULT_INVULNERABILITY_TIME = 0.5
 
+POOL_CAPACITY = 1024
+"""The maximum number of released objects kept by the pool of a class.
+"""
+
 
 class GameObject(arcade.Sprite):
     """The GameObject superclass. Ideally should not
@@ -37,7 +40,7 @@ class GameObject(arcade.Sprite):
     for having a reference to it
     """
 
-    event_listener: bool
+    __event_listener: bool
     """Whether this game object should be called for windows events
     """
 
@@ -48,6 +51,114 @@ class GameObject(arcade.Sprite):
 
     invulnerability_time: float
 
+    layer: Layer = Layer.INTERACTABLES
+    """The collision layer of the object, see Map#check_for_collisions_all.
+    Physics objects are always in the terrain layer. Can be set per class
+    or per object, before the object is added to the map.
+    """
+
+    update_rate: float | None = None
+    """How many times per second the object is updated, None for every
+    tick of the map. Objects having a rate are given the time elapsed since
+    their last update, and may be deferred when a frame runs over (see
+    UpdateScheduler). Can be set per class or per object.
+    """
+
+    reset: Callable[..., None]
+    """Reset hook of the pooled classes, puts a released object back in the
+    state of a freshly constructed one. Takes the same arguments as the
+    constructor, and calls GameObject#_reset_state. Only defined by the
+    pooled classes (or their parents), see GameObject#acquire.
+    """
+
+    __pools: ClassVar[dict[type[GameObject], list[GameObject]]] = {}
+    """The released objects of every pooled class, see GameObject#acquire
+    """
+    __released: bool
+    """Whether the object is currently in the pool of its class
+    """
+
+    def __init_subclass__(cls, pooled: bool = False, **kwargs: Any) -> None:
+        """Registers a subclass, giving it its own pool if it opts in
+        with `class MyObject(GameObject, pooled=True)`. Pooling is not
+        inherited : each pooled class must implement (or inherit)
+        GameObject#reset.
+
+        Args:
+            pooled (bool, optional): Whether destroyed objects of the class are reused. Defaults to False.
+
+        Raises:
+            TypeError: The class is pooled but has no GameObject#reset
+        """
+        super().__init_subclass__(**kwargs)
+        if pooled:
+            if not hasattr(cls, "reset"):
+                raise TypeError(f"{cls.__name__} is pooled but does not define reset")
+            GameObject.__pools[cls] = []
+
+    @classmethod
+    def acquire(cls, map: list[Map], *args: Any, **kwargs: Any) -> Self:
+        """Gives an object of the class, taking a released one from its pool
+        (see GameObject#reset) if the class is pooled, constructing a new one
+        otherwise. Takes the same arguments as the constructor.
+
+        Args:
+            map (list[Map]): The map where the object is registered
+
+        Returns:
+            Self: The object, still to be added to the map
+        """
+        pool = GameObject.__pools.get(cls)
+        if not pool:
+            return cls(map, *args, **kwargs)
+
+        object = cast(Self, pool.pop())
+        object.__released = False
+        object.reset(map, *args, **kwargs)
+        return object
+
+    def _reset_state(
+        self,
+        map: list[Map],
+        scale: Point2 | float = 1,
+        center_x: float = 0,
+        center_y: float = 0,
+    ) -> None:
+        """Resets the state shared by all gameobjects, see GameObject#reset.
+
+        Args:
+            map (list[Map]): The map where the object is registered
+            scale (Point2 | float, optional): The scale of the sprite. Defaults to 1.
+            center_x (float, optional): The position of the sprite, in x. Defaults to 0.
+            center_y (float, optional): The position of the sprite, in y. Defaults to 0.
+        """
+        self.__map_ref = map
+        self.health_points = self.max_hp
+        self.invulnerability_time = 0.0
+        self.velocity = (0, 0)
+        self.angle = 0
+        self.visible = True
+        self.scale = scale
+        self.position = (center_x, center_y)
+
+    def on_release(self) -> None:
+        """Release hook, called when the object goes back to the pool of
+        its class. References to other objects should be dropped there.
+        """
+        pass
+
+    def release(self) -> None:
+        """Gives the object back to the pool of its class, once removed
+        from the map. Does nothing if the class is not pooled.
+        """
+        pool = GameObject.__pools.get(type(self))
+        if pool is None or self.__released or len(pool) >= POOL_CAPACITY:
+            return
+
+        self.__released = True
+        self.on_release()
+        pool.append(self)
+
     @property
     def map(self) -> Map:
         """Returns the map where the object is registered
@@ -58,25 +169,62 @@ class GameObject(arcade.Sprite):
         return self.__map_ref[0]
 
     @property
-    def game_view(self) -> GameView:
+    def game_view(self) -> Game:
         """Returns the game view where the map is currently drawn onto.
 
         Returns:
-            GameView: The game view in question
+            Game: The game view (or simulation) in question
         """
 
         return self.map.game_view
 
     @property
-    def camera(self) -> BetterCamera:
-        """Returns the game view where the map is currently drawn onto.
+    def camera(self) -> Projector:
+        """Returns the camera of the game view where the map is currently drawn onto.
 
         Returns:
-            GameView: The game view in question
+            Projector: The camera in question
         """
 
         return self.map.game_view.camera
 
+    @property
+    def event_listener(self) -> bool:
+        """Whether this game object should be called for windows events.
+        It is then only called for the events whose handler it overrides,
+        see Map#listeners.
+
+        Returns:
+            bool: True if the object listens to windows events
+        """
+        return self.__event_listener
+
+    @event_listener.setter
+    def event_listener(self, value: bool) -> None:
+        if value != self.__event_listener:
+            self.__event_listener = value
+            self.map.update_listener(self)
+
+    @property
+    def is_destroyed(self) -> bool:
+        """Whether the object was destroyed, see Map#destroy.
+
+        Returns:
+            bool: True if the object is no longer part of the map
+        """
+        return self.map.is_destroyed(self)
+
+    @property
+    def is_static(self) -> bool:
+        """Whether the object never moves on its own. Only relevant for
+        physics objects : static ones are walls for the physics engine and
+        are never updated, the others are moving platforms.
+
+        Returns:
+            bool: True if the object never moves
+        """
+        return True
+
     def __init__(
         self,
         map: list[Map],
@@ -97,10 +245,11 @@ class GameObject(arcade.Sprite):
         """
         super().__init__(path_or_texture, scale, center_x, center_y)
         self.__map_ref = map
-        self.event_listener = False
+        self.__event_listener = False
         self.health_points = max_hp
         self.max_hp = max_hp
         self.invulnerability_time = 0.0
+        self.__released = False
 
     def _on_damage(self, other: GameObject | None, source: DamageSource) -> bool:
         """On damage event - General Event
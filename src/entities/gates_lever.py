@@ -1,11 +1,12 @@
+import itertools
 from typing import Any
 
 import arcade
 
 from src.entities.gameobject import DamageSource, GameObject
 from src.entities.wall import MovingPlatform
-from src.res.array2d import Array2D
-from src.res.map import Map
+from src.res.array2d import PathGroups, Position
+from src.res.map import Layer, Map
 
 LEVER_ON = ":resources:/images/tiles/leverRight.png"
 
@@ -20,7 +21,7 @@ class Gate(GameObject):
     """Whether the gate is opened or not
     """
 
-    data: GateData | None
+    data: GateData
     """Internal metadata of the gate
     """
 
@@ -39,25 +40,9 @@ class Gate(GameObject):
         )
 
         # If not specified, the door is closed, shown
-        self.isOpen = False
-        self.visible = True
-
-        self.data = None
-
-        for gate in meta.gates or []:
-            if gate.x == pos[0] and gate.y == pos[1]:
-                if gate.state == GateData.State.open:
-                    self.isOpen = True
-                    self.visible = False
-                self.data = gate
-                break
-
-        if self.data is None:
-            self.data = GateData()
-
-            self.data.x = pos[0]
-            self.data.y = pos[1]
-            self.data.state = GateData.State.closed
+        self.data = meta.gates.get(pos) or GateData(pos[0], pos[1])
+        self.isOpen = self.data.state == GateData.State.open
+        self.visible = not self.isOpen
 
     def update_gate(self, open: bool) -> None:
         """Updates the gate with open or closed
@@ -77,6 +62,8 @@ class Gate(GameObject):
 class Switch(MovingPlatform):
     """The switch oobject"""
 
+    layer = Layer.INTERACTABLES
+
     data: SwitchData
     """The switch metadata
     """
@@ -86,35 +73,35 @@ class Switch(MovingPlatform):
     isDisabled: bool
     """Whether the switch is disabled
     """
+    gates: dict[Position, Gate]
+    """The gates targeted by the actions of the switch, by position,
+    linked once the map is built (see Switch#link)
+    """
 
     def __init__(
         self,
         map: list[Map],
         meta: Map.Metadata,
-        data: Array2D[str],
+        groups: PathGroups,
         pos: tuple[int, int],
         **kwargs: Any,
     ) -> None:
-        super().__init__(map, "^", data, pos, **kwargs)
+        super().__init__(map, "^", groups, pos, **kwargs)
         self.isOn = False
         self.isDisabled = False
+        self.gates = {}
         self.append_texture(arcade.load_texture(LEVER_ON))
+        # Only moving switches have to follow their group every tick
+        self.update_rate = 5 if self.is_static else None
 
-        for switch in meta.switches or []:
-            if switch.x == pos[0] and switch.y == pos[1]:
-                self.data = switch
-                break
-
-        if self.data is None:
+        data = meta.switches.get(pos)
+        if data is None:
             raise ValueError(
                 f"Switch at position x:'{pos[0]}', y: '{pos[1]}' is not defined in the header !"
             )
+        self.data = data
 
-        if not hasattr(self.data, "state"):
-            self.data.state = SwitchData.State.off
-            return
-
-        if self.data.state == SwitchData.State.on or self.data.state:
+        if self.data.state == SwitchData.State.on:
             self.isOn = True
             self.set_texture(1)
 
@@ -146,13 +133,25 @@ class Switch(MovingPlatform):
             case ActionKind.disable:
                 self.isDisabled = True
 
+    def link(self) -> None:
+        """Links the switch to the gates targeted by its actions, once all
+        the gates of the map are created. The targets were checked when
+        parsing the map."""
+        self.gates = {}
+        for action in itertools.chain(self.data.switch_on, self.data.switch_off):
+            self.gate_from_action(action)
+
     def gate_from_action(self, action: SwitchData.Action) -> Gate | None:
-        """Fetch the gate from a specified action"""
-        for obj in self.map.game_objects:
-            if isinstance(obj, Gate) and obj.data is not None:
-                if obj.data.x == action.x and obj.data.y == action.y:
-                    return obj
-        return None
+        """Fetch the gate from a specified action, linked to the switch"""
+        if action.x is None or action.y is None:
+            return None
+        cell = (action.x, action.y)
+        gate = self.gates.get(cell)
+        if gate is None or gate.is_destroyed:  # Not linked yet, or hot reloaded
+            gate = self.map.object_at_cell(cell, Gate)
+            if gate is not None:
+                self.gates[cell] = gate
+        return gate
 
     def on_switch_change(self) -> None:
         """On switch change event handler"""
@@ -162,9 +161,5 @@ class Switch(MovingPlatform):
         self.set_texture(0 if self.isOn else 1)
         self.isOn = not self.isOn
 
-        if self.isOn and hasattr(self.data, "switch_on"):
-            for action in self.data.switch_on or []:
-                self.do_switch_action(action)
-        elif not self.isOn and hasattr(self.data, "switch_off"):
-            for action in self.data.switch_off or []:
-                self.do_switch_action(action)
+        for action in self.data.switch_on if self.isOn else self.data.switch_off:
+            self.do_switch_action(action)
@@ -1,12 +1,12 @@
+import functools
 import math as m
-import random
 from enum import Enum, auto
 from typing import Any, Final
 
 import arcade
 
 from src.entities.gameobject import DamageSource, GameObject
-from src.res.map import Map
+from src.res.map import Layer, Map
 
 
 class Dir(
@@ -25,11 +25,16 @@ class Dir(
 
 
 class Monster(GameObject):
+    layer = Layer.ENEMIES
     direction: int
-    gameover_sound: arcade.Sound
     __base_damage: float
-    """Sound for when player touches the slime
-    """
+
+    # Loaded on its first use (not when importing), and shared by all the monsters
+    @classmethod
+    @functools.cache
+    def gameover_sound(cls) -> arcade.Sound:
+        """Sound for when player touches the slime"""
+        return arcade.Sound(":resources:sounds/gameover1.wav")
 
     def __init__(
         self,
@@ -68,13 +73,8 @@ class Monster(GameObject):
             case _:
                 # pas encore implémenté (pas de besoin pour le moment)
                 return False
-        return (
-            len(
-                arcade.check_for_collision_with_list(
-                    circle, self.map.physics_colliders_list
-                )
-            )
-            != 0
+        return self.map.collides_with_any(
+            circle, Layer.TERRAIN
         )  # return true if there is at least one collider in collision with the little circle, false otherwise
 
     # if monstey hit something hurtful that belong to the player, monstey suffers (i.e. loses hp)
@@ -83,7 +83,7 @@ class Monster(GameObject):
 
     def update(self, delta_time: float = 1 / 60, *args: Any, **kwargs: Any) -> None:
         for object in self.map.check_for_collisions_all(
-            self
+            self, Layer.PLAYER
         ):  # if monstey touches player, player suffer (i.e. loses HP)
             object.damage(self, DamageSource.MONSTER, self.__base_damage)
 
@@ -91,16 +91,13 @@ class Monster(GameObject):
 
 
 class Slime(Monster):
+    # Updated every tick : its ground probing moves a pixel at a time
     direction: int
-    gameover_sound: arcade.Sound
-    """Sound for when player touches the slime
-    """
 
     def __init__(self, map: list[Map], **kwargs: Any) -> None:
         super().__init__(
             ":resources:/images/enemies/slimeBlue.png", 150, 10, map, **kwargs
         )
-        self.gameover_sound = arcade.Sound(":resources:sounds/gameover1.wav")
         self.change_x = -1
         self.direction = -1
 
@@ -139,13 +136,10 @@ class Slime(Monster):
 
 
 class Bat(Monster):
-    gameover_sound: arcade.Sound
-    """Sound for when player touches the slime
-    """
+    update_rate = 30
 
     def __init__(self, map: list[Map], **kwargs: Any) -> None:
         super().__init__("assets/bat.png", 50, 25, map, **kwargs)
-        self.gameover_sound = arcade.Sound(":resources:sounds/gameover1.wav")
         self.v_ro: float = 1
         self.v_phi: float = m.pi
         self.radius_movement: int = 150
@@ -186,7 +180,9 @@ class Bat(Monster):
         return start_dis <= self.radius_movement
 
     def update(self, delta_time: float = 1 / 60, *args: Any, **kwargs: Any) -> None:
-        variation_angle: float = random.randint(-10, 10) * m.pi / 2 * delta_time
+        variation_angle: float = (
+            self.map.random.randint(-10, 10) * m.pi / 2 * delta_time
+        )
         # the bat changes angle  by a random angle between -pi/12 and pi/12, by steps of pi/120 (when delta_time = 1/60)
         self.v_phi += variation_angle
         if not self.canmove(delta_time):
@@ -211,14 +207,7 @@ class DarkBat(Bat):
             self.center_y + self.dir[1] * delta_time,
         )
         # check if the future position of the bat will bring it into at least one collider
-        isok: bool = (
-            len(
-                arcade.check_for_collision_with_list(
-                    self, self.map.physics_colliders_list
-                )
-            )
-            == 0
-        )
+        isok: bool = not self.map.collides_with_any(self, Layer.TERRAIN)
         self.pos = old_pos
         return isok
 
@@ -1,17 +1,19 @@
+import functools
 import math
 from abc import abstractmethod
 from typing import Any, Final
 
 import arcade
 
+from src.entities.coin import Coin
 from src.entities.gameobject import DamageSource, GameObject
-from src.res.map import Map
+from src.res.map import Layer, Map
 
 PLAYER_MOVEMENT_SPEED: int = 3
-"""Lateral speed of the player, in pixels per frame."""
+"""Lateral speed of the player, in pixels per 1/60 second."""
 
 PLAYER_JUMP_SPEED = 12
-"""Instant vertical speed for jumping, in pixels per frame."""
+"""Instant vertical speed for jumping, in pixels per 1/60 second."""
 
 WEAPON_SCALE = 0.5 * 0.7
 """Weapon scale in world.
@@ -45,6 +47,8 @@ ARROW_DAMAGE = 25
 class Weapon(GameObject):
     """Class to have a general framework for adding weapons"""
 
+    layer = Layer.PLAYER
+
     __scale_factor: float
     """The scale factor of the sprite (aka. how far it is)
     """
@@ -81,6 +85,12 @@ class Weapon(GameObject):
         self.__negative_angle = negative_angle
         self.dir = arcade.Vec2(0, 0)
 
+    def reset(self, map: list[Map], *args: Any, **kwargs: Any) -> None:
+        self._reset_state(map, **kwargs)
+        self.scale = (WEAPON_SCALE, WEAPON_SCALE)
+        self.visible = False
+        self.dir = arcade.Vec2(0, 0)
+
     def update(self, delta_time: float = 1 / 60, *args: Any, **kwargs: Any) -> None:
         super().update(delta_time, *args, **kwargs)
 
@@ -138,19 +148,21 @@ class Weapon(GameObject):
         """
         match current_weapon.__class__.__name__:
             case "Sword":
-                return Bow([current_weapon.map])
+                return Bow.acquire([current_weapon.map])
             case "Bow":
-                return Sword([current_weapon.map])
+                return Sword.acquire([current_weapon.map])
             case _:
                 raise ValueError("Invalid weapon !")
 
 
-class Bow(Weapon):
+class Bow(Weapon, pooled=True):
     """The bow weapon class"""
 
-    class Arrow(GameObject):
+    class Arrow(GameObject, pooled=True):
         """The internal arrow gameobject that is shot from the bow"""
 
+        layer = Layer.PROJECTILES
+
         time_to_live: float
         """The time left to live of the arrow
         """
@@ -167,6 +179,22 @@ class Bow(Weapon):
             and the direction as a vec2"""
 
             super().__init__(map, float("inf"), "assets/arrow.png", **kwargs)
+            self.__shoot(bow_position, bow_angle, dir)
+
+        def reset(
+            self,
+            map: list[Map],
+            bow_position: arcade.types.Point2,
+            bow_angle: float,
+            dir: arcade.Vec2,
+            **kwargs: Any,
+        ) -> None:
+            self._reset_state(map, **kwargs)
+            self.__shoot(bow_position, bow_angle, dir)
+
+        def __shoot(
+            self, bow_position: arcade.types.Point2, bow_angle: float, dir: arcade.Vec2
+        ) -> None:
             self.scale = (WEAPON_SCALE, WEAPON_SCALE)
             self.position = bow_position
             self.radians = bow_angle + (math.pi / 2)
@@ -181,14 +209,12 @@ class Bow(Weapon):
             if self.time_to_live <= 0:  # Destroys the arrow
                 self.destroy()
 
-            objects = self.map.check_for_collisions_all(self)
-
-            filtered = [
-                ob
-                for ob in objects
-                if ob.__class__.__name__ not in ["Bow", "Player", "Arrow"]
-                and ob.visible
-            ]  # Ignore collisions with the bow, player or other arrows
+            # Ignore collisions with the player, its weapon or other arrows
+            filtered = self.map.check_for_collisions_all(
+                self,
+                Layer.ALL & ~(Layer.PLAYER | Layer.PROJECTILES),
+                lambda ob: ob.visible,
+            )
 
             if len(filtered) == 0:  # Free arroooooww
                 self.change_y -= ARROW_SPEED * delta_time
@@ -225,12 +251,19 @@ class Bow(Weapon):
         self.spawn_next_tick = False
         self.last_shot = 0
 
+    def reset(self, map: list[Map], *args: Any, **kwargs: Any) -> None:
+        super().reset(map, **kwargs)
+        self.spawn_next_tick = False
+        self.last_shot = 0
+
     def update(self, delta_time: float = 1 / 60, *args: Any, **kwargs: Any) -> None:
         super().update(delta_time, *args, **kwargs)
         self.last_shot -= delta_time
 
         if self.spawn_next_tick:
-            arrow = self.Arrow([self.map], self.position, self.radians, self.dir)
+            arrow = self.Arrow.acquire(
+                [self.map], self.position, self.radians, self.dir
+            )
 
             self.map.add_objects([arrow])
 
@@ -253,7 +286,7 @@ class Bow(Weapon):
         super().destroy()
 
 
-class Sword(Weapon):
+class Sword(Weapon, pooled=True):
     """The sword weapon"""
 
     def __init__(self, map: list[Map], **kwargs: Any) -> None:
@@ -272,7 +305,9 @@ class Sword(Weapon):
         if not self.visible:
             return
 
-        for hits in self.map.check_for_collisions_all(self):
+        for hits in self.map.check_for_collisions_all(
+            self, Layer.ENEMIES | Layer.INTERACTABLES
+        ):
             hits.damage(self, DamageSource.PLAYER, SWORD_DOT_DAMAGE)
 
     SWORD_UI_TEXTURE = arcade.load_texture("assets/sword_silver.png")
@@ -281,24 +316,16 @@ class Sword(Weapon):
         return self.SWORD_UI_TEXTURE
 
 
-class Player(GameObject):
+class Player(GameObject, pooled=True):
     """The main player game object."""
 
+    layer = Layer.PLAYER
+
     is_move_initiated: tuple[bool, bool]
     """Whether the move was initiated (the key was pressed)
     on a frame where the player was present. First element is
     for left, second for right.
     """
-    gameover_sound: arcade.Sound
-    """Sound for when player touches lava
-    """
-
-    hurt_sound: arcade.Sound
-
-    jump_sound: arcade.Sound
-    """SFX for when the player is jumping.
-    """
-
     weapon: Weapon
     """GameObject of the weapon the player is using.
     """
@@ -314,6 +341,25 @@ class Player(GameObject):
     """The knockback the player takes when hit, a list to modify it without being able to change its length
     """
 
+    # The sounds are loaded on their first use (not when importing), once
+    # for all the players (respawns)
+    @classmethod
+    @functools.cache
+    def gameover_sound(cls) -> arcade.Sound:
+        """Sound for when player touches lava"""
+        return arcade.Sound(":resources:sounds/gameover1.wav")
+
+    @classmethod
+    @functools.cache
+    def hurt_sound(cls) -> arcade.Sound:
+        return arcade.Sound(":resources:/sounds/hurt3.wav")
+
+    @classmethod
+    @functools.cache
+    def jump_sound(cls) -> arcade.Sound:
+        """SFX for when the player is jumping."""
+        return arcade.Sound(":resources:sounds/jump1.wav")
+
     def __init__(self, map: list[Map], **kwargs: Any) -> None:
         """Initializes the player tl;dr see GameObject#__init__"""
 
@@ -324,6 +370,15 @@ class Player(GameObject):
             **kwargs,
         )
 
+        self.__knockback = [0, 0]
+        self.__init_state()
+
+    def reset(self, map: list[Map], *args: Any, **kwargs: Any) -> None:
+        self._reset_state(map, **kwargs)
+        self.__init_state()
+
+    def __init_state(self) -> None:
+        """Initializes the state of a new (or respawned) player."""
         # Ugly bug where arcade didn't register on my laptop
         # when a key was pressed on specific frames but registered
         # the release when the map was just reloaded.
@@ -333,15 +388,12 @@ class Player(GameObject):
         # the currently pressed keys! Yay.
         self.is_move_initiated = (False, False)
 
-        self.jump_sound = arcade.Sound(":resources:sounds/jump1.wav")
-        self.gameover_sound = arcade.Sound(":resources:sounds/gameover1.wav")
         self.event_listener = True
-        self.weapon = Sword(map)
-        self.hurt_sound = arcade.Sound(":resources:/sounds/hurt3.wav")
+        self.weapon = Sword.acquire([self.map])
 
         self.__buffered_jump_timer = 0
         self.__coyote_timer = 0
-        self.__knockback = [0, 0]
+        self.__knockback[:] = [0, 0]
 
         self.map.add_objects([self.weapon])
 
@@ -376,7 +428,7 @@ class Player(GameObject):
     def _on_damage(self, other: GameObject | None, source: DamageSource) -> bool:
         damaged = source in {DamageSource.LAVA, DamageSource.VOID, DamageSource.MONSTER}
         if damaged:
-            arcade.play_sound(self.hurt_sound)
+            arcade.play_sound(self.hurt_sound())
         if source == DamageSource.MONSTER and other is not None:
             knockback: arcade.Vec2 = arcade.Vec2(
                 self.center_x - other.center_x, self.center_y - other.center_y
@@ -390,8 +442,10 @@ class Player(GameObject):
         """applies the knockback to the player"""
         self.center_x += self.__knockback[0] * delta_time
         self.center_y += self.__knockback[1] * delta_time
+        # Damped by 0.7 every 1/60 second, whatever the tick
+        damping = 0.7 ** (delta_time * 60)
         for i in range(len(self.__knockback)):
-            self.__knockback[i] *= 0.7
+            self.__knockback[i] *= damping
             if abs(self.__knockback[i]) < 0.01:
                 self.__knockback[i] = 0
 
@@ -403,6 +457,13 @@ class Player(GameObject):
         if self.center_y < -500:
             self.damage(None, DamageSource.VOID, float("inf"))
 
+        # From the side of the player, at every tick : the coins are updated
+        # rarely, and a falling player would go through them between updates
+        for coin in self.map.check_for_collisions_all(
+            self, Layer.INTERACTABLES, lambda object: isinstance(object, Coin)
+        ):
+            coin.damage(self, DamageSource.PLAYER, 10)
+
         on_ground = self.map.physics_engine.can_jump()
 
         if on_ground:  # Reset coyote-timer
@@ -415,15 +476,16 @@ class Player(GameObject):
             on_ground and self.__buffered_jump_timer > 0
         ):  # A jump was buffered and we're considered on ground
             self.change_y = PLAYER_JUMP_SPEED
-            arcade.play_sound(self.jump_sound)
+            arcade.play_sound(self.jump_sound())
             self.__buffered_jump_timer = 0
         elif self.__buffered_jump_timer > 0:
             self.__buffered_jump_timer -= delta_time
 
     def destroy(self, is_health_death: bool = False) -> None:
         if is_health_death:
-            arcade.play_sound(self.gameover_sound)
+            arcade.play_sound(self.gameover_sound())
             self.game_view.score = 0
+            self.map.deaths += 1
             self.map.respawn_player()
         else:
             self.weapon.destroy()
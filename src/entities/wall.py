@@ -1,10 +1,12 @@
+from __future__ import annotations
+
 from typing import Any
 
 import arcade
 
 from src.entities.gameobject import DamageSource, GameObject
-from src.res.array2d import Array2D, Path
-from src.res.map import Map
+from src.res.array2d import Path, PathGroups, Trajectory
+from src.res.map import Layer, Map
 
 CHAR_INFO: dict[str, str] = {
     "=": ":resources:/images/tiles/grassMid.png",
@@ -19,53 +21,152 @@ representations.
 """
 
 
-class MovingPlatform(GameObject):
+class PlatformGroup:
+    """A group of blocks moving together along the same trajectory. The
+    movement is computed once per tick for the whole group (see Map#update),
+    then given to every physics block of the group as its velocity, so that
+    the physics engine carries the player along. The other blocks (lava,
+    exits, switches) are placed directly.
+
+    The position of the group is a function of time only (see
+    Trajectory#offset_at) : it can be evaluated, or jumped to, at any time.
+    """
+
+    trajectory: Trajectory
+    """The trajectory shared by the blocks of the group
+    """
+    members: list[MovingPlatform]
+    """The blocks of the group
+    """
+    time: float
+    """The time since the group started moving, a block
+    moving by one cell per second
+    """
+
+    __cell_size: tuple[int, int]
+    """The size of a cell, in pixels
+    """
+
+    def __init__(self, map: Map, trajectory: Trajectory) -> None:
+        """Creates a group without any block.
+
+        Args:
+            map (Map): The map of the group
+            trajectory (Trajectory): The trajectory of the group
+        """
+        self.trajectory = trajectory
+        self.members = []
+        self.time = 0
+        self.__cell_size = map.map_to_world((1, 1))
+
+    def offset_at(self, time: float) -> tuple[float, float]:
+        """Gives the offset of the group (from the initial positions of
+        its blocks) at any time, without simulating the time before.
+
+        Args:
+            time (float): The time since the group started moving
+
+        Returns:
+            tuple[float, float]: The offset, in pixels
+        """
+        x, y = self.trajectory.offset_at(time)
+        return (x * self.__cell_size[0], y * self.__cell_size[1])
+
+    def seek(self, time: float) -> None:
+        """Jumps to a time, the blocks joining their positions at that time
+        on the next update.
+
+        Args:
+            time (float): The time since the group started moving
+        """
+        self.time = time
+
+    def update(self, delta_time: float = 1 / 60) -> None:
+        """Moves the group for one tick.
+
+        Args:
+            delta_time (float, optional): The time of the tick. Defaults to 1 / 60.
+        """
+        self.time += delta_time
+        x, y = self.offset_at(self.time)
+
+        for member in self.members:
+            if member.layer != Layer.TERRAIN:
+                # Not moved by the physics engine
+                member.position = (member.origin[0] + x, member.origin[1] + y)
+                continue
+            # Relative to where each block actually is : a block behind (seek,
+            # joined late, ...) catches up in one tick
+            member.change_x = member.origin[0] + x - member.center_x
+            member.change_y = member.origin[1] + y - member.center_y
+
+
+class MovingPlatform(GameObject, pooled=True):
     """All moving platforms encapsulating type"""
 
+    layer = Layer.TERRAIN
+
     path: Path
     """The internal path of a block
     """
-    old: tuple[int, int]
-    """The old coordinate that it lerps from
+    origin: tuple[int, int]
+    """The initial position of the block, in world coordinates
     """
-    target: tuple[int, int]
-    """The target coordinate that it lerps to
-    """
-    time: float
-    """The current lerping time 0 < time < 1
+    group: PlatformGroup | None
+    """The group moving the block, None if it does not move
     """
 
     def __init__(
         self,
         map: list[Map],
         representation: str,
-        data: Array2D[str],
+        groups: PathGroups,
         pos: tuple[int, int],
         **kwargs: Any,
     ) -> None:
         super().__init__(map, float("inf"), CHAR_INFO.get(representation), **kwargs)
-        self.time = 0
-        self.path = Path(data, pos)
-        self.old = self.map.map_to_world(pos)
-        self.target = self.map.map_to_world(self.path.go_next())
+        self.__init_path(groups, pos)
 
-    def update(self, delta_time: float = 1 / 60, *args: Any, **kwargs: Any) -> None:
-        self.time += delta_time
-        pos = arcade.Vec2(self.old[0], self.old[1]).lerp(
-            arcade.Vec2(self.target[0], self.target[1]), self.time
-        )
-        self.change_x = pos.x - self.position[0]
-        self.change_y = pos.y - self.position[1]
+    def reset(
+        self,
+        map: list[Map],
+        representation: str,
+        groups: PathGroups,
+        pos: tuple[int, int],
+        **kwargs: Any,
+    ) -> None:
+        texture = CHAR_INFO.get(representation)
+        if texture is not None:
+            # From the cache, as Sprite(path) does : each file is loaded once
+            cached = arcade.texture.default_texture_cache.load_or_get_texture(texture)
+            if cached is not self.texture:
+                self.texture = cached
+                self.sync_hit_box_to_texture()  # Not done by arcade on texture change
+        self._reset_state(map, **kwargs)
+        self.__init_path(groups, pos)
+
+    def __init_path(self, groups: PathGroups, pos: tuple[int, int]) -> None:
+        self.path = groups.path(pos)
+        self.origin = self.map.map_to_world(pos)
+        self.group = None
+        if not self.is_static:
+            self.group = self.map.platform_group(groups.trajectory(pos))
+            self.group.members.append(self)
+
+    @property
+    def is_static(self) -> bool:
+        return len(self.path) == 1
 
-        if self.time >= 1:
-            self.time = 0
-            self.old = self.target
-            self.target = self.map.map_to_world(self.path.go_next())
+    def update(self, delta_time: float = 1 / 60, *args: Any, **kwargs: Any) -> None:
+        # Moved by its group, see PlatformGroup#update
+        pass
 
 
 class Exit(MovingPlatform):
     """Exit sign, allowing the player to move to the next stage on touch."""
 
+    layer = Layer.INTERACTABLES
+
     __next_map: str
     """Path to the next map, passed to the map object.
     """
@@ -74,7 +175,7 @@ class Exit(MovingPlatform):
         self,
         map: list[Map],
         next_map: str,
-        data: Array2D[str],
+        groups: PathGroups,
         pos: tuple[int, int],
         **kwargs: Any,
     ) -> None:
@@ -83,29 +184,36 @@ class Exit(MovingPlatform):
         Args:
             map (Map): The map of the GO
             next_map (str): The path to the next map
+            groups (PathGroups): The groups of the map, to find the path of the sign
         """
-        super().__init__(map, "E", data, pos, **kwargs)
+        super().__init__(map, "E", groups, pos, **kwargs)
         self.__next_map = next_map
 
     def update(self, delta_time: float = 1 / 60, *args: Any, **kwargs: Any) -> None:
         super().update(delta_time, *args, **kwargs)
-        super(GameObject, self).update(delta_time, **kwargs)
 
         if arcade.check_for_collision(self, self.map.player):
-            self.map.change_maps(self.__next_map)
+            self.map.start_transition(self.__next_map)
 
 
 class Lava(MovingPlatform):
     """The lava object, currently only resets the map"""
 
+    layer = Layer.HAZARDS
+    # Burns at every tick, even when static : a falling body could cross
+    # it between two checks
+    update_rate = None
+
     def __init__(
-        self, map: list[Map], data: Array2D[str], pos: tuple[int, int], **kwargs: Any
+        self, map: list[Map], groups: PathGroups, pos: tuple[int, int], **kwargs: Any
     ) -> None:
-        super().__init__(map, "£", data, pos, **kwargs)
+        super().__init__(map, "£", groups, pos, **kwargs)
 
     def update(self, delta_time: float = 1 / 60, *args: Any, **kwargs: Any) -> None:
         super().update(delta_time, **kwargs)
-        super(GameObject, self).update(delta_time, **kwargs)
 
-        for item in self.map.check_for_collisions_all(self):
+        # Only living things can burn
+        for item in self.map.check_for_collisions_all(
+            self, Layer.PLAYER | Layer.ENEMIES
+        ):
             item.damage(self, DamageSource.LAVA, float("inf"))
@@ -1,7 +1,13 @@
+import random
+import time
+
 import arcade
+import yaml
 
 from src.res.camera import BetterCamera
 from src.res.map import Map
+from src.res.replay import CAMERA_EVENT, Recording
+from src.res.watcher import MapWatcher
 
 
 class GameView(arcade.View):
@@ -22,20 +28,102 @@ class GameView(arcade.View):
     between maps.
     """
 
-    def __init__(self) -> None:
-        """Initializes the game view and other arcade stuff."""
+    fade: float
+    """How much the screen is still faded to black after
+    loading a map, from 1 (black) to 0
+    """
+
+    watcher: MapWatcher
+    """Watches the maps on disk, so that the current map is
+    hot-reloaded as soon as it is edited
+    """
+
+    tick_rate: float
+    """How many times per second the map is updated, independently of
+    the frame rate. The speeds being per second (or per 1/60 second, see
+    Map#update), lowering it keeps the speed of the game, in bigger and
+    less precise steps.
+    """
+    ticks: int
+    """The number of ticks simulated so far
+    """
+    recording: Recording | None
+    """If set, the input events and the moves of the camera are
+    recorded in it, see Recording
+    """
+    __accumulator: float
+    """The time (in seconds) elapsed but not simulated yet, always less
+    than a tick after an update
+    """
+
+    TICK_RATE = 60
+    """The default tick rate, see GameView#tick_rate. The game is tuned
+    at this rate : lower ones are less precise.
+    """
+    MAX_CATCH_UP_TICKS = 5
+    """The maximum number of ticks simulated in a single frame. After a
+    longer frame, the remaining time is dropped (the game slows down)
+    rather than making the next frame even longer.
+    """
+    UPDATE_FRAME_BUDGET = 1 / 120
+    """The time (in seconds) given to each frame for updating the map.
+    Once over, the objects having an update rate wait for the next frames
+    (see GameObject#update_rate). Not applied while recording, as it
+    depends on the speed of the machine.
+    """
+    LOADING_FRAME_BUDGET = 1 / 120
+    """The time (in seconds) given to each frame for creating the
+    gameobjects of a map being loaded.
+    """
+    FADE_TIME = 0.3
+    """The time (in seconds) it takes to fade in after loading a map.
+    """
+    ACTIVATION_RADIUS = 512
+    """The distance (in pixels) around the camera within which monsters,
+    coins and lava are active, see Map#activation_radius.
+    """
+
+    FIRST_MAP = "map1.txt"
+    """The map the game starts on.
+    """
+
+    def __init__(self, recording: Recording | None = None) -> None:
+        """Initializes the game view and other arcade stuff.
+
+        Args:
+            recording (Recording | None, optional): An empty recording in which the
+            input events are recorded, its map, tick rate, seed and activation radius
+            being the ones of the game. Defaults to None (not recorded).
+        """
         super().__init__()
 
         self.background_color = arcade.csscolor.CORNFLOWER_BLUE
         self.score = 0
+        self.fade = 0
+        self.recording = recording
+        self.tick_rate = self.TICK_RATE if recording is None else recording.tick_rate
+        self.ticks = 0
+        self.__accumulator = 0
 
         self.setup()
 
     def setup(self) -> None:
         """Set up the game, loading the map, ..."""
-        self.map = Map([self], "map1.txt")
+        if self.recording is None:
+            path, seed = self.FIRST_MAP, random.getrandbits(32)
+            activation_radius: float | None = self.ACTIVATION_RADIUS
+        else:
+            path, seed = self.recording.map, self.recording.seed
+            activation_radius = self.recording.activation_radius
+        self.map = Map([self], path, activation_radius=activation_radius, seed=seed)
         self.camera = BetterCamera()
+        self.camera.position = self.map.player.position
         self.ui_camera = arcade.Camera2D()
+        self.watcher = MapWatcher(arcade.resources.resolve(":maps:"))
+        # Recorded before the first tick : a replay streams the map around the
+        # recorded camera from the start, instead of around the player
+        self.__record_camera()
+        self.map.stream(self.camera.aabb())
 
     def on_resize(self, width: int, height: int) -> None:
         super().on_resize(width, height)
@@ -53,8 +141,13 @@ class GameView(arcade.View):
             self.window.rect,
         )
 
+        if self.map.is_loading:
+            with self.ui_camera.activate():
+                self.draw_loading()
+            return
+
         with self.camera.activate():
-            self.map.draw()
+            self.map.draw(self.interpolation)
 
             for object in self.map.game_objects:
                 object.draw_ui()
@@ -62,6 +155,30 @@ class GameView(arcade.View):
         with self.ui_camera.activate():
             self.draw_ui()
 
+            if self.fade > 0:
+                arcade.draw_lbwh_rectangle_filled(
+                    0,
+                    0,
+                    self.ui_camera.width,
+                    self.ui_camera.height,
+                    (0, 0, 0, int(255 * self.fade)),
+                )
+
+    def draw_loading(self) -> None:
+        """Draws the loading screen, while changing maps."""
+        arcade.draw_lbwh_rectangle_filled(
+            0, 0, self.ui_camera.width, self.ui_camera.height, arcade.color.BLACK
+        )
+        arcade.Text(
+            "Loading...",
+            self.ui_camera.width / 2,
+            self.ui_camera.height / 2,
+            arcade.color.LIGHT_GRAY,
+            18,
+            anchor_x="center",
+            anchor_y="center",
+        ).draw()
+
     COIN_UI_TEXTURE = arcade.load_texture(":resources:/images/items/coinGold.png")
 
     def draw_ui(self) -> None:
@@ -117,14 +234,73 @@ class GameView(arcade.View):
             ),
         )
 
+    @property
+    def interpolation(self) -> float:
+        """How far the current frame is between the last tick and the
+        next one, from 0 to 1, to draw the map in between.
+        """
+        return min(1, self.__accumulator * self.tick_rate)
+
     def on_update(self, delta_time: float) -> None:
         """Updates all related internals
 
+        The map is updated by fixed ticks (see GameView#tick_rate), as
+        many as the time elapsed allows, up to MAX_CATCH_UP_TICKS per frame.
+
+        While changing maps, only the loading of the new map is done, within
+        a frame budget, and the map is neither updated nor drawn.
+
         Args:
             delta_time (float): The delta time between the last frame and the current
         """
-        self.map.update(delta_time)
+        if self.map.is_loading:
+            if self.map.step_transition(self.LOADING_FRAME_BUDGET):
+                self.fade = 1
+                self.camera.position = self.map.player.position
+                self.__accumulator = 0
+            return
+
+        if self.map.path in self.watcher.poll(delta_time):
+            try:
+                self.map.hot_reload()
+            except (ValueError, yaml.YAMLError):
+                pass  # Saved half-edited : kept as is until the next save
+
+        self.fade = max(0, self.fade - delta_time / self.FADE_TIME)
+
+        tick = 1 / self.tick_rate
+        deadline = None
+        if self.recording is None:
+            deadline = time.perf_counter() + self.UPDATE_FRAME_BUDGET
+        self.__accumulator += delta_time
+        for _ in range(self.MAX_CATCH_UP_TICKS):
+            if self.__accumulator < tick:
+                break
+            self.map.update(tick, deadline)
+            self.__accumulator -= tick
+            self.ticks += 1
+        else:
+            self.__accumulator = min(self.__accumulator, tick)
+
         self.camera.update(delta_time, self.map.player.position)
+        self.__record_camera()
+        self.map.stream(self.camera.aabb())
+
+    def __record(self, event: str, *args: float) -> None:
+        """Records an input event, if recording. The input is ignored while
+        changing maps (see Map#listeners) : it is not recorded either."""
+        if self.recording is not None and not self.map.is_loading:
+            self.recording.add(self.ticks, event, *args)
+
+    def __record_camera(self) -> None:
+        """Records the camera, if recording, when it moved or when ticks went
+        by since it was last recorded : both change what the map streams."""
+        if self.recording is None:
+            return
+        camera = (*self.camera.position, *self.camera.viewport.size)
+        events = self.recording.events
+        if not events or events[-1] != (self.ticks, CAMERA_EVENT, camera):
+            self.recording.add(self.ticks, CAMERA_EVENT, *camera)
 
     def on_key_press(self, symbol: int, modifiers: int) -> None:
         """On Key Press event
@@ -133,7 +309,8 @@ class GameView(arcade.View):
             symbol (int): the key pressed
             modifiers (int): the related modifiers
         """
-        for listeners in self.map.event_listeners:
+        self.__record("on_key_press", symbol, modifiers)
+        for listeners in self.map.listeners("on_key_press"):
             listeners.on_key_press(symbol, modifiers)
 
     def on_key_release(self, symbol: int, modifiers: int) -> None:
@@ -143,7 +320,8 @@ class GameView(arcade.View):
             symbol (int): the key released
             modifiers (int): the related modifiers
         """
-        for listeners in self.map.event_listeners:
+        self.__record("on_key_release", symbol, modifiers)
+        for listeners in self.map.listeners("on_key_release"):
             listeners.on_key_release(symbol, modifiers)
 
     def on_mouse_press(self, x: int, y: int, button: int, modifiers: int) -> None:
@@ -155,7 +333,8 @@ class GameView(arcade.View):
             button (int): button clicked
             modifiers (int): additional modifiers
         """
-        for listeners in self.map.event_listeners:
+        self.__record("on_mouse_press", x, y, button, modifiers)
+        for listeners in self.map.listeners("on_mouse_press"):
             listeners.on_mouse_press(x, y, button, modifiers)
 
     def on_mouse_release(self, x: int, y: int, button: int, modifiers: int) -> None:
@@ -167,7 +346,8 @@ class GameView(arcade.View):
             button (int): button clicked
             modifiers (int): additional modifiers
         """
-        for listeners in self.map.event_listeners:
+        self.__record("on_mouse_release", x, y, button, modifiers)
+        for listeners in self.map.listeners("on_mouse_release"):
             listeners.on_mouse_release(x, y, button, modifiers)
 
     def on_mouse_motion(self, x: int, y: int, dx: int, dy: int) -> None:
@@ -181,5 +361,6 @@ class GameView(arcade.View):
             dx (int): delta position of mouse, x coordinate
             dx (int): delta position of mouse, y coordinate
         """
-        for listeners in self.map.event_listeners:
+        self.__record("on_mouse_motion", x, y, dx, dy)
+        for listeners in self.map.listeners("on_mouse_motion"):
             listeners.on_mouse_motion(x, y, dx, dy)
@@ -0,0 +1,264 @@
+"""Playtests many maps at once, on all the cores and without display : every
+run simulates a map (see src.simulation) with scripted or random input, until
+its exit is reached or a tick limit, and the results of all the runs are
+gathered as JSON.
+
+    python -m src.playtest                   # Every map of assets/maps
+    python -m src.playtest generated/ --seeds 20 --ticks 7200 -o report.json
+    python -m src.playtest map2.txt --script session.rec
+
+Maps are given by their path starting from the "assets/maps" folder, or as
+files (or folders of .txt files) anywhere on disk.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from src.simulation import Simulation  # Before arcade
+
+import arcade
+
+from src.res.replay import Recording
+
+MOVES = (arcade.key.RIGHT, arcade.key.LEFT, None)
+"""The directions held by the random input, None being standing still
+"""
+MOVE_WEIGHTS = (4, 2, 1)
+"""How often every direction is held, mostly forwards
+"""
+
+
+class _ExitReached(Exception):
+    """Stops a playtest once the exit of its map is reached."""
+
+
+def random_input(map: str, seed: int, ticks: int, tick_rate: float) -> Recording:
+    """Generates random, but reproducible, input : a direction held for a
+    while, jumps of random heights and a few shots.
+
+    Args:
+        map (str): The map played, see playtest
+        seed (int): The seed of the input (and of the map)
+        ticks (int): The number of ticks of input
+        tick_rate (float): The tick rate of the simulation
+
+    Returns:
+        Recording: The input, that can be saved to play the run again
+    """
+    rng = random.Random(seed)
+    recording = Recording(map, tick_rate, seed)
+    held = None
+    tick = 0
+    while tick < ticks:
+        move = rng.choices(MOVES, MOVE_WEIGHTS)[0]
+        if move != held:
+            if held is not None:
+                recording.add(tick, "on_key_release", held, 0)
+            if move is not None:
+                recording.add(tick, "on_key_press", move, 0)
+            held = move
+
+        if rng.random() < 0.5:
+            recording.add(tick, "on_key_press", arcade.key.UP, 0)
+            recording.add(tick + rng.randint(1, 20), "on_key_release", arcade.key.UP, 0)
+        if rng.random() < 0.1:
+            x = rng.randrange(Simulation.VIEW_SIZE[0])
+            y = rng.randrange(Simulation.VIEW_SIZE[1])
+            button = rng.choice((arcade.MOUSE_BUTTON_LEFT, arcade.MOUSE_BUTTON_RIGHT))
+            recording.add(tick, "on_mouse_motion", x, y, 0, 0)
+            recording.add(tick, "on_mouse_press", x, y, button, 0)
+            recording.add(tick + 1, "on_mouse_release", x, y, button, 0)
+
+        tick += rng.randint(10, 60)
+    return recording
+
+
+def playtest(
+    map: str, seed: int, ticks: int, script: Path | None = None
+) -> dict[str, Any]:
+    """Runs one playtest, in a worker process : the map is simulated until
+    its exit is reached, or for at most some ticks.
+
+    Args:
+        map (str): The path of the map, starting from the "assets/maps"
+        folder, or a file anywhere on disk
+        seed (int): The seed of the map, and of the random input
+        ticks (int): The maximum number of ticks
+        script (Path | None, optional): A recording whose input is played
+        instead of random input. Defaults to None (random input).
+
+    Returns:
+        dict[str, Any]: The result of the run : whether the exit was reached,
+        after how many ticks, the coins collected (out of the coins of the map),
+        the deaths and the final score. Or the error that stopped the run.
+    """
+    from src.entities.coin import Coin
+
+    result: dict[str, Any] = {"map": map, "seed": seed}
+    try:
+        if os.path.isfile(map):
+            simulation = Simulation(seed=seed)
+            simulation.load(Path(map).read_text(encoding="utf-8"))
+        else:
+            simulation = Simulation(map, seed=seed)
+        coins = len(simulation.map.objects_of_type(Coin))
+
+        if script is None:
+            recording = random_input(map, seed, ticks, simulation.tick_rate)
+        else:
+            recording = Recording.load(script)
+
+        def step() -> None:
+            # Stops on the exit, before the next map is loaded
+            simulation.step()
+            if simulation.map.is_loading:
+                raise _ExitReached()
+
+        try:
+            recording.replay(simulation, step, ticks)
+        except _ExitReached:
+            pass
+        # The objects of the map are only replaced once the next map is loaded
+        remaining = len(simulation.map.objects_of_type(Coin))
+        result.update(
+            exit_reached=simulation.map.is_loading,
+            ticks=simulation.ticks,
+            coins=coins - remaining,
+            coins_total=coins,
+            deaths=simulation.map.deaths,
+            score=simulation.score,
+        )
+    except Exception as error:
+        result["error"] = "".join(traceback.format_exception_only(error)).strip()
+    return result
+
+
+def find_maps(paths: list[str]) -> list[str]:
+    """Lists the maps to playtest.
+
+    Args:
+        paths (list[str]): Maps (see playtest) and folders of maps. If empty,
+        every map of the "assets/maps" folder.
+
+    Returns:
+        list[str]: The maps, folders being replaced by their .txt files
+    """
+    if not paths:
+        folder = arcade.resources.resolve(":maps:")
+        return sorted(path.name for path in folder.glob("*.txt"))
+
+    maps: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            maps.extend(sorted(str(file) for file in Path(path).glob("*.txt")))
+        else:
+            maps.append(path)
+    return maps
+
+
+def run_playtests(
+    maps: list[str],
+    seeds: list[int],
+    ticks: int,
+    script: Path | None = None,
+    workers: int | None = None,
+) -> dict[str, Any]:
+    """Playtests every map with every seed, in a pool of worker processes.
+
+    Args:
+        maps (list[str]): The maps, see playtest
+        seeds (list[int]): The seeds of the runs of every map
+        ticks (int): The maximum number of ticks of a run
+        script (Path | None, optional): A recording played instead of random
+        input. Defaults to None (random input).
+        workers (int | None, optional): The number of worker processes.
+        Defaults to None (one per core).
+
+    Returns:
+        dict[str, Any]: The results of every run ("runs"), and by map
+        ("maps") how many runs reached the exit, the most coins collected,
+        the deaths and the errors
+    """
+    jobs = [(map, seed) for map in maps for seed in seeds]
+    # Spawned workers import arcade themselves, without display (see
+    # src.simulation) : never a copy of the GL context of the parent
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        runs = list(
+            executor.map(
+                playtest,
+                [map for map, _ in jobs],
+                [seed for _, seed in jobs],
+                [ticks] * len(jobs),
+                [script] * len(jobs),
+            )
+        )
+
+    summary: dict[str, dict[str, Any]] = {}
+    for run in runs:
+        map_summary = summary.setdefault(
+            run["map"],
+            {
+                "runs": 0,
+                "exits": 0,
+                "coins": 0,
+                "coins_total": 0,
+                "deaths": 0,
+                "errors": [],
+            },
+        )
+        map_summary["runs"] += 1
+        if "error" in run:
+            map_summary["errors"].append(run["error"])
+            continue
+        map_summary["exits"] += run["exit_reached"]
+        map_summary["coins"] = max(map_summary["coins"], run["coins"])
+        map_summary["coins_total"] = run["coins_total"]
+        map_summary["deaths"] += run["deaths"]
+    return {"ticks": ticks, "seeds": seeds, "maps": summary, "runs": runs}
+
+
+def main() -> None:
+    """Playtests maps from the command line, writing the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("maps", nargs="*")
+    parser.add_argument("--seeds", type=int, default=4, help="Runs per map")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--ticks", type=int, default=60 * Simulation.TICK_RATE)
+    parser.add_argument("--script", type=Path, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("-o", "--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    report = run_playtests(
+        find_maps(args.maps),
+        list(range(args.first_seed, args.first_seed + args.seeds)),
+        args.ticks,
+        args.script,
+        args.workers,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text, encoding="utf-8")
+
+    for map, map_summary in report["maps"].items():
+        print(
+            f"{map}: exit {map_summary['exits']}/{map_summary['runs']}, "
+            f"coins {map_summary['coins']}/{map_summary['coins_total']}, "
+            f"deaths {map_summary['deaths']}, errors {len(map_summary['errors'])}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
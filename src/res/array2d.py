@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import math
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_right
 from dataclasses import dataclass
 from enum import Enum
-from typing import Iterator, Self
+from itertools import compress, repeat
+from typing import Iterable, Iterator, Self, Sequence, overload
 
 # Position : TypeAlias = tuple[int, int]
 Position = tuple[int, int]
@@ -12,9 +17,9 @@ Position = tuple[int, int]
 class Array2D[T]:
     """A type representing a 2-dimensional array
     """
-    data: list[list[T]]
+    data: Sequence[Sequence[T]]
     """The internal representaion of the array 2D.
-    Is a nested list because each row can have a variable
+    Is a nested sequence because each row can have a variable
     width.
     """
 
@@ -95,6 +100,211 @@ class Array2D[T]:
         return Array2D([[val for i in range(width)] for y in range(height)])
 
 
+_RUN = re.compile(r"[^ ]+")
+"""Matches a run of non-empty tiles.
+"""
+
+SPARSE_DENSITY = 0.1
+"""Maps with a smaller ratio of non-empty tiles are stored sparsely.
+"""
+
+
+class TileArray2D(Array2D[str], ABC):
+    """An array 2D of tiles, where each row is a sequence of representations
+    (a space being an empty tile). It is built in bulk from the lines of a map,
+    as a DenseTileArray2D or a SparseTileArray2D depending on how full it is,
+    and scanned by segments of non-empty tiles instead of cell by cell.
+    """
+
+    @abstractmethod
+    def segments(self: Self) -> Iterator[tuple[str, int, int]]:
+        """Lists the pieces of the rows that may hold non-empty tiles,
+        bottom-up and left to right.
+
+        Yields:
+            Iterator[tuple[str, int, int]]: Order is (Tiles, x position of the first one, y position)
+        """
+
+    def find(self: Self, glyphs: Iterable[str]) -> Iterator[tuple[str, int, int]]:
+        """Lists the tiles of the given glyph classes, each segment being
+        scanned in a single pass.
+
+        Args:
+            glyphs (Iterable[str]): The representations to look for
+
+        Yields:
+            Iterator[tuple[str, int, int]]: Order is (Type, x position, y position)
+        """
+        is_glyph = frozenset(glyphs).__contains__
+        for tiles, start, y in self.segments():
+            for x in compress(range(len(tiles)), map(is_glyph, tiles)):
+                yield (tiles[x], start + x, y)
+
+    def tiles(self: Self) -> Iterator[tuple[str, int, int]]:
+        """Lists all the non-empty tiles, skipping the spaces.
+
+        Yields:
+            Iterator[tuple[str, int, int]]: Order is (Type, x position, y position)
+        """
+        for tiles, start, y in self.segments():
+            for x in compress(range(len(tiles)), map(" ".__ne__, tiles)):
+                yield (tiles[x], start + x, y)
+
+    def rows(self: Self) -> Iterator[str]:
+        """Lists the rows as full-width strings, bottom-up.
+
+        Yields:
+            Iterator[str]: The rows
+        """
+        for row in self.data:
+            yield str(row)
+
+    @staticmethod
+    def from_lines(
+        lines: list[str], width: int, height: int, sparse: bool | None = None
+    ) -> TileArray2D:
+        """Returns the array from the lines of a map, bottom-up, padded
+        with spaces to the given size.
+
+        Args:
+            lines (list[str]): The lines, bottom-up, none wider than width
+            width (int): The width of the array
+            height (int): The height of the array
+            sparse (bool | None, optional): Whether to store it sparsely, chosen
+            from the ratio of non-empty tiles (see SPARSE_DENSITY) if None. Defaults to None.
+
+        Returns:
+            TileArray2D: the 2D array
+        """
+        if sparse is None:
+            filled = sum(len(line) - line.count(" ") for line in lines)
+            sparse = filled < SPARSE_DENSITY * width * height
+
+        if sparse:
+            empty_row = SparseRow("", width)
+            return SparseTileArray2D(
+                [SparseRow(line, width) for line in lines]
+                + [empty_row] * (height - len(lines))
+            )
+
+        empty = " " * width
+        return DenseTileArray2D(
+            [line.ljust(width) for line in lines] + [empty] * (height - len(lines))
+        )
+
+
+@dataclass
+class DenseTileArray2D(TileArray2D):
+    """A dense array 2D of tiles, where each row is a string, aka. a
+    fixed-width array of code points.
+    """
+
+    data: list[str]
+    """The rows of the array, all of the same width
+    """
+
+    def segments(self: Self) -> Iterator[tuple[str, int, int]]:
+        for y, row in enumerate(self.data):
+            if not row.isspace():
+                yield (row, 0, y)
+
+
+class SparseRow(Sequence[str]):
+    """A row of tiles only storing its runs of non-empty tiles,
+    so that its size does not depend on its width.
+    """
+
+    __slots__ = ("__width", "__starts", "__runs")
+
+    __width: int
+    __starts: list[int]
+    """The x position of every run, sorted
+    """
+    __runs: list[str]
+    """The non-empty tiles of every run
+    """
+
+    def __init__(self, line: str, width: int) -> None:
+        """Creates the row from a line of a map.
+
+        Args:
+            line (str): The line, none wider than width
+            width (int): The width of the row
+        """
+        self.__width = width
+        self.__starts = []
+        self.__runs = []
+        for match in _RUN.finditer(line):
+            self.__starts.append(match.start())
+            self.__runs.append(match.group())
+
+    def runs(self) -> Iterator[tuple[str, int]]:
+        """Lists the runs of non-empty tiles.
+
+        Yields:
+            Iterator[tuple[str, int]]: Order is (Tiles, x position of the first one)
+        """
+        return zip(self.__runs, self.__starts)
+
+    def __len__(self) -> int:
+        return self.__width
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[str]: ...
+    def __getitem__(self, index: int | slice) -> str | Sequence[str]:
+        if isinstance(index, slice):
+            return str(self)[index]
+        if index < 0:
+            index += self.__width
+        if not 0 <= index < self.__width:
+            raise IndexError("SparseRow index out of range")
+
+        run = bisect_right(self.__starts, index) - 1
+        if run >= 0 and index - self.__starts[run] < len(self.__runs[run]):
+            return self.__runs[run][index - self.__starts[run]]
+        return " "
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(str(self))
+
+    def __str__(self) -> str:
+        parts: list[str] = []
+        end = 0
+        for run, start in self.runs():
+            parts.append(" " * (start - end))
+            parts.append(run)
+            end = start + len(run)
+        parts.append(" " * (self.__width - end))
+        return "".join(parts)
+
+
+@dataclass
+class SparseTileArray2D(TileArray2D):
+    """A sparse array 2D of tiles, where each row only stores its runs
+    of non-empty tiles : its size is proportional to the number of tiles,
+    not to the area of the map.
+    """
+
+    data: list[SparseRow]
+    """The rows of the array, all of the same width
+    """
+
+    def segments(self: Self) -> Iterator[tuple[str, int, int]]:
+        for y, row in enumerate(self.data):
+            for run, start in row.runs():
+                yield (run, start, y)
+
+    def items(self: Self) -> Iterator[tuple[str, int, int]]:
+        """Lists the non-empty tiles, the empty runs being skipped.
+
+        Yields:
+            Iterator[tuple[str, int, int]]: Order is (Type, x position, y position)
+        """
+        return self.tiles()
+
+
 CARDINAUX: dict[Array2D.Direction, str] = {
     Array2D.Direction.N: "↑",
     Array2D.Direction.S: "↓",
@@ -103,15 +313,90 @@ CARDINAUX: dict[Array2D.Direction, str] = {
 }
 
 
+GROUP_BLOCKS: frozenset[str] = frozenset({"=", "-", "x", "£", "E", "^", "#"})
+"""The representations of the blocks that stick together
+to form a (moving) group.
+"""
+
+_GROUP_RUN = re.compile("[" + re.escape("".join(sorted(GROUP_BLOCKS))) + "]+")
+"""Matches a horizontal run of blocks of the same group.
+"""
+
+_ARROWS: dict[str, Array2D.Direction] = {
+    arrow: dir for dir, arrow in CARDINAUX.items()
+}
+"""The direction of every arrow representation.
+"""
+
+
+class Trajectory:
+    """La trajectoire partagée par tous les blocs d'un même groupe, sous forme
+    de déplacements relatifs à la position initiale de chaque bloc"""
+
+    __offsets: list[Position]
+    __start: int
+
+    def __init__(self, offsets: list[Position], start: int) -> None:
+        self.__offsets = offsets
+        self.__start = start
+
+    @property
+    def offsets(self) -> list[Position]:
+        """les déplacements du groupe, de la position la plus "faible" à la plus "forte" """
+        return self.__offsets
+
+    @property
+    def start(self) -> int:
+        """l'index de la position initiale des blocs dans offsets"""
+        return self.__start
+
+    def __len__(self) -> int:
+        return len(self.__offsets)
+
+    @property
+    def period(self) -> int:
+        """la durée (en déplacements d'un bloc) d'un aller-retour complet,
+        après laquelle les blocs reviennent à leur position et direction de départ
+        (1 pour un bloc immobile)"""
+        return max(1, 2 * (len(self) - 1))
+
+    def index_at(self, step: int) -> int:
+        """retourne l'index dans offsets où se trouvent les blocs après step
+        déplacements, sans avoir à simuler les déplacements précédents"""
+        if len(self) == 1:
+            return 0
+        # les blocs partent vers les index croissants puis font des allers-retours :
+        # on "déplie" l'aller-retour en un cycle de longueur period
+        phase = (self.__start + step) % self.period
+        return phase if phase < len(self) else self.period - phase
+
+    def offset_at(self, time: float) -> tuple[float, float]:
+        """retourne le déplacement (en blocs, non entier entre deux positions) des
+        blocs après time déplacements, chaque déplacement durant une unité de temps"""
+        step = math.floor(time)
+        fraction = time - step
+        x0, y0 = self.__offsets[self.index_at(step)]
+        x1, y1 = self.__offsets[self.index_at(step + 1)]
+        return (x0 + (x1 - x0) * fraction, y0 + (y1 - y0) * fraction)
+
+
+STATIC_TRAJECTORY = Trajectory([(0, 0)], 0)
+"""The trajectory of a block that does not move.
+"""
+
+
 class Path:
     __current: int
-    __positions: list[Position]
+    __origin: Position
+    __trajectory: Trajectory
     __direction: int
 
-    def __init__(self, map: Array2D[str], pos: Position) -> None:
-        self.__positions, self.__current = Path.truc(map, pos)
+    def __init__(self, trajectory: Trajectory, pos: Position) -> None:
+        self.__trajectory = trajectory
+        self.__origin = pos  # le déplacement à l'index de départ est (0, 0)
+        self.__current = trajectory.start
 
-        if len(self.__positions) == 1:
+        if len(trajectory) == 1:
             self.__direction = 0
         else:
             self.__direction = 1
@@ -122,26 +407,34 @@ class Path:
 
     @property
     def positions(self) -> list[Position]:
-        return self.__positions
+        return [self.at(i) for i in range(len(self.__trajectory))]
 
     @property
     def direction(self) -> int:
         return self.__direction
 
+    def __len__(self) -> int:
+        return len(self.__trajectory)
+
+    def at(self, idx: int) -> Position:
+        """retourne la position du block à l'index idx du chemin"""
+        offset = self.__trajectory.offsets[idx]
+        return (self.__origin[0] + offset[0], self.__origin[1] + offset[1])
+
     def next_idx(self) -> int:
         """calcule l'index suivant auquel se trouvera le block"""
-        if not (len(self.positions) > self.current + self.direction >= 0):
+        if not (len(self) > self.current + self.direction >= 0):
             self.__direction *= -1
         return self.current + self.direction
 
     def next(self) -> Position:
         """retourne la prochaine position"""
-        return self.positions[self.next_idx()]
+        return self.at(self.next_idx())
 
     def go_next(self) -> Position:
         """avance le current au prochain index et retourne la nouvelle position"""
         self.__current = self.next_idx()
-        return self.positions[self.current]
+        return self.at(self.current)
 
     @staticmethod
     def is_directions_dict_valid(directions: dict[Array2D.Direction, bool]) -> bool:
@@ -164,67 +457,30 @@ class Path:
         map: Array2D[str], pos: Position, dir: Array2D.Direction
     ) -> list[Position]:
         """calcule et retourne le chemin total du block dans une direction, à partir des flèches qui lui sont directement connectées"""
-        next: Position = (pos[0] + dir.value[0], pos[1] + dir.value[1])
-        if map.at_position_with_direction(pos, dir) == CARDINAUX[dir]:
-            return [next] + Path.dir_path(map, next, dir)
-        else:
-            return []
+        path: list[Position] = []
+        while map.at_position_with_direction(pos, dir) == CARDINAUX[dir]:
+            pos = (pos[0] + dir.value[0], pos[1] + dir.value[1])
+            path.append(pos)
+        return path
 
     @staticmethod
-    def group(
-        map: Array2D[str], pos: Position, visited: set[Position]
-    ) -> set[Position]:
-        """renvoie tous les blocs dans le même groupe que celui à la position pos"""
-        visited.add(pos)
-        for dir in CARDINAUX:
-            newpos: Position = (pos[0] + dir.value[0], pos[1] + dir.value[1])
-            if (
-                map.at_position_with_direction(pos, dir) in {"=", "-", "x", "£", "E", "^", "#"}
-                and newpos not in visited
-            ):
-                visited |= {newpos} | Path.group(map, newpos, visited)
-        return visited
-
-    @staticmethod  # pour obtenir la liste des positions et l'index de départ
-    def truc(
-        map: Array2D[str],
-        pos: Position,
-    ) -> tuple[list[Position], int]:
-        """renvoie la listes des positions que le bloc à la position pos prendra au cours du temps, ainsi que l'index de sa position initiale sur cette liste"""
-        group: set[Position] = set()
-        group = Path.group(map, pos, group)
-        # pour garder en mémoire à la fois la liste de déplacement que subit le groupe dans une direction, mais aussi où,
-        # pour pouvoir calculer les déplacements relatifs des autres blocs
-        directions: dict[Array2D.Direction, tuple[list[Position], Position]] = {
-            Array2D.Direction.N: ([], pos),
-            Array2D.Direction.S: ([], pos),
-            Array2D.Direction.E: ([], pos),
-            Array2D.Direction.W: ([], pos),
-        }
-        for block in group:
-            for dir in CARDINAUX:
-                dir_path: list[Position] = Path.dir_path(map, block, dir)
-                if dir_path != []:
-                    if len(directions[dir][0]) != 0:
-                        # si on arrive ici, alors on a deux poussées différentes dans la même direction sur le groupe de blocs => son mouvement n'est pas valide
-                        raise ValueError(
-                            "The group of blocks has an invalid movement setup"
-                        )
-                    directions[dir] = (dir_path, block)
+    def trajectory(
+        directions: dict[Array2D.Direction, tuple[list[Position], Position]],
+    ) -> Trajectory:
+        """renvoie la trajectoire commune à tous les blocs d'un groupe, à partir des chemins de flèches trouvés
+        dans chaque direction et du bloc du groupe où ils ont été trouvés"""
         # vérifie si le groupe subit à la fois une poussée verticale et horizontale : si oui, c'est un problème
-        if not Path.is_directions_dict_valid(
-            {dir: len(directions[dir][0]) != 0 for dir in CARDINAUX}
-        ):
+        if not Path.is_directions_dict_valid({dir: True for dir in directions}):
             raise ValueError("The group of blocks has an invalid movement setup")
-        # pour chaque direction, on calcule la liste des positions trouvées dans le groupe en rajoutant la position relative de pos à celle du bloc où les flèches ont étées trouvées
+        # pour chaque direction, on calcule les déplacements relatifs au bloc où les flèches ont étées trouvées,
+        # ce qui les rend valables pour tous les blocs du groupe
         paths: dict[Array2D.Direction, list[Position]] = {
             dir: [
-                (
-                    directions[dir][0][i][0] - directions[dir][1][0] + pos[0],
-                    directions[dir][0][i][1] - directions[dir][1][1] + pos[1],
-                )
-                for i in range(len(directions[dir][0]))
+                (position[0] - directions[dir][1][0], position[1] - directions[dir][1][1])
+                for position in directions[dir][0]
             ]
+            if dir in directions
+            else []
             for dir in CARDINAUX
         }
         # comme le chemin est valide, au moins une des deux listes est vide. on obtient donc la liste des flèches de la direction dominante
@@ -235,6 +491,197 @@ class Path:
         weak_path: list[Position] = (
             paths[Array2D.Direction.S] + paths[Array2D.Direction.W]
         )
+        if not strong_path and not weak_path:
+            return STATIC_TRAJECTORY
         # down part de la position, alors que nous on veut un mouvement uniforme, donc une liste qui va de la position la plus "faible" à la position la plus "forte"
         weak_path.reverse()
-        return weak_path + [pos] + strong_path, len(weak_path)
+        return Trajectory(weak_path + [(0, 0)] + strong_path, len(weak_path))
+
+
+class PathGroups:
+    """All the groups of blocks of a map, labelled in a single pass.
+    The trajectory of each group is computed once and shared by
+    every block of the group.
+    """
+
+    __labels: dict[Position, int]
+    """The group index of every grouped block
+    """
+    __trajectories: list[Trajectory]
+    """The trajectory of every group, by group index
+    """
+
+    def __init__(
+        self, labels: dict[Position, int], trajectories: list[Trajectory]
+    ) -> None:
+        """Creates the groups from already labelled blocks, see PathGroups#from_map.
+
+        Args:
+            labels (dict[Position, int]): The group index of every grouped block
+            trajectories (list[Trajectory]): The trajectory of every group
+        """
+        self.__labels = labels
+        self.__trajectories = trajectories
+
+    @staticmethod
+    def from_map(map: TileArray2D) -> PathGroups:
+        """Labels all the groups of the map and computes their trajectories.
+
+        The groups are found from the horizontal runs of blocks of each row,
+        joined with the overlapping runs of the row below (union-find), so
+        the map is only scanned once, without any recursion. Only the groups
+        next to arrows get a (moving) trajectory.
+
+        Args:
+            map (TileArray2D): The map to find the groups in
+
+        Raises:
+            ValueError: A group of blocks has an invalid movement setup
+
+        Returns:
+            PathGroups: The groups of the map
+        """
+        runs: list[tuple[int, int, int]] = []  # (y, start, end) of every run
+        parents: list[int] = []  # union-find of the runs
+
+        def root(run: int) -> int:
+            while parents[run] != run:
+                parents[run] = parents[parents[run]]
+                run = parents[run]
+            return run
+
+        below: list[int] = []  # the runs of the row below
+        current: list[int] = []  # the runs of the row being scanned
+        row_y = -1
+        first = 0  # first run below that may still overlap
+        for tiles, offset, y in map.segments():
+            if y != row_y:
+                below = current if y == row_y + 1 else []
+                current = []
+                row_y = y
+                first = 0
+
+            for match in _GROUP_RUN.finditer(tiles):
+                start, end = match.start() + offset, match.end() + offset
+                run = len(runs)
+                runs.append((y, start, end))
+                parents.append(run)
+                current.append(run)
+
+                while first < len(below) and runs[below[first]][2] <= start:
+                    first += 1
+                other = first
+                while other < len(below) and runs[below[other]][1] < end:
+                    parents[root(below[other])] = root(run)
+                    other += 1
+
+        groups: dict[int, int] = {}  # run root -> group index
+        labels: dict[Position, int] = {}
+        for run, (y, start, end) in enumerate(runs):
+            group = groups.setdefault(root(run), len(groups))
+            labels.update(zip(zip(range(start, end), repeat(y)), repeat(group)))
+
+        # An arrow pushes the group of the block right behind it (the first
+        # arrow of a path, the others are behind another arrow)
+        pushes: dict[int, dict[Array2D.Direction, tuple[list[Position], Position]]] = {}
+        for arrow, x, y in map.find(_ARROWS):
+            dir = _ARROWS[arrow]
+            block = (x - dir.value[0], y - dir.value[1])
+            pushed = labels.get(block)
+            if pushed is None:
+                continue
+
+            directions = pushes.setdefault(pushed, {})
+            if dir in directions:
+                # deux poussées différentes dans la même direction sur le groupe de blocs => son mouvement n'est pas valide
+                raise ValueError("The group of blocks has an invalid movement setup")
+            directions[dir] = (Path.dir_path(map, block, dir), block)
+
+        trajectories = [STATIC_TRAJECTORY] * len(groups)
+        for group, directions in pushes.items():
+            trajectories[group] = Path.trajectory(directions)
+
+        return PathGroups(labels, trajectories)
+
+    @property
+    def labels(self) -> dict[Position, int]:
+        """The group index of every grouped block
+        """
+        return self.__labels
+
+    @property
+    def trajectories(self) -> list[Trajectory]:
+        """The trajectory of every group, by group index
+        """
+        return self.__trajectories
+
+    def trajectory(self, pos: Position) -> Trajectory:
+        """Returns the trajectory of the group of the block at pos.
+        A block not part of any group does not move.
+
+        Args:
+            pos (Position): The position of the block
+
+        Returns:
+            Trajectory: The trajectory of its group
+        """
+        label = self.__labels.get(pos)
+        return STATIC_TRAJECTORY if label is None else self.__trajectories[label]
+
+    def path(self, pos: Position) -> Path:
+        """Returns a new path for the block at pos.
+
+        Args:
+            pos (Position): The position of the block
+
+        Returns:
+            Path: The path of the block
+        """
+        return Path(self.trajectory(pos), pos)
+
+    def group_cells(self, pos: Position) -> list[Position]:
+        """Returns all the blocks of the group of the block at pos,
+        only visiting that group.
+
+        Args:
+            pos (Position): The position of a block of the group
+
+        Returns:
+            list[Position]: The blocks of the group, empty if pos is not grouped
+        """
+        label = self.__labels.get(pos)
+        if label is None:
+            return []
+
+        cells = [pos]
+        seen = {pos}
+        stack = [pos]
+        while stack:
+            x, y = stack.pop()
+            for neighbour in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if neighbour not in seen and self.__labels.get(neighbour) == label:
+                    seen.add(neighbour)
+                    cells.append(neighbour)
+                    stack.append(neighbour)
+        return cells
+
+    @staticmethod
+    def pushed_block(map: Array2D[str], pos: Position) -> Position | None:
+        """Returns the block pushed by the arrows going through pos, aka.
+        the block right behind the first arrow of the path.
+
+        Args:
+            map (Array2D[str]): The map
+            pos (Position): The position of an arrow
+
+        Returns:
+            Position | None: The pushed block, None if pos is not an arrow
+        """
+        arrow = map.at(pos)
+        dir = _ARROWS.get(arrow) if arrow is not None else None
+        if dir is None:
+            return None
+
+        while map.at(pos) == arrow:
+            pos = (pos[0] - dir.value[0], pos[1] - dir.value[1])
+        return pos
@@ -1,5 +1,21 @@
 import math
+from contextlib import contextmanager
+from typing import Generator, Self
+
 import arcade
+from arcade.camera.data_types import (
+    DEFAULT_FAR,
+    DEFAULT_NEAR_ORTHO,
+    CameraData,
+    OrthographicProjectionData,
+)
+from arcade.camera.projection_functions import (
+    generate_orthographic_matrix,
+    generate_view_matrix,
+    project_orthographic,
+    unproject_orthographic,
+)
+from pyglet.math import Mat4
 
 class BetterCamera(arcade.Camera2D):
     """Better (aka. smooth) camera for arcade.
@@ -69,4 +85,91 @@ class BetterCamera(arcade.Camera2D):
             self.position = self.position.lerp(arcade.Vec2(target_world.x, target_world.y), math.sin(self.__lerp_time))
         else:
             # We're inside, reset lerping
-            self.__lerp_time = 0
\ No newline at end of file
+            self.__lerp_time = 0
+
+    def aabb(self) -> arcade.types.Rect:
+        """The view in world coordinates, centered on the camera : the one
+        of arcade.Camera2D goes from its position to its position plus the
+        size of the view.
+        """
+        return arcade.types.XYWH(self.position.x, self.position.y,
+                                 self.viewport_width / self.zoom,
+                                 self.viewport_height / self.zoom)
+
+class HeadlessCamera:
+    """Camera of a game running without window (see src.simulation) : it
+    only converts coordinates and tells what is in view, nothing is drawn.
+    The conversions are the ones of arcade.Camera2D (unzoomed, matching the
+    window), down to the rounding, so that a recorded session is replayed
+    exactly (see Simulation#on_camera_move).
+    """
+
+    position: arcade.Vec2
+    """The center of the view, in world coordinates
+    """
+    width: float
+    """The width of the view, in pixels
+    """
+    height: float
+    """The height of the view, in pixels
+    """
+
+    def __init__(self, width: float, height: float) -> None:
+        """Creates a camera centered on the origin.
+
+        Args:
+            width (float): The width of the view, in pixels
+            height (float): The height of the view, in pixels
+        """
+        self.position = arcade.Vec2(0, 0)
+        self.width = width
+        self.height = height
+
+    def use(self) -> None:
+        pass  # Nothing to draw onto
+
+    @contextmanager
+    def activate(self) -> Generator[Self, None, None]:
+        yield self
+
+    def __matrices(self) -> tuple[Mat4, Mat4]:
+        """The view and projection matrices of arcade.Camera2D."""
+        view = CameraData(
+            position=(self.position.x, self.position.y, 0.0),
+            up=(0.0, 1.0, 0.0),
+            forward=(0.0, 0.0, -1.0),
+            zoom=1.0,
+        )
+        projection = OrthographicProjectionData(
+            left=-self.width / 2,
+            right=self.width / 2,
+            bottom=-self.height / 2,
+            top=self.height / 2,
+            near=DEFAULT_NEAR_ORTHO,
+            far=DEFAULT_FAR,
+        )
+        return (generate_view_matrix(view), generate_orthographic_matrix(projection))
+
+    def __viewport(self) -> tuple[int, int, int, int]:
+        return (0, 0, int(self.width), int(self.height))
+
+    def project(self, world_coordinate: arcade.types.Point) -> arcade.Vec2:
+        """Converts from world coordinates to view coordinates."""
+        view, projection = self.__matrices()
+        return project_orthographic(
+            world_coordinate, self.__viewport(), view, projection
+        )
+
+    def unproject(self, screen_coordinate: arcade.types.Point) -> arcade.Vec3:
+        """Converts from view coordinates to world coordinates."""
+        view, projection = self.__matrices()
+        return unproject_orthographic(
+            screen_coordinate, self.__viewport(), view, projection
+        )
+
+    def aabb(self) -> arcade.types.Rect:
+        """The view in world coordinates, centered on the camera, see
+        BetterCamera#aabb."""
+        return arcade.types.XYWH(
+            self.position.x, self.position.y, self.width, self.height
+        )
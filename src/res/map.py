@@ -1,27 +1,133 @@
 from __future__ import annotations
 
+import enum
 import itertools
 import json
+import random
+import time
 import typing
+from concurrent.futures import Future
 from enum import StrEnum
 from pathlib import Path
-from typing import Any, Iterator, cast
+from typing import Any, Callable, Iterable, Iterator, Protocol
 
 import arcade
 import yaml
 
-from src.res.array2d import Array2D
+from src.res.array2d import PathGroups, Position, TileArray2D, Trajectory
+from src.res.replay import EVENTS
+from src.res.scheduler import UpdateScheduler
+from src.res.streaming import ChunkStreamer, EntityActivator
+from src.res.terrain import TerrainGrid
 
 # MyPy shenanigans for cycle deps, sorry future me ;(
 # EDIT : Yeah, be sorry >:(
 if typing.TYPE_CHECKING:
     from src.entities.gameobject import GameObject
     from src.entities.player import Player
-    from src.gameview import GameView
+    from src.entities.wall import PlatformGroup
 
 arcade.resources.add_resource_handle("maps", Path("./assets/maps/").resolve())
 
 
+class Game(Protocol):
+    """What the gameobjects of a map need from the game running it : the
+    GameView, or a Simulation when running without window (see src.simulation).
+    """
+
+    score: int
+    """The current score of the player
+    """
+
+    @property
+    def camera(self) -> arcade.camera.Projector:
+        """The camera following the player"""
+        ...
+
+
+class Layer(enum.Flag):
+    """The collision layers, to only check collisions against some kinds
+    of gameobjects (see Map#check_for_collisions_all). Each gameobject is
+    in one layer, see GameObject#layer.
+    """
+
+    TERRAIN = 1
+    HAZARDS = 2
+    ENEMIES = 4
+    PLAYER = 8
+    PROJECTILES = 16
+    INTERACTABLES = 32
+    ALL = 63
+
+
+def _mapping(value: Any, where: str, keys: set[str]) -> dict[str, Any]:
+    """Checks that a part of a map header is a mapping of known keys.
+
+    Raises:
+        ValueError: It is not a mapping, or has an unknown key
+    """
+    if value is None and where == "header":
+        value = {}
+    if not isinstance(value, dict):
+        raise ValueError(f"Invalid map header: {where} must be a mapping")
+    unknown = value.keys() - keys
+    if unknown:
+        raise ValueError(
+            f"Invalid map header: unknown key(s) {sorted(map(str, unknown))} in {where}"
+        )
+    return dict(value)
+
+
+def _integer(fields: dict[str, Any], key: str, where: str) -> int:
+    """Gets a required, non-negative integer of a part of a map header.
+
+    Raises:
+        ValueError: It is missing or not a non-negative integer
+    """
+    value = fields.get(key)
+    if value is None:
+        raise ValueError(f"Invalid map header: missing '{key}' in {where}")
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError(
+            f"Invalid map header: '{key}' in {where} must be a non-negative integer, not {value!r}"
+        )
+    return value
+
+
+def _sequence(fields: dict[str, Any], key: str, where: str) -> list[Any]:
+    """Gets an optional list of a part of a map header.
+
+    Raises:
+        ValueError: It is not a list
+    """
+    value = fields.get(key)
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise ValueError(f"Invalid map header: '{key}' in {where} must be a list")
+    return value
+
+
+def _choice[E: StrEnum](
+    fields: dict[str, Any], key: str, where: str, kind: type[E], default: str | None = None
+) -> E:
+    """Gets one of the values of an enum of a part of a map header.
+
+    Raises:
+        ValueError: It is missing (without default) or not one of the values
+    """
+    value = fields.get(key, default)
+    if value is None:
+        raise ValueError(f"Invalid map header: missing '{key}' in {where}")
+    try:
+        return kind(value)
+    except ValueError:
+        raise ValueError(
+            f"Invalid map header: '{key}' in {where} must be one of "
+            f"{[choice.value for choice in kind]}, not {value!r}"
+        ) from None
+
+
 class Map:
     """The main class handling :
     - Map Loading
@@ -41,10 +147,31 @@ class Map:
     physics engine needs a sprite list in its constructor
     """
 
+    __static_objects: arcade.SpriteList[GameObject]
+    """The subset of the physics objects that never move (grass, crates,
+    closed gates, ...). Given to the physics engine as walls and never
+    updated.
+    """
+
+    __moving_objects: arcade.SpriteList[GameObject]
+    """The subset of the physics objects that belong to a moving group.
+    Given to the physics engine as platforms, moved by their group.
+    """
+    __platform_groups: dict[Trajectory, PlatformGroup]
+    """The groups of moving blocks, by trajectory, see Map#platform_group
+    """
+
     __passthrough_objects: arcade.SpriteList[GameObject]
     """The list of objects that are not used for collisions on the
     physics engine. All other objects.
     """
+    __layers: dict[Layer, arcade.SpriteList[GameObject]]
+    """The passthrough objects by collision layer (see GameObject#layer),
+    never drawn. The physics objects are the terrain layer.
+    """
+    __terrain: TerrainGrid
+    """The static physics objects by cell, see Map#terrain_at
+    """
 
     physics_engine: arcade.PhysicsEnginePlatformer
     """The physics engine that handles gravity and collisions
@@ -57,17 +184,85 @@ class Map:
     """The player spawn point as described in the map.
     """
 
-    __game_view_ref: list[GameView]
+    chunk_size: int | None
+    """If set, the static terrain is streamed by chunks of chunk_size
+    cells around the camera instead of being fully created at load
+    time, see Map#stream. Entities are then always lazily activated,
+    within a radius small enough for the terrain under them to stay loaded
+    (see Map#activation_radius).
+    """
+    __streamer: ChunkStreamer | None
+    """The terrain streamer of the current map, if chunk_size is set
+    """
+
+    random: random.Random
+    """The random numbers of the gameobjects (monster AI, ...), seeded
+    so that a game can be played again identically, see Recording
+    """
+    deaths: int
+    """The number of deaths of the player, kept between maps
+    """
+
+    activation_radius: float | None
+    """If set, monsters, coins and static lava are only created when the
+    camera comes within activation_radius pixels of them, and put to sleep
+    once far away, see Map#stream.
+    """
+    __activator: EntityActivator | None
+    """The entity activator of the current map, if activation_radius is set
+    """
+
+    __transition: Future[Data] | None
+    """The map being loaded in the background, see Map#start_transition
+    """
+    __building: Iterator[None] | None
+    """The creation of the gameobjects of the map being loaded,
+    spread over several frames
+    """
+
+    __data: Data
+    """The currently loaded map, see Map#hot_reload
+    """
+    __scheduler: UpdateScheduler
+    """Updates the passthrough objects at their own rate
+    """
+    __previous: dict[GameObject, tuple[float, float]]
+    """The positions of the moving objects before the last update,
+    to interpolate them when drawing, see Map#draw
+    """
+    __cells: dict[Position, list[GameObject]]
+    """The gameobjects created for every cell of the map
+    (except the player and the streamed terrain)
+    """
+    __destroyed: dict[GameObject, None] | None
+    """The objects destroyed during the current update, removed all at once
+    at its end (see Map#destroy). None when not updating.
+    """
+    __by_type: dict[type[GameObject], dict[GameObject, None]]
+    """The objects of the map by class, see Map#objects_of_type
+    """
+    __by_cell: dict[Position, dict[GameObject, None]]
+    """The objects of the map by the cell they were added at, see Map#object_at_cell
+    """
+    __indexed_cells: dict[GameObject, Position]
+    """The cell every object was indexed at, to unindex it once moved
+    """
+    __listeners: dict[str, dict[GameObject, None]]
+    """The objects of the map listening to every input event (see
+    GameObject#event_listener), in the order they were added
+    """
+
+    __game_view_ref: list[Game]
     """Using list to have a reference to the game view. *Should* only
     be accessed from the game_view property
     """
 
     @property
-    def game_view(self) -> GameView:
+    def game_view(self) -> Game:
         """Gives the game view in which the map was created.
 
         Returns:
-            GameView: The parent game view
+            Game: The parent game view (or simulation)
         """
         return self.__game_view_ref[0]
 
@@ -79,42 +274,185 @@ class Map:
     to fit inside a grid block.
     """
     __GRAVITY_CONSTANT = 1
-    """The gravity constant (in pixels) for the physics engine,
-    to be applied each and every update frame.
+    """The gravity constant (in pixels per 1/60 second, every 1/60 second)
+    for the physics engine, scaled to the tick (see Map#update).
+    """
+    __BUILD_STEP = 32
+    """How many gameobjects are created between two checks of the
+    frame budget, when loading a map over several frames.
+    """
+    __HASHED_LAYERS = ~(Layer.PLAYER | Layer.PROJECTILES)
+    """The layers whose sprites are spatially hashed. The others only have a
+    few sprites (the player and its weapon, the arrows), cheaper to all check
+    than to rehash every time they move.
+    """
+    __MOVING_LAYERS = Layer.ENEMIES | Layer.PLAYER | Layer.PROJECTILES
+    """The layers of the objects moving by themselves, interpolated when
+    drawing along with the moving groups of blocks, see Map#draw.
+    """
+    __REBUILD_COST = 200
+    """What rebuilding a sprite list costs per sprite kept, in sprites scanned
+    by a removal (see Map#__remove_all). Twice as much with a spatial hash.
     """
 
     def __init__(
-        self, view: list[GameView], path: str, first_load: bool = True
+        self,
+        view: list[Game],
+        path: str,
+        first_load: bool = True,
+        chunk_size: int | None = None,
+        activation_radius: float | None = None,
+        seed: int | None = None,
     ) -> None:
         """Initializes the map with a given path
 
         Args:
-            view (list[GameView]): just pass in self. Make a reference to the parent game view.
+            view (list[Game]): just pass in self. Make a reference to the parent game view
+            (or simulation).
             path (str): The path of the map, starting from the "assets/maps"
             folder
+            chunk_size (int | None, optional): The size of the streamed chunks
+            of terrain, in cells. Defaults to None (no streaming).
+            activation_radius (float | None, optional): The distance around the
+            camera within which entities are active, in pixels. Defaults to None
+            (always active).
+            seed (int | None, optional): The seed of the random numbers of the map,
+            kept between maps. Defaults to None (seeded by the system).
         """
         self.__path = arcade.resources.resolve(":maps:" + path)
+        self.random = random.Random(seed)
+        self.deaths = 0
         self.__game_view_ref = view
+        self.chunk_size = chunk_size
+        self.__streamer = None
+        self.activation_radius = activation_radius
+        self.__activator = None
+        self.__transition = None
+        self.__building = None
+        self.__previous = {}
+        self.__scheduler = UpdateScheduler()
+        self.__platform_groups = {}
+        self.__listeners = {event: {} for event in EVENTS}
+        self.__destroyed = None
+        self.__by_type = {}
+        self.__by_cell = {}
+        self.__indexed_cells = {}
 
         if first_load:
             self.reload()
 
-    def draw(self) -> None:
-        """Draw the map and all sub-objects"""
-        self.__physics_objects.draw()
-        self.__passthrough_objects.draw()
+    def draw(self, interpolation: float = 1) -> None:
+        """Draw the map and all sub-objects, the updated ones being drawn
+        between their positions before and after the last update.
 
-    def update(self, delta_time: float) -> None:
+        Args:
+            interpolation (float, optional): How far between the last two updates
+            the objects are drawn, from 0 (before) to 1 (after). Defaults to 1.
+        """
+        if interpolation >= 1 or not self.__previous:
+            self.__physics_objects.draw()
+            self.__passthrough_objects.draw()
+            return
+
+        # Moved to their drawn positions then put back : their spatial hashes
+        # are detached meanwhile, left as they were instead of updated twice
+        hashes = [
+            (sprite_list, sprite_list.spatial_hash)
+            for sprite_list in (self.__moving_objects, *self.__layers.values())
+            if sprite_list.spatial_hash is not None
+        ]
+        for sprite_list, _ in hashes:
+            sprite_list.spatial_hash = None
+
+        current: list[tuple[GameObject, tuple[float, float]]] = []
+        try:
+            for object, (x, y) in self.__previous.items():
+                position = object.position
+                # Teleported (respawn, ...) : not worth sliding across the map
+                if (
+                    position != (x, y)
+                    and abs(position[0] - x) + abs(position[1] - y) < self.__GRID_SIZE
+                ):
+                    current.append((object, position))
+                    object.position = (
+                        x + (position[0] - x) * interpolation,
+                        y + (position[1] - y) * interpolation,
+                    )
+
+            self.__physics_objects.draw()
+            self.__passthrough_objects.draw()
+        finally:
+            for object, position in current:
+                object.position = position
+            for sprite_list, spatial_hash in hashes:
+                sprite_list.spatial_hash = spatial_hash
+
+    def update(self, delta_time: float, deadline: float | None = None) -> None:
         """Updates the map and all sub-objects given the delta
         time between this frame and the last
 
+        The groups of moving blocks are moved every time (see PlatformGroup),
+        the other objects are updated at their own rate (see GameObject#update_rate).
+
         Args:
             delta_time (float): the delta in time between this frame
             and the last
+            deadline (float | None, optional): The time (see time.perf_counter) after
+            which the objects having a rate are deferred. Defaults to None (never).
         """
-        self.__physics_objects.update(delta_time)
+        # Only the objects that can move : not the static terrain and
+        # interactables, nor the sleeping entities (out of the layers)
+        self.__previous = {
+            object: object.position
+            for object in itertools.chain(
+                itertools.chain.from_iterable(
+                    group.members for group in self.__platform_groups.values()
+                ),
+                *(self.__layers[layer] for layer in self.__MOVING_LAYERS),
+            )
+        }
+        # Objects destroyed while updating stay in the sprite lists being
+        # iterated, until the end of the update
+        self.__destroyed = {}
+        try:
+            for group in self.__platform_groups.values():
+                group.update(delta_time)
+            self.__update_physics(delta_time)
+            self.__scheduler.update(self.__passthrough_objects, delta_time, deadline)
+        finally:
+            destroyed, self.__destroyed = self.__destroyed, None
+            self.__remove_all(destroyed)
+
+    def __update_physics(self, delta_time: float) -> None:
+        """Moves the player with the physics engine for one tick. The engine
+        works per update, while the velocities are per 1/60 second (as for
+        Sprite#update) : they are scaled to the tick, and the gravity with
+        them, so that the game keeps its speed at any tick rate.
+        """
+        scale = delta_time * 60
+        player = self.physics_engine.player_sprite
+        change_x = player.change_x
+        player.change_x *= scale
+        player.change_y *= scale
+        self.physics_engine.gravity_constant = self.__GRAVITY_CONSTANT * scale**2
         self.physics_engine.update()
-        self.__passthrough_objects.update(delta_time)
+        # Only the vertical velocity is changed by the engine
+        player.change_x = change_x
+        player.change_y /= scale
+
+    def stream(self, view: arcade.types.Rect) -> None:
+        """Loads the terrain chunks around the view and unloads the far
+        away ones, and activates the entities around the view while putting
+        the far away ones to sleep. Does nothing if the map is neither
+        streamed nor lazily activated.
+
+        Args:
+            view (arcade.types.Rect): The view (camera) in world coordinates
+        """
+        if self.__streamer is not None:
+            self.__streamer.update(view)
+        if self.__activator is not None:
+            self.__activator.update(view)
 
     @property
     def game_objects(self) -> Iterator[GameObject]:
@@ -136,29 +474,233 @@ class Map:
             Iterator[GameObject]: Iterator to loop through event listeners
         """
 
-        return filter(lambda obj: obj.event_listener, self.game_objects)
+        if self.is_loading:  # The player may be half-created
+            return iter(())
+        return iter(
+            dict.fromkeys(itertools.chain.from_iterable(self.__listeners.values()))
+        )
+
+    def listeners(self, event: str) -> list[GameObject]:
+        """The game objects listening to an input event, without going
+        through all the game objects : only the ones handling it, see
+        GameObject#event_listener.
+
+        Args:
+            event (str): The name of the handler of the event, see EVENTS
+
+        Returns:
+            list[GameObject]: The listeners, that may add or destroy objects
+        """
+        if self.is_loading:  # The player may be half-created
+            return []
+        return list(self.__listeners[event])
+
+    def update_listener(self, object: GameObject) -> None:
+        """Registers or unregisters an object of the map as a listener of the
+        input events it handles, after its event_listener flag changed.
+        Objects not in the map yet are registered when added.
 
-    def check_for_collisions_all(self, object: GameObject) -> list[GameObject]:
-        """Checking for collisions, optimizing with spatial-hashing.
-        This is the better way to check collision against anything.
+        Args:
+            object (GameObject): The object
+        """
+        sprite_lists = object.sprite_lists
+        if (
+            self.__passthrough_objects in sprite_lists
+            or self.__physics_objects in sprite_lists
+        ):
+            self.__register(object)
+
+    def __register(self, object: GameObject) -> None:
+        from src.entities.gameobject import GameObject
+
+        if not object.event_listener:
+            self.__unregister(object)
+            return
+        for event, listeners in self.__listeners.items():
+            # Only the events whose handler is overridden
+            if getattr(type(object), event) is not getattr(GameObject, event):
+                listeners[object] = None
+
+    def __unregister(self, object: GameObject) -> None:
+        for listeners in self.__listeners.values():
+            listeners.pop(object, None)
+
+    def __collisions(
+        self,
+        object: arcade.BasicSprite,
+        mask: Layer,
+        predicate: Callable[[GameObject], bool] | None,
+    ) -> Iterator[GameObject]:
+        """Lists the gameobjects of some layers colliding with a sprite, only
+        checking the ones near it : from the terrain grid and the spatial
+        hashes, or all of them in the layers too small (or moving too much)
+        to be hashed."""
+        nearby: list[Iterable[GameObject]] = []
+        for layer in mask:
+            sprite_list = self.__layers[layer]
+            if sprite_list.spatial_hash is None:
+                nearby.append(sprite_list)
+            else:
+                nearby.append(sprite_list.spatial_hash.get_sprites_near_sprite(object))
+        if Layer.TERRAIN in mask:
+            nearby.append(self.__terrain.near(object))
+            moving = self.__moving_objects.spatial_hash
+            if moving is not None:
+                nearby.append(moving.get_sprites_near_sprite(object))
+
+        for other in itertools.chain.from_iterable(nearby):
+            if (
+                other is not object
+                and arcade.check_for_collision(object, other)
+                and (not self.__destroyed or other not in self.__destroyed)
+                and (predicate is None or predicate(other))
+            ):
+                yield other
+
+    def check_for_collisions_all(
+        self,
+        object: GameObject,
+        mask: Layer = Layer.ALL,
+        predicate: Callable[[GameObject], bool] | None = None,
+    ) -> list[GameObject]:
+        """Checking for collisions, optimizing with the terrain grid and
+        spatial-hashing. This is the better way to check collision against anything.
 
         Args:
             object (GameObject): The target gameobject to check collisions against
+            mask (Layer, optional): The collision layers to check against, only
+            their gameobjects are visited. Defaults to Layer.ALL.
+            predicate (Callable[[GameObject], bool] | None, optional): Keeps only
+            the colliding gameobjects it accepts. Defaults to None (all of them).
 
         Returns:
             list[GameObject]: A list of all colliding gameobjects
         """
-        return arcade.check_for_collision_with_lists(
-            object, [self.__passthrough_objects, self.__physics_objects]
-        )
+        return list(self.__collisions(object, mask, predicate))
+
+    def collides_with_any(
+        self,
+        object: arcade.BasicSprite,
+        mask: Layer = Layer.ALL,
+        predicate: Callable[[GameObject], bool] | None = None,
+    ) -> bool:
+        """Whether a gameobject collides with anything, stopping at the first
+        collision found. See Map#check_for_collisions_all.
+
+        Args:
+            object (arcade.BasicSprite): The target sprite (a gameobject, or a
+            probe) to check collisions against
+            mask (Layer, optional): The collision layers to check against.
+            Defaults to Layer.ALL.
+            predicate (Callable[[GameObject], bool] | None, optional): Only counts
+            the colliding gameobjects it accepts. Defaults to None (all of them).
+
+        Returns:
+            bool: True if there is at least one collision
+        """
+        return next(self.__collisions(object, mask, predicate), None) is not None
+
+    def terrain_at(self, point: arcade.types.Point2) -> list[GameObject]:
+        """The terrain (walls, closed gates, platforms) at a point, from a
+        single cell of the terrain grid and the moving platforms around.
+
+        Args:
+            point (arcade.types.Point2): The point, in world coordinates
+
+        Returns:
+            list[GameObject]: The blocks containing the point
+        """
+        blocks = self.__terrain.at_point(point)
+        moving = self.__moving_objects.spatial_hash
+        if moving is not None:
+            blocks.extend(
+                block
+                for block in moving.get_sprites_near_point(point)
+                if block.collides_with_point(point)
+            )
+        return blocks
+
+    def terrain_in(self, area: arcade.types.Rect) -> list[GameObject]:
+        """The terrain (walls, closed gates, platforms) overlapping a rect,
+        from the cells of the terrain grid it covers and the moving platforms
+        around.
+
+        Args:
+            area (arcade.types.Rect): The rect, in world coordinates
+
+        Returns:
+            list[GameObject]: The blocks whose bounds overlap the rect
+        """
+        blocks = self.__terrain.in_rect(area)
+        moving = self.__moving_objects.spatial_hash
+        if moving is not None:
+            blocks.extend(moving.get_sprites_near_rect(area))
+        return [block for block in blocks if block.rect.overlaps(area)]
 
     def change_maps(self, path: str) -> None:
         """Change maps based on a path to the new map"""
         self.__path = arcade.resources.resolve(":maps:" + path)
         self.reload()
 
+    @property
+    def is_loading(self) -> bool:
+        """Whether a transition to another map is in progress. The map
+        should then neither be updated nor drawn.
+
+        Returns:
+            bool: True if a map is being loaded
+        """
+        return self.__transition is not None
+
+    def start_transition(self, path: str) -> None:
+        """Starts changing maps without blocking the current frame : the map
+        is loaded by the background worker, then its gameobjects are created
+        over the next frames, see Map#step_transition. Ignored if a transition
+        is already in progress.
+
+        Args:
+            path (str): The path of the new map, starting from the "assets/maps" folder
+        """
+        if self.is_loading:
+            return
+
+        from src.res.mapcache import LOADER
+
+        self.__path = arcade.resources.resolve(":maps:" + path)
+        self.__transition = LOADER.load_async(self.__path)
+        self.__building = None
+
+    def step_transition(self, budget: float) -> bool:
+        """Advances the transition in progress, creating gameobjects of the
+        new map for at most (about) budget seconds.
+
+        Args:
+            budget (float): The time given to this step, in seconds
+
+        Returns:
+            bool: True once the new map is fully loaded
+        """
+        if self.__transition is None:
+            return True
+
+        if self.__building is None:
+            if not self.__transition.done():
+                return False
+            self.__building = self.__load_steps(self.__transition.result())
+
+        deadline = time.perf_counter() + budget
+        for _ in self.__building:
+            if time.perf_counter() >= deadline:
+                return False
+
+        self.__transition = None
+        self.__building = None
+        return True
+
     def reload(self) -> None:
-        """Reloads the map, player and engine
+        """Reloads the map, player and engine. The map is taken from
+        memory if it was already loaded or prefetched, else from its
+        compiled version when it is up to date, see src.res.mapcache.
 
         Raises:
             ValueError: The map was not found on disk
@@ -167,10 +709,100 @@ class Map:
         if not self.__path.exists():
             raise ValueError(f"Map '{self.__path}' was not found on disk")
 
-        content: str
-        with self.__path.open("r", encoding="utf-8") as file:
-            content = "".join(file.readlines())
-            self.force_load_map(content)
+        from src.res.mapcache import LOADER
+
+        self.__load_data(LOADER.load(self.__path))
+
+    @property
+    def path(self) -> Path:
+        """The path of the map on disk
+        """
+        return self.__path
+
+    def hot_reload(self) -> None:
+        """Reloads the map after it was edited on disk, only recreating the
+        gameobjects of the cells that changed (and of the groups of blocks
+        they belong to or push). The player and everything else are kept
+        as is.
+
+        Falls back to a full reload when the size of the map changed, or
+        when the terrain is streamed (see Map#chunk_size). Entities not
+        activated yet (see Map#activation_radius) just get new records.
+
+        Raises:
+            ValueError: The map was not found on disk
+        """
+        if not self.__path.exists():
+            raise ValueError(f"Map '{self.__path}' was not found on disk")
+
+        from src.res.mapcache import LOADER
+
+        self.apply_changes(LOADER.load(self.__path))
+
+    def apply_changes(self, data: Data) -> None:
+        """Updates the loaded map to a new version of it, see Map#hot_reload.
+
+        Args:
+            data (Data): The new version of the map
+        """
+        old = self.__data
+        if (
+            self.__streamer is not None
+            or old.info.width != data.info.width
+            or old.info.height != data.info.height
+        ):
+            self.__load_data(data)
+            return
+
+        changed: set[Position] = set()
+        for y, (old_row, new_row) in enumerate(zip(old.array.rows(), data.array.rows())):
+            if old_row != new_row:
+                changed.update(
+                    (x, y)
+                    for x in itertools.compress(
+                        range(len(new_row)), map(str.__ne__, old_row, new_row)
+                    )
+                )
+
+        if old.header != data.header:
+            # Switches, gates and exits are set up from the header
+            for version in (old, data):
+                changed.update((x, y) for _, x, y in version.array.find("^|E"))
+
+        # Whole groups are recreated when one of their blocks, or one of
+        # the arrows pushing them, changed
+        rebuilt = set(changed)
+        for version in (old, data):
+            touched: set[int] = set()
+            for cell in changed:
+                for block in (cell, PathGroups.pushed_block(version.array, cell)):
+                    label = None if block is None else version.groups.labels.get(block)
+                    if block is not None and label is not None and label not in touched:
+                        touched.add(label)
+                        rebuilt.update(version.groups.group_cells(block))
+
+        for cell in rebuilt:
+            for object in self.__cells.pop(cell, ()):
+                self.destroy(object)
+            if self.__activator is not None:
+                self.__activator.remove(cell)
+
+        self.__data = data
+        for cell in rebuilt:
+            char = data.array.at(cell)
+            if char is None or char == " ":
+                continue
+            objects = self.__create_cell(data, char, cell, arcade.Vec2(0, 0), False)
+            if objects:
+                self.__cells[cell] = objects
+        self.__link_switches()
+
+    def __link_switches(self) -> None:
+        """Links every switch to its gates, see Switch#link."""
+        from src.entities.gates_lever import Switch
+
+        for switch in self.objects_of_type(Switch):
+            switch.link()
 
     def respawn_player(self) -> None:
         """Respawns the player instead of full reloading the map."""
@@ -179,36 +811,104 @@ class Map:
 
         from src.entities.player import Player
 
-        self.player = Player(
+        self.player = Player.acquire(
             [self],
             scale=self.__GRID_SCALE,
             center_x=self.player_spawn_point[0],
             center_y=self.player_spawn_point[1],
         )
-        self.__passthrough_objects.append(self.player)
+        self.add_objects([self.player])
         self.physics_engine.player_sprite = self.player
 
     def force_load_map(self, full_map_str: str) -> None:
         """Forces loading a map from a string instead of
         from a map path.
         """
-        self.__physics_objects = arcade.SpriteList(use_spatial_hash=True)
-        self.__passthrough_objects = arcade.SpriteList(use_spatial_hash=True)
+        self.__load_data(Map.parse(full_map_str))
 
-        content = full_map_str.split("---", 1)
+    def __load_data(self, data: Data) -> None:
+        """Loads an already parsed map, (re)creating all the gameobjects
+        and the physics engine.
+
+        Args:
+            data (Data): The parsed map
+        """
+        for _ in self.__load_steps(data):
+            pass
+
+    def __load_steps(self, data: Data) -> Iterator[None]:
+        """Loads an already parsed map, yielding regularly so that the
+        loading can be spread over several frames.
+
+        Args:
+            data (Data): The parsed map
+
+        Yields:
+            Iterator[None]: Nothing, just a chance to pause the loading
+        """
+        # The gameobjects of the previous map go back to their pools,
+        # no longer referenced by the old sprite lists
+        if hasattr(self, "physics_engine"):
+            for object in itertools.chain(
+                self.__physics_objects, self.__passthrough_objects
+            ):
+                object.release()
+            for objects in (
+                self.__physics_objects,
+                self.__static_objects,
+                self.__moving_objects,
+                self.__passthrough_objects,
+                *self.__layers.values(),
+            ):
+                objects.clear()
+
+        self.__previous = {}
+        self.__scheduler = UpdateScheduler()
+        self.__platform_groups = {}
+        self.__listeners = {event: {} for event in EVENTS}
+        self.__by_type = {}
+        self.__by_cell = {}
+        self.__indexed_cells = {}
+        # Only queried through the layers and the terrain grid : no spatial
+        # hash to update every time one of their sprites moves
+        self.__physics_objects = arcade.SpriteList()
+        self.__passthrough_objects = arcade.SpriteList()
+        # Hashed for the physics engine
+        self.__static_objects = arcade.SpriteList(use_spatial_hash=True)
+        self.__moving_objects = arcade.SpriteList(use_spatial_hash=True)
+        self.__terrain = TerrainGrid(self.__GRID_SIZE)
+        self.__layers = {
+            layer: arcade.SpriteList(
+                use_spatial_hash=layer in self.__HASHED_LAYERS, lazy=True
+            )
+            for layer in Layer.ALL
+        }
 
         self.physics_engine = arcade.PhysicsEnginePlatformer(
             arcade.Sprite(),
-            walls=self.__physics_objects,
             gravity_constant=self.__GRAVITY_CONSTANT,
         )
 
-        info = self.__parse_header(content[0])
-        self.__parse_map(content[1], info)
+        self.__data = data
+        yield from self.__build(data)
 
+        # Static tiles are walls : the engine never iterates them to move
+        # them. Only the real moving groups are given as platforms.
+        # (Set after parsing, the engine ignores empty sprite lists)
         self.physics_engine.walls.clear()
+        self.physics_engine.walls.append(self.__static_objects)
         self.physics_engine.platforms.clear()
-        self.physics_engine.platforms.append(self.__physics_objects)
+        self.physics_engine.platforms.append(self.__moving_objects)
+
+        # Prepares the next map in the background, for the exit
+        next_map = data.info.next_map
+        if next_map is not None:
+            from src.res.mapcache import LOADER
+
+            try:
+                LOADER.prefetch(arcade.resources.resolve(":maps:" + next_map))
+            except FileNotFoundError:
+                pass  # Reported when actually changing maps
 
     @property
     def physics_colliders_list(self) -> arcade.SpriteList[GameObject]:
@@ -226,28 +926,80 @@ class Map:
         """Converts from a coordinate in map-space to world space"""
         return (pos[0] * self.__GRID_SIZE, pos[1] * self.__GRID_SIZE)
 
-    def __parse_map(
-        self, map: str, info: Metadata, start: arcade.Vec2 = arcade.Vec2(0, 0)
-    ) -> None:
-        """Parses the map, initializing internals with the parsed data.
+    def world_to_map(self, pos: arcade.types.Point2) -> Position:
+        """Converts from a coordinate in world space to the nearest cell in map-space"""
+        return (round(pos[0] / self.__GRID_SIZE), round(pos[1] / self.__GRID_SIZE))
+
+    class Data:
+        """Everything parsed from a map, before any gameobject is created.
+        It is never modified once parsed, so it can be reused between loads.
+        """
+
+        header: str
+        """The header of the map, as JSON
+        """
+        info: Map.Metadata
+        """The metadata parsed from the header
+        """
+        array: TileArray2D
+        """The grid of the map, bottom-up
+        """
+        groups: PathGroups
+        """The groups of blocks of the grid, with their paths
+        """
+
+        def __init__(
+            self,
+            header: str,
+            info: Map.Metadata,
+            array: TileArray2D,
+            groups: PathGroups,
+        ) -> None:
+            self.header = header
+            self.info = info
+            self.array = array
+            self.groups = groups
+
+    @staticmethod
+    def parse(full_map_str: str) -> Data:
+        """Parses a full map (header and grid) from its string representation.
 
         Args:
-            map (str): The map as the string representation
-            size (arcade.Vec2): The size of the map
-            start (arcade.Vec2, optional): The start of the player. Defaults to arcade.Vec2(0,0).
+            full_map_str (str): The map, as written in the map files
 
         Raises:
-            ValueError: Invalid map height if the given size and map do not match
-            ValueError: Invalid width if a line do not match the given size (line_width > size.x)
+            ValueError: The map is malformed, or its header and grid do not match
+
+        Returns:
+            Data: The parsed map
         """
+        content = full_map_str.split("---", 1)
 
-        # Once again, loooooove mypy for it forcing me
-        # to use runtime imports !
-        from src.entities.coin import Coin
-        from src.entities.gates_lever import Gate, Switch
-        from src.entities.monster import Bat, DarkBat, Slime
-        from src.entities.wall import Exit, Lava, MovingPlatform
+        header = Map.__parse_header(content[0])
+        info = Map.Metadata.from_header(header)
+        array = Map.__parse_grid(content[1], info)
+        Map.__check_links(info, array)
 
+        # All the groups (and their paths) are computed once for the whole map.
+        # The header is kept as JSON, to find out whether it changed (once
+        # validated, only JSON types are left)
+        return Map.Data(json.dumps(header), info, array, PathGroups.from_map(array))
+
+    @staticmethod
+    def __parse_grid(map: str, info: Metadata) -> TileArray2D:
+        """Parses the grid of the map.
+
+        Args:
+            map (str): The grid as the string representation
+            info (Metadata): The metadata of the map, for its size
+
+        Raises:
+            ValueError: Invalid map height if the given size and map do not match
+            ValueError: Invalid width if a line do not match the given size (line_width > size.x)
+
+        Returns:
+            TileArray2D: The grid, bottom-up
+        """
         lines = map.splitlines()  # Lines includes "---"
 
         if len(lines) - 2 > info.height:
@@ -255,7 +1007,6 @@ class Map:
 
         lines = lines[1:-1]  # Remove "---"
         lines.reverse()  # So that we loop bottom-up
-        array = Array2D.from_size(info.width, info.height, " ")
 
         for y, line in enumerate(lines):
             if len(line) > info.width:
@@ -263,152 +1014,311 @@ class Map:
                     f"Invalid map width at line {y}, for width {len(line)} (expected {info.width})"
                 )
 
-            for x, char in enumerate(line):
-                array.data[y][x] = char
+        # The rows are built in bulk, no need to go character by character
+        return TileArray2D.from_lines(lines, info.width, info.height)
+
+    @staticmethod
+    def __check_links(info: Metadata, array: TileArray2D) -> None:
+        """Checks that the switches and gates of the header are on the grid,
+        and that the actions of the switches target gates, so that switches
+        can be linked to their gates once created (see Switch#link).
+
+        Args:
+            info (Metadata): The metadata of the map
+            array (TileArray2D): The grid of the map
+
+        Raises:
+            ValueError: Every broken reference at once
+        """
+        errors: list[str] = []
+        for (x, y), char in itertools.chain(
+            ((cell, "^") for cell in info.switches),
+            ((cell, "|") for cell in info.gates),
+        ):
+            if array.at((x, y)) != char:
+                kind = "switch" if char == "^" else "gate"
+                errors.append(f"no {kind} on the grid at x:'{x}', y:'{y}'")
+
+        for _, x, y in array.find("^"):
+            if (x, y) not in info.switches:
+                errors.append(f"switch at x:'{x}', y:'{y}' is not in the header")
+
+        for (x, y), switch in info.switches.items():
+            for action in itertools.chain(switch.switch_on, switch.switch_off):
+                if action.x is None or action.y is None:
+                    continue  # Not a gate action
+                if array.at((action.x, action.y)) == "|":
+                    continue
+                errors.append(
+                    f"switch at x:'{x}', y:'{y}' targets x:'{action.x}', "
+                    f"y:'{action.y}', which is not a gate"
+                )
 
-        for char, x, y in array.items():
-            pos = start + self.map_to_world((x, y))
+        if errors:
+            raise ValueError("Invalid map links: " + ", ".join(errors))
 
-            # The following is *pretty* ugly. Because arcade
-            # doesn't have a proper way to store dynamic values
-            # at runtime, I wanted to create a Gameobject system.
-            # So the following needs to be that way until I find
-            # a better way to handle things.
-            # I may come back later to refactor it. maybe. might.
+    def __build(
+        self, data: Data, start: arcade.Vec2 = arcade.Vec2(0, 0)
+    ) -> Iterator[None]:
+        """Creates all the gameobjects of a parsed map.
+
+        Args:
+            data (Data): The parsed map
+            start (arcade.Vec2, optional): The start of the player. Defaults to arcade.Vec2(0,0).
+
+        Yields:
+            Iterator[None]: Nothing, every few created gameobjects
+        """
+
+        def create_terrain(char: str, cell: Position) -> GameObject:
+            return self.__create_terrain(data, char, cell, start)
+
+        def create_entity(char: str, cell: Position) -> list[GameObject]:
+            objects = self.__create_cell(self.__data, char, cell, start, lazy=False)
+            self.__cells[cell] = objects
+            return objects
+
+        # Only the static terrain is streamed : moving groups and entities
+        # have a state, groups are always created and entities put to sleep
+        self.__streamer = None
+        if self.chunk_size is not None:
+            self.__streamer = ChunkStreamer(
+                self.chunk_size, self.__GRID_SIZE, create_terrain, self.destroy
+            )
+
+        # Entities are sleeping gameobjects (or records) when far away
+        radius = self.activation_radius
+        if self.__streamer is not None:
+            # Active up to twice the radius from the view, probing the
+            # terrain up to a cell around them : it must stay loaded
+            limit = (self.__streamer.reach - self.__GRID_SIZE) / 2
+            if limit <= 0:
+                raise ValueError(
+                    f"Chunks of {self.chunk_size} cells are too small to stream"
+                )
+            radius = limit if radius is None else min(radius, limit)
+        self.__activator = None
+        if radius is not None:
+            self.__activator = EntityActivator(
+                radius,
+                self.__GRID_SIZE,
+                create_entity,
+                self.__sleep,
+                self.__wake,
+            )
+
+        self.__cells = {}
+
+        # Empty cells are skipped in bulk, only the tiles are visited
+        for created, (char, x, y) in enumerate(data.array.tiles(), 1):
+            if created % self.__BUILD_STEP == 0:  # Pauses every few gameobjects
+                yield
+
+            objects = self.__create_cell(data, char, (x, y), start)
+            if objects:
+                self.__cells[(x, y)] = objects
+        self.__link_switches()
+
+        if hasattr(self, "player_spawn_point"):
+            # The camera is not there yet, start around the player
+            spawn = self.player_spawn_point
+            self.stream(arcade.types.XYWH(spawn[0], spawn[1], 0, 0))
+
+    def __create_terrain(
+        self, data: Data, char: str, cell: Position, start: arcade.Vec2
+    ) -> GameObject:
+        """Creates (and adds to the map) a block of terrain.
+
+        Args:
+            data (Data): The parsed map
+            char (str): The representation of the block
+            cell (Position): The cell of the block
+            start (arcade.Vec2): The offset of the map, see Map#__build
 
-            match char:
-                case "S":
-                    self.player_spawn_point = (pos.x, pos.y)
+        Returns:
+            GameObject: The block
+        """
+        from src.entities.wall import MovingPlatform
+
+        pos = start + self.map_to_world(cell)
+        platform = MovingPlatform.acquire(
+            [self],
+            char,
+            data.groups,
+            cell,
+            scale=self.__GRID_SCALE,
+            center_x=pos.x,
+            center_y=pos.y,
+        )
+        self.add_objects([platform], True)
+        return platform
+
+    def __create_cell(
+        self,
+        data: Data,
+        char: str,
+        cell: Position,
+        start: arcade.Vec2,
+        respawn: bool = True,
+        lazy: bool = True,
+    ) -> list[GameObject]:
+        """Creates (and adds to the map) the gameobjects of a cell.
+
+        Args:
+            data (Data): The parsed map
+            char (str): The representation of the cell
+            cell (Position): The cell
+            start (arcade.Vec2): The offset of the map, see Map#__build
+            respawn (bool, optional): Whether the spawn point also respawns the player. Defaults to True.
+            lazy (bool, optional): Whether entities are only recorded, when lazily
+            activated (see Map#activation_radius). Defaults to True.
+
+        Raises:
+            ValueError: An exit was found but the map has no next_map
+
+        Returns:
+            list[GameObject]: The created gameobjects, without the player, the
+            streamed terrain and the entities not activated yet
+        """
+
+        # Once again, loooooove mypy for it forcing me
+        # to use runtime imports !
+        from src.entities.coin import Coin
+        from src.entities.gates_lever import Gate, Switch
+        from src.entities.monster import Bat, DarkBat, Slime
+        from src.entities.wall import Exit, Lava
+
+        info, groups = data.info, data.groups
+        pos = start + self.map_to_world(cell)
+        objects: list[GameObject]
+
+        if lazy and self.__activator is not None:
+            # Moving lava follows its group, it can not sleep
+            is_static = char != "£" or len(groups.trajectory(cell)) == 1
+            if char in "owW*£" and is_static:
+                self.__activator.add(char, cell)
+                return []
+
+        # The following is *pretty* ugly. Because arcade
+        # doesn't have a proper way to store dynamic values
+        # at runtime, I wanted to create a Gameobject system.
+        # So the following needs to be that way until I find
+        # a better way to handle things.
+        # I may come back later to refactor it. maybe. might.
+
+        match char:
+            case "S":
+                self.player_spawn_point = (pos.x, pos.y)
+                if respawn:
                     self.respawn_player()
-                case "^":
-                    self.__passthrough_objects.append(
-                        Switch(
-                            [self],
-                            info,
-                            array,
-                            (x, y),
-                            scale=self.__GRID_SCALE,
-                            center_x=pos.x,
-                            center_y=pos.y,
-                        )
-                    )
-                case "|":
-                    gate = Gate(
+                return []
+            case "^":
+                objects = [
+                    Switch(
                         [self],
                         info,
-                        (x, y),
+                        groups,
+                        cell,
                         scale=self.__GRID_SCALE,
                         center_x=pos.x,
                         center_y=pos.y,
                     )
-                    if gate.isOpen:
-                        self.__passthrough_objects.append(gate)
-                    else:
-                        self.__physics_objects.append(gate)
-                case "o":
-                    self.__passthrough_objects.append(
-                        Slime(
-                            [self],
-                            scale=self.__GRID_SCALE,
-                            center_x=pos.x,
-                            center_y=pos.y,
-                        )
+                ]
+            case "|":
+                gate = Gate(
+                    [self],
+                    info,
+                    cell,
+                    scale=self.__GRID_SCALE,
+                    center_x=pos.x,
+                    center_y=pos.y,
+                )
+                self.add_objects([gate], not gate.isOpen)
+                return [gate]
+            case "o":
+                objects = [
+                    Slime(
+                        [self],
+                        scale=self.__GRID_SCALE,
+                        center_x=pos.x,
+                        center_y=pos.y,
                     )
-                case "w":
-                    self.__passthrough_objects.append(
-                        Bat(
-                            [self],
-                            scale=self.__GRID_SCALE,
-                            center_x=pos.x,
-                            center_y=pos.y,
-                        )
+                ]
+            case "w":
+                objects = [
+                    Bat(
+                        [self],
+                        scale=self.__GRID_SCALE,
+                        center_x=pos.x,
+                        center_y=pos.y,
                     )
-                case "W":
-                    self.__passthrough_objects.append(
-                        DarkBat(
-                            [self],
-                            scale=self.__GRID_SCALE,
-                            center_x=pos.x,
-                            center_y=pos.y,
-                        )
+                ]
+            case "W":
+                objects = [
+                    DarkBat(
+                        [self],
+                        scale=self.__GRID_SCALE,
+                        center_x=pos.x,
+                        center_y=pos.y,
                     )
-                case "*":
-                    self.__passthrough_objects.append(
-                        Coin(
-                            [self],
-                            scale=self.__GRID_SCALE,
-                            center_x=pos.x,
-                            center_y=pos.y,
-                        )
+                ]
+            case "*":
+                objects = [
+                    Coin(
+                        [self],
+                        scale=self.__GRID_SCALE,
+                        center_x=pos.x,
+                        center_y=pos.y,
                     )
-                case "£":
-                    self.__passthrough_objects.append(
-                        Lava(
-                            [self],
-                            array,
-                            (x, y),
-                            scale=self.__GRID_SCALE,
-                            center_x=pos.x,
-                            center_y=pos.y,
-                        )
+                ]
+            case "£":
+                objects = [
+                    Lava(
+                        [self],
+                        groups,
+                        cell,
+                        scale=self.__GRID_SCALE,
+                        center_x=pos.x,
+                        center_y=pos.y,
                     )
-                case "x" | "=" | "-":
-                    self.__physics_objects.append(
-                        MovingPlatform(
-                            [self],
-                            char,
-                            array,
-                            (x, y),
-                            scale=self.__GRID_SCALE,
-                            center_x=pos.x,
-                            center_y=pos.y,
-                        )
+                ]
+            case "x" | "=" | "-":
+                is_static = len(groups.trajectory(cell)) == 1
+                if self.__streamer is not None and is_static:
+                    self.__streamer.add(char, cell)
+                    return []
+                return [self.__create_terrain(data, char, cell, start)]
+            case "E":
+                if info.next_map is None:
+                    raise ValueError("Found exit but no next_map !")
+                objects = [
+                    Exit(
+                        [self],
+                        info.next_map,
+                        groups,
+                        cell,
+                        scale=self.__GRID_SCALE,
+                        center_x=pos.x,
+                        center_y=pos.y,
                     )
+                ]
+            case _:  # Arrows, "#", ...
+                return []
 
-                case "#":
-                    pass
-                case "E":
-                    if info.next_map is None:
-                        raise ValueError("Found exit but no next_map !")
-                    self.__passthrough_objects.append(
-                        Exit(
-                            [self],
-                            info.next_map,
-                            array,
-                            (x, y),
-                            scale=self.__GRID_SCALE,
-                            center_x=pos.x,
-                            center_y=pos.y,
-                        )
-                    )
+        self.add_objects(objects)
+        return objects
 
     class Metadata:
-        """Metadata of the map, parsed from the header.
+        """Metadata of the map, parsed and validated from the header.
         Only used internally to pass information functions to functions.
         """
 
-        width: int
-        """Width of the map in character
-        """
-        height: int
-        """Height of the map in character
-        """
-        next_map: str | None
-        """Relative path to the next map, None if none (lol)
-        """
-
-        def __init__(self, dict_: dict[str, Any]):
-            self.__dict__.update(dict_)
+        __slots__ = ("width", "height", "next_map", "gates", "switches")
 
         class GatePosition:
             """The gate metadata"""
 
-            x: int
-            """The gate x position in world coordinate
-            """
-            y: int
-            """The gate y position in world coordinate
-            """
+            __slots__ = ("x", "y", "state")
 
             class State(StrEnum):
                 """Whether a gate is opened or closed"""
@@ -416,23 +1326,47 @@ class Map:
                 open = "open"
                 closed = "closed"
 
+            x: int
+            """The gate x position in world coordinate
+            """
+            y: int
+            """The gate y position in world coordinate
+            """
             state: State
-            """The default state of a gate
+            """The default state of a gate, closed if not specified
             """
 
-        gates: list[GatePosition] | None = None
-        """The list of gates represented in the header
-        """
+            def __init__(self, x: int, y: int, state: State = State.closed) -> None:
+                self.x = x
+                self.y = y
+                self.state = state
+
+            @staticmethod
+            def from_header(fields: Any, where: str) -> Map.Metadata.GatePosition:
+                """Validates a gate of the header.
+
+                Args:
+                    fields (Any): The gate, as loaded from the header
+                    where (str): Where the gate is in the header, for errors
+
+                Raises:
+                    ValueError: The gate is malformed
+
+                Returns:
+                    Map.Metadata.GatePosition: The gate
+                """
+                GatePosition = Map.Metadata.GatePosition
+                fields = _mapping(fields, where, {"x", "y", "state"})
+                return GatePosition(
+                    _integer(fields, "x", where),
+                    _integer(fields, "y", where),
+                    _choice(fields, "state", where, GatePosition.State, "closed"),
+                )
 
         class SwitchPosition:
             """The switch metadata"""
 
-            x: int
-            """The x position of the switch
-            """
-            y: int
-            """The y position of the switch
-            """
+            __slots__ = ("x", "y", "state", "switch_on", "switch_off")
 
             class State(StrEnum):
                 """State of the lever (on/off)"""
@@ -440,14 +1374,11 @@ class Map:
                 on = "on"
                 off = "off"
 
-            state: State = State.off
-            """Default state of the lever, defaults to off if not
-            specified
-            """
-
             class Action:
                 """Action of a lever"""
 
+                __slots__ = ("action", "x", "y")
+
                 class Kind(StrEnum):
                     """The action kind of a lever"""
 
@@ -458,61 +1389,432 @@ class Map:
                 action: Kind
                 """What the lever does in kind
                 """
-                x: int
+                x: int | None
                 """The gate affected if specified, in map x coordinate
                 """
-                y: int
+                y: int | None
                 """The gate affected if specified, in map y coordinate
                 """
 
-            switch_on: list[Action] | None = None
-            """The action to act on when the lever is turned on
+                def __init__(
+                    self, action: Kind, x: int | None = None, y: int | None = None
+                ) -> None:
+                    self.action = action
+                    self.x = x
+                    self.y = y
+
+                @staticmethod
+                def from_header(
+                    fields: Any, where: str
+                ) -> Map.Metadata.SwitchPosition.Action:
+                    """Validates an action of a switch of the header.
+
+                    Args:
+                        fields (Any): The action, as loaded from the header
+                        where (str): Where the action is in the header, for errors
+
+                    Raises:
+                        ValueError: The action is malformed
+
+                    Returns:
+                        Map.Metadata.SwitchPosition.Action: The action
+                    """
+                    Action = Map.Metadata.SwitchPosition.Action
+                    fields = _mapping(fields, where, {"action", "x", "y"})
+                    kind = _choice(fields, "action", where, Action.Kind)
+                    if kind == Action.Kind.disable:
+                        return Action(kind)
+                    # Gate actions need the gate
+                    return Action(
+                        kind, _integer(fields, "x", where), _integer(fields, "y", where)
+                    )
+
+            x: int
+            """The x position of the switch
             """
-            switch_off: list[Action] | None = None
-            """The action to act on when the lever is turned off
+            y: int
+            """The y position of the switch
+            """
+            state: State
+            """Default state of the lever, defaults to off if not
+            specified
             """
+            switch_on: list[Action]
+            """The actions to act on when the lever is turned on
+            """
+            switch_off: list[Action]
+            """The actions to act on when the lever is turned off
+            """
+
+            def __init__(
+                self,
+                x: int,
+                y: int,
+                state: State = State.off,
+                switch_on: list[Action] | None = None,
+                switch_off: list[Action] | None = None,
+            ) -> None:
+                self.x = x
+                self.y = y
+                self.state = state
+                self.switch_on = switch_on or []
+                self.switch_off = switch_off or []
+
+            @staticmethod
+            def from_header(fields: Any, where: str) -> Map.Metadata.SwitchPosition:
+                """Validates a switch of the header.
+
+                Args:
+                    fields (Any): The switch, as loaded from the header
+                    where (str): Where the switch is in the header, for errors
+
+                Raises:
+                    ValueError: The switch is malformed
+
+                Returns:
+                    Map.Metadata.SwitchPosition: The switch
+                """
+                SwitchPosition = Map.Metadata.SwitchPosition
+                fields = _mapping(
+                    fields, where, {"x", "y", "state", "switch_on", "switch_off"}
+                )
 
-        switches: list[SwitchPosition] | None = None
-        """The list of switches in the map
+                # YAML reads on/off as booleans
+                state = fields.get("state")
+                if isinstance(state, bool):
+                    fields["state"] = "on" if state else "off"
+
+                actions: dict[str, list[Map.Metadata.SwitchPosition.Action]] = {}
+                for key in ("switch_on", "switch_off"):
+                    actions[key] = [
+                        SwitchPosition.Action.from_header(action, f"{where}.{key}[{i}]")
+                        for i, action in enumerate(_sequence(fields, key, where))
+                    ]
+
+                return SwitchPosition(
+                    _integer(fields, "x", where),
+                    _integer(fields, "y", where),
+                    _choice(fields, "state", where, SwitchPosition.State, "off"),
+                    actions["switch_on"],
+                    actions["switch_off"],
+                )
+
+        width: int
+        """Width of the map in character
+        """
+        height: int
+        """Height of the map in character
+        """
+        next_map: str | None
+        """Relative path to the next map, None if none (lol)
+        """
+        gates: dict[Position, GatePosition]
+        """The gates represented in the header, by position
         """
+        switches: dict[Position, SwitchPosition]
+        """The switches of the map, by position
+        """
+
+        def __init__(
+            self,
+            width: int,
+            height: int,
+            next_map: str | None = None,
+            gates: Iterable[GatePosition] = (),
+            switches: Iterable[SwitchPosition] = (),
+        ) -> None:
+            """Creates the metadata.
+
+            Raises:
+                ValueError: Two gates or two switches are at the same position
+            """
+            self.width = width
+            self.height = height
+            self.next_map = next_map
+            self.gates = {}
+            self.switches = {}
+
+            for gate in gates:
+                if (gate.x, gate.y) in self.gates:
+                    raise ValueError(
+                        f"Invalid map header: two gates at x:'{gate.x}', y:'{gate.y}'"
+                    )
+                self.gates[(gate.x, gate.y)] = gate
+            for switch in switches:
+                if (switch.x, switch.y) in self.switches:
+                    raise ValueError(
+                        f"Invalid map header: two switches at x:'{switch.x}', y:'{switch.y}'"
+                    )
+                self.switches[(switch.x, switch.y)] = switch
+
+        @staticmethod
+        def from_header(header: Any) -> Map.Metadata:
+            """Validates the header, as loaded from YAML (or JSON), in a
+            single pass.
 
-    def __parse_header(self, header: str) -> Metadata:
-        """Parses the header from the string, returning
-        the metadata of the parsed header.
+            Args:
+                header (Any): The loaded header
+
+            Raises:
+                ValueError: The header is malformed
+
+            Returns:
+                Map.Metadata: The metadata
+            """
+            Metadata = Map.Metadata
+            fields = _mapping(
+                header,
+                "header",
+                {"width", "height", "next_map", "gates", "switches"},
+            )
+
+            next_map = fields.get("next_map")
+            if next_map is not None and not isinstance(next_map, str):
+                raise ValueError("Invalid map header: 'next_map' must be a path")
+
+            return Metadata(
+                _integer(fields, "width", "header"),
+                _integer(fields, "height", "header"),
+                next_map,
+                (
+                    Metadata.GatePosition.from_header(gate, f"gates[{i}]")
+                    for i, gate in enumerate(_sequence(fields, "gates", "header"))
+                ),
+                (
+                    Metadata.SwitchPosition.from_header(switch, f"switches[{i}]")
+                    for i, switch in enumerate(_sequence(fields, "switches", "header"))
+                ),
+            )
+
+    @staticmethod
+    def __parse_header(header: str) -> Any:
+        """Loads the header from the string, to be validated
+        into Metadata.
 
         Args:
             header (str): The header to parse from
 
         Raises:
-            ValueError: An unkown variable was found
+            ValueError: The header is not valid YAML
 
         Returns:
-            Metadata: The header
+            Any: The loaded header
         """
-        d = yaml.safe_load(header)
-        return cast(Map.Metadata, json.loads(json.dumps(d), object_hook=Map.Metadata))
+        try:
+            return yaml.safe_load(header)
+        except yaml.YAMLError as error:
+            raise ValueError(f"Invalid map header: {error}") from error
 
     def destroy(self, object: GameObject) -> None:
-        """Destroys a given gameobject from the map
+        """Destroys a given gameobject from the map, giving it back to
+        its pool if its class is pooled (see GameObject#acquire)
+
+        During Map#update, the object is only queued : it is no longer
+        updated nor collided with, and all the objects destroyed by the
+        update are removed at once at its end.
 
         Args:
             object (GameObject): The object to destroy
         """
-        if object in self.__passthrough_objects:
-            self.__passthrough_objects.remove(object)
-        if object in self.__physics_objects:
-            self.__physics_objects.remove(object)
+        if self.__destroyed is not None:
+            self.__destroyed[object] = None
+        else:
+            self.__remove_all({object: None})
+
+    def objects_of_type[T: GameObject](self, type: type[T]) -> list[T]:
+        """The objects of a class (subclasses included), without going
+        through all the game objects.
+
+        Args:
+            type (type[T]): The class
+
+        Returns:
+            list[T]: The objects of the map of this class
+        """
+        return [
+            typing.cast(T, object)
+            for cls, objects in self.__by_type.items()
+            if issubclass(cls, type)
+            for object in objects
+            if not self.__destroyed or object not in self.__destroyed
+        ]
+
+    def object_at_cell[T: GameObject](
+        self, cell: Position, type: type[T]
+    ) -> T | None:
+        """Finds an object of a class by its cell. Objects are found at the
+        cell they were added to the map at : gates, switches and terrain stay
+        there, but moving objects are not found where they went.
+
+        Args:
+            cell (Position): The cell, in map coordinates
+            type (type[T]): The class of the object (subclasses included)
+
+        Returns:
+            T | None: The first object of this class added at this cell, if any
+        """
+        for object in self.__by_cell.get(cell, ()):
+            if isinstance(object, type) and (
+                not self.__destroyed or object not in self.__destroyed
+            ):
+                return object
+        return None
+
+    def __index(self, object: GameObject) -> None:
+        cell = self.world_to_map(object.position)
+        self.__indexed_cells[object] = cell
+        self.__by_type.setdefault(type(object), {})[object] = None
+        self.__by_cell.setdefault(cell, {})[object] = None
+
+    def __unindex(self, object: GameObject) -> None:
+        cell = self.__indexed_cells.pop(object, None)
+        if cell is None:
+            return
+        of_type = self.__by_type[type(object)]
+        del of_type[object]
+        if not of_type:
+            del self.__by_type[type(object)]
+        at_cell = self.__by_cell[cell]
+        del at_cell[object]
+        if not at_cell:
+            del self.__by_cell[cell]
+
+    def is_destroyed(self, object: GameObject) -> bool:
+        """Whether an object was destroyed, or is queued to be (see Map#destroy).
+
+        Args:
+            object (GameObject): The object
+
+        Returns:
+            bool: True if the object is no longer part of the map
+        """
+        return not object.sprite_lists or (
+            self.__destroyed is not None and object in self.__destroyed
+        )
+
+    def __remove_all(
+        self, objects: dict[GameObject, None], release: bool = True
+    ) -> None:
+        """Removes destroyed objects from the map. The sprite lists of an
+        object are the ones it records itself (see Sprite#sprite_lists) :
+        no list is searched.
+
+        Args:
+            objects (dict[GameObject, None]): The objects to remove
+            release (bool, optional): Whether the objects go back to their pools
+            (see GameObject#release). Defaults to True.
+        """
+        if not objects:
+            return
+
+        removed: dict[arcade.SpriteList[GameObject], list[GameObject]] = {}
+        for object in objects:
+            for sprite_list in object.sprite_lists:
+                removed.setdefault(sprite_list, []).append(object)
+        for sprite_list, sprites in removed.items():
+            # Each removal scans the whole list, while a rebuild adds back
+            # every kept sprite, at a much higher cost per sprite
+            size = len(sprite_list)
+            rebuild_cost = self.__REBUILD_COST * (size - len(sprites))
+            if sprite_list.spatial_hash is not None:
+                rebuild_cost *= 2
+            if len(sprites) * size <= rebuild_cost:
+                for sprite in sprites:
+                    sprite_list.remove(sprite)
+            else:
+                kept = [sprite for sprite in sprite_list if sprite not in objects]
+                sprite_list.clear()
+                sprite_list.extend(kept)
+
+        for object in objects:
+            self.__terrain.remove(object)
+            if self.__activator is not None:
+                self.__activator.forget(object)
+            self.__unregister(object)
+            self.__unindex(object)
+            self.__previous.pop(object, None)
+            self.__leave_group(object)
+            self.__scheduler.forget(object)
+            if release:
+                object.release()
+
+    def platform_group(self, trajectory: Trajectory) -> PlatformGroup:
+        """Gives the group of the blocks moving along a trajectory, creating
+        it for its first block.
+
+        Args:
+            trajectory (Trajectory): The trajectory of the group
+
+        Returns:
+            PlatformGroup: The group
+        """
+        from src.entities.wall import PlatformGroup
+
+        group = self.__platform_groups.get(trajectory)
+        if group is None:
+            group = PlatformGroup(self, trajectory)
+            self.__platform_groups[trajectory] = group
+        return group
+
+    def __leave_group(self, object: GameObject) -> None:
+        """Removes a destroyed block from its group, forgetting the group
+        once empty (so that a group rebuilt by a hot reload starts over).
+        """
+        from src.entities.wall import MovingPlatform
+
+        if not isinstance(object, MovingPlatform) or object.group is None:
+            return
+        group = object.group
+        object.group = None
+        if object in group.members:
+            group.members.remove(object)
+        if not group.members and self.__platform_groups.get(group.trajectory) is group:
+            del self.__platform_groups[group.trajectory]
 
     def add_objects(self, objects: list[GameObject], is_physics: bool = False) -> None:
         """Adds an object to the map
 
+        Physics objects are also sorted between the static walls and the
+        moving platforms of the physics engine, see GameObject#is_static.
+
         Args:
             objects (list[GameObject]): the objects to add
             is_physics (bool, optional): whether the object should have collisions. Defaults to False.
         """
+        if self.__destroyed:
+            # Destroyed then added back in the same update, to move it between
+            # lists (see Gate) : removed right away, but still live so not
+            # given back to its pool
+            moved = {obj: None for obj in objects if obj in self.__destroyed}
+            for obj in moved:
+                del self.__destroyed[obj]
+            self.__remove_all(moved, release=False)
+
         if is_physics:
             for obj in objects:
                 self.__physics_objects.append(obj)
+                if obj.is_static:
+                    self.__static_objects.append(obj)
+                    self.__terrain.add(obj)
+                else:
+                    self.__moving_objects.append(obj)
         else:
             for obj in objects:
                 self.__passthrough_objects.append(obj)
+                self.__layers[obj.layer].append(obj)
+
+        for obj in objects:
+            self.__index(obj)
+            if obj.event_listener:
+                self.__register(obj)
+
+    def __sleep(self, object: GameObject) -> None:
+        """Puts an entity to sleep, see EntityActivator."""
+        self.__passthrough_objects.remove(object)
+        self.__layers[object.layer].remove(object)
+        self.__unregister(object)
+        self.__unindex(object)
+
+    def __wake(self, object: GameObject) -> None:
+        """Wakes a sleeping entity up, see EntityActivator."""
+        self.add_objects([object])
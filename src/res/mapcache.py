@@ -0,0 +1,460 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from src.res.array2d import PathGroups, Position, TileArray2D, Trajectory
+from src.res.map import Map
+
+CACHE_DIRECTORY = "__mapcache__"
+"""The directory, next to the maps, in which the compiled maps are stored.
+"""
+
+MAGIC = b"ICCMAP"
+"""The first bytes of every compiled map.
+"""
+VERSION = 2
+"""The version of the compiled format. Compiled maps of another
+version are considered outdated.
+"""
+
+_HEADER = struct.Struct("<6sH32sIIII")
+"""Magic, version, sha256 of the source, width, height,
+size of the palette and size of the JSON header (in bytes).
+"""
+_METADATA = struct.Struct("<IIiII")
+"""Width, height, size of the path of the next map (in bytes, -1 if none),
+number of gates, number of switches.
+"""
+_GATE = struct.Struct("<IIB")
+"""Position and state (index in GatePosition.State) of a gate.
+"""
+_SWITCH = struct.Struct("<IIBII")
+"""Position, state (index in SwitchPosition.State), number of actions
+when turned on and when turned off of a switch.
+"""
+_ACTION = struct.Struct("<Bii")
+"""Kind (index in Action.Kind) and gate (-1 if none) of an action.
+"""
+_COUNTS = struct.Struct("<II")
+"""Number of grouped blocks, number of groups.
+"""
+_TRAJECTORY = struct.Struct("<II")
+"""Start index and length of a trajectory.
+"""
+
+
+def compiled_path(path: Path) -> Path:
+    """Gives the path of the compiled version of a map.
+
+    Args:
+        path (Path): The path of the map on disk
+
+    Returns:
+        Path: The path of the compiled map
+    """
+    return path.parent / CACHE_DIRECTORY / (path.name + ".bin")
+
+
+def load_compiled(path: Path) -> Map.Data:
+    """Loads a map, from its compiled version if it is up to date (same
+    content hash as the source), compiling it otherwise.
+
+    Args:
+        path (Path): The path of the map on disk
+
+    Returns:
+        Map.Data: The parsed map
+    """
+    source = path.read_bytes()
+    digest = hashlib.sha256(source).digest()
+    compiled = compiled_path(path)
+
+    data = read_compiled(compiled, digest)
+    if data is None:
+        data = Map.parse(source.decode("utf-8"))
+        write_compiled(compiled, digest, data)
+    return data
+
+
+def read_compiled(compiled: Path, digest: bytes) -> Map.Data | None:
+    """Reads a compiled map through mmap, without any text parsing.
+
+    Args:
+        compiled (Path): The path of the compiled map
+        digest (bytes): The sha256 of the source of the map
+
+    Returns:
+        Map.Data | None: The parsed map, None if the compiled map is
+        missing, outdated or invalid
+    """
+    try:
+        with (
+            compiled.open("rb") as file,
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer,
+        ):
+            magic, version, source_digest, width, height, palette_size, header_size = (
+                _HEADER.unpack_from(buffer, 0)
+            )
+            if magic != MAGIC or version != VERSION or source_digest != digest:
+                return None
+            offset = _HEADER.size
+
+            palette = buffer[offset : offset + palette_size].decode("utf-8")
+            offset += palette_size
+            header = buffer[offset : offset + header_size].decode("utf-8")
+            offset += header_size
+            info, offset = _read_metadata(buffer, offset)
+
+            # Each byte of the grid is an index in the palette
+            decode = {i: char for i, char in enumerate(palette)}
+            rows: list[str] = []
+            for _ in range(height):
+                row = buffer[offset : offset + width].decode("latin-1")
+                rows.append(row.translate(decode))
+                offset += width
+
+            labels_count, trajectories_count = _COUNTS.unpack_from(buffer, offset)
+            offset += _COUNTS.size
+            cells = struct.unpack_from(f"<{labels_count}I", buffer, offset)
+            offset += 4 * labels_count
+            groups = struct.unpack_from(f"<{labels_count}I", buffer, offset)
+            offset += 4 * labels_count
+            labels: dict[Position, int] = {
+                (cell % width, cell // width): group
+                for cell, group in zip(cells, groups)
+            }
+
+            trajectories: list[Trajectory] = []
+            for _ in range(trajectories_count):
+                start, length = _TRAJECTORY.unpack_from(buffer, offset)
+                offset += _TRAJECTORY.size
+                values = struct.unpack_from(f"<{2 * length}i", buffer, offset)
+                offset += 8 * length
+                trajectories.append(
+                    Trajectory(list(zip(values[::2], values[1::2])), start)
+                )
+    except (OSError, ValueError, IndexError, struct.error):
+        # Missing or truncated : it will just be compiled again
+        return None
+
+    return Map.Data(
+        header,
+        info,
+        TileArray2D.from_lines(rows, width, height),
+        PathGroups(labels, trajectories),
+    )
+
+
+def write_compiled(compiled: Path, digest: bytes, data: Map.Data) -> None:
+    """Writes the compiled version of a parsed map. Does nothing if the map
+    can not be compiled (more than 256 different tiles) or written.
+
+    Args:
+        compiled (Path): The path of the compiled map
+        digest (bytes): The sha256 of the source of the map
+        data (Map.Data): The parsed map
+    """
+    rows = list(data.array.rows())
+    width = max((len(row) for row in rows), default=0)
+    palette = "".join(sorted(set("".join(rows)) | {" "}))
+    if len(palette) > 256:
+        return
+
+    encode = {ord(char): chr(i) for i, char in enumerate(palette)}
+    palette_bytes = palette.encode("utf-8")
+    header_bytes = data.header.encode("utf-8")
+
+    chunks: list[bytes] = [
+        _HEADER.pack(
+            MAGIC,
+            VERSION,
+            digest,
+            width,
+            len(rows),
+            len(palette_bytes),
+            len(header_bytes),
+        ),
+        palette_bytes,
+        header_bytes,
+        *_write_metadata(data.info),
+    ]
+    for row in rows:
+        chunks.append(row.ljust(width).translate(encode).encode("latin-1"))
+
+    labels = data.groups.labels
+    trajectories = data.groups.trajectories
+    chunks.append(_COUNTS.pack(len(labels), len(trajectories)))
+    chunks.append(
+        struct.pack(f"<{len(labels)}I", *(y * width + x for x, y in labels))
+    )
+    chunks.append(struct.pack(f"<{len(labels)}I", *labels.values()))
+    for trajectory in trajectories:
+        chunks.append(_TRAJECTORY.pack(trajectory.start, len(trajectory)))
+        chunks.append(
+            struct.pack(
+                f"<{2 * len(trajectory)}i",
+                *(value for offset in trajectory.offsets for value in offset),
+            )
+        )
+
+    try:
+        compiled.parent.mkdir(exist_ok=True)
+        # Written next to it then renamed, so that a compiled map is
+        # never read half-written
+        with tempfile.NamedTemporaryFile(
+            dir=compiled.parent, suffix=".tmp", delete=False
+        ) as temporary:
+            temporary.write(b"".join(chunks))
+        os.replace(temporary.name, compiled)
+    except OSError:
+        pass
+
+
+def _read_metadata(buffer: mmap.mmap, offset: int) -> tuple[Map.Metadata, int]:
+    """Reads the metadata of a compiled map, already validated when compiled.
+
+    Args:
+        buffer (mmap.mmap): The compiled map
+        offset (int): Where the metadata starts
+
+    Returns:
+        tuple[Map.Metadata, int]: The metadata, and where it ends
+    """
+    GatePosition = Map.Metadata.GatePosition
+    SwitchPosition = Map.Metadata.SwitchPosition
+    Action = SwitchPosition.Action
+    gate_states = list(GatePosition.State)
+    switch_states = list(SwitchPosition.State)
+    kinds = list(Action.Kind)
+
+    width, height, next_map_size, gates_count, switches_count = (
+        _METADATA.unpack_from(buffer, offset)
+    )
+    offset += _METADATA.size
+    next_map = None
+    if next_map_size >= 0:
+        next_map = buffer[offset : offset + next_map_size].decode("utf-8")
+        offset += next_map_size
+
+    gates: list[Map.Metadata.GatePosition] = []
+    for _ in range(gates_count):
+        x, y, state = _GATE.unpack_from(buffer, offset)
+        offset += _GATE.size
+        gates.append(GatePosition(x, y, gate_states[state]))
+
+    switches: list[Map.Metadata.SwitchPosition] = []
+    for _ in range(switches_count):
+        x, y, state, on_count, off_count = _SWITCH.unpack_from(buffer, offset)
+        offset += _SWITCH.size
+        actions: list[Map.Metadata.SwitchPosition.Action] = []
+        for _ in range(on_count + off_count):
+            kind, gate_x, gate_y = _ACTION.unpack_from(buffer, offset)
+            offset += _ACTION.size
+            actions.append(
+                Action(
+                    kinds[kind],
+                    None if gate_x < 0 else gate_x,
+                    None if gate_y < 0 else gate_y,
+                )
+            )
+        switches.append(
+            SwitchPosition(
+                x, y, switch_states[state], actions[:on_count], actions[on_count:]
+            )
+        )
+
+    return Map.Metadata(width, height, next_map, gates, switches), offset
+
+
+def _write_metadata(info: Map.Metadata) -> list[bytes]:
+    """Compiles the metadata of a map, see _read_metadata.
+
+    Args:
+        info (Map.Metadata): The metadata
+
+    Returns:
+        list[bytes]: The compiled metadata
+    """
+    gate_states = list(Map.Metadata.GatePosition.State)
+    switch_states = list(Map.Metadata.SwitchPosition.State)
+    kinds = list(Map.Metadata.SwitchPosition.Action.Kind)
+
+    next_map = b"" if info.next_map is None else info.next_map.encode("utf-8")
+    chunks = [
+        _METADATA.pack(
+            info.width,
+            info.height,
+            -1 if info.next_map is None else len(next_map),
+            len(info.gates),
+            len(info.switches),
+        ),
+        next_map,
+    ]
+    for gate in info.gates.values():
+        chunks.append(_GATE.pack(gate.x, gate.y, gate_states.index(gate.state)))
+    for switch in info.switches.values():
+        chunks.append(
+            _SWITCH.pack(
+                switch.x,
+                switch.y,
+                switch_states.index(switch.state),
+                len(switch.switch_on),
+                len(switch.switch_off),
+            )
+        )
+        for action in (*switch.switch_on, *switch.switch_off):
+            chunks.append(
+                _ACTION.pack(
+                    kinds.index(action.action),
+                    -1 if action.x is None else action.x,
+                    -1 if action.y is None else action.y,
+                )
+            )
+    return chunks
+
+
+class MapLoader:
+    """Keeps the last loaded maps in memory, evicting the least recently
+    used ones, and prepares maps on a background worker before they are
+    needed (see MapLoader#prefetch).
+    """
+
+    capacity: int
+    """The maximum number of maps kept in memory
+    """
+
+    __cache: OrderedDict[Path, tuple[tuple[int, int], Map.Data]]
+    """The loaded maps with the (mtime, size) of their file when loaded,
+    from least to most recently used
+    """
+    __pending: dict[Path, Future[Map.Data]]
+    """The maps currently being prepared by the worker
+    """
+    __lock: threading.Lock
+    """Guards the cache and the pending maps, shared with the worker
+    """
+    __executor: ThreadPoolExecutor
+    """The background worker
+    """
+
+    def __init__(self, capacity: int = 8) -> None:
+        """Creates an empty loader.
+
+        Args:
+            capacity (int, optional): The maximum number of maps kept in memory. Defaults to 8.
+        """
+        self.capacity = capacity
+        self.__cache = OrderedDict()
+        self.__pending = {}
+        self.__lock = threading.Lock()
+        self.__executor = ThreadPoolExecutor(1, thread_name_prefix="map-loader")
+
+    @staticmethod
+    def __signature(path: Path) -> tuple[int, int]:
+        stat = path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @property
+    def cached(self) -> list[Path]:
+        """The maps currently in memory, from least to most recently used
+        """
+        with self.__lock:
+            return list(self.__cache)
+
+    def __get(self, path: Path) -> Map.Data | None:
+        """Returns the map if it is in memory and its file did not change."""
+        with self.__lock:
+            entry = self.__cache.get(path)
+            if entry is None or entry[0] != self.__signature(path):
+                return None
+            self.__cache.move_to_end(path)
+            return entry[1]
+
+    def __put(self, path: Path, signature: tuple[int, int], data: Map.Data) -> None:
+        with self.__lock:
+            self.__cache[path] = (signature, data)
+            self.__cache.move_to_end(path)
+            while len(self.__cache) > self.capacity:
+                self.__cache.popitem(last=False)
+
+    def __load(self, path: Path) -> Map.Data:
+        signature = self.__signature(path)
+        data = load_compiled(path)
+        self.__put(path, signature, data)
+        return data
+
+    def load(self, path: Path) -> Map.Data:
+        """Loads a map, from memory if it was already loaded or prepared,
+        waiting for the worker if it is being prepared.
+
+        Args:
+            path (Path): The path of the map on disk
+
+        Returns:
+            Map.Data: The parsed map
+        """
+        with self.__lock:
+            pending = self.__pending.get(path)
+        if pending is not None:
+            try:
+                return pending.result()
+            except Exception:
+                pass  # Loaded again below, to raise the error here
+
+        data = self.__get(path)
+        if data is not None:
+            return data
+        return self.__load(path)
+
+    def load_async(self, path: Path) -> Future[Map.Data]:
+        """Loads a map on the background worker.
+
+        Args:
+            path (Path): The path of the map on disk
+
+        Returns:
+            Future[Map.Data]: The parsed map, already done if it was in memory
+        """
+        data = self.__get(path) if path.exists() else None
+        if data is not None:
+            done: Future[Map.Data] = Future()
+            done.set_result(data)
+            return done
+
+        with self.__lock:
+            pending = self.__pending.get(path)
+            if pending is not None:
+                return pending
+            future = self.__executor.submit(self.__load, path)
+            self.__pending[path] = future
+
+        def forget(_: Future[Map.Data]) -> None:
+            with self.__lock:
+                if self.__pending.get(path) is future:
+                    del self.__pending[path]
+
+        future.add_done_callback(forget)
+        return future
+
+    def prefetch(self, path: Path) -> None:
+        """Starts preparing a map on the background worker, if it is not
+        in memory already.
+
+        Args:
+            path (Path): The path of the map on disk
+        """
+        if path.exists():
+            self.load_async(path)
+
+
+LOADER = MapLoader()
+"""The map loader shared by all the maps.
+"""
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import math
+import struct
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Protocol
+
+MAGIC = b"ICCREC"
+"""The first bytes of every recording.
+"""
+VERSION = 2
+"""The version of the recording format.
+"""
+
+EVENTS = (
+    "on_key_press",
+    "on_key_release",
+    "on_mouse_press",
+    "on_mouse_release",
+    "on_mouse_motion",
+)
+"""The recorded input events, by kind (their index in the file).
+"""
+CAMERA_EVENT = "on_camera_move"
+"""The recorded moves of the camera, after the input events in the file.
+The view decides what is streamed around it, and where the mouse points
+to in the world : it is recorded with the input.
+"""
+
+_HEADER = struct.Struct("<6sHdqdH")
+"""Magic, version, tick rate, seed, activation radius (NaN if None) and
+size of the path of the map (in bytes).
+"""
+_EVENT = struct.Struct("<IB")
+"""Tick and kind of an event, followed by its arguments.
+"""
+_INPUT = struct.Struct("<4i")
+"""The (up to 4, zero-padded) arguments of an input event.
+"""
+_CAMERA = struct.Struct("<4d")
+"""The position and size of the view of a camera event.
+"""
+
+
+class InputHandler(Protocol):
+    """What receives the recorded events : a Simulation."""
+
+    def on_key_press(self, symbol: int, modifiers: int) -> None: ...
+
+    def on_key_release(self, symbol: int, modifiers: int) -> None: ...
+
+    def on_mouse_press(self, x: int, y: int, button: int, modifiers: int) -> None: ...
+
+    def on_mouse_release(
+        self, x: int, y: int, button: int, modifiers: int
+    ) -> None: ...
+
+    def on_mouse_motion(self, x: int, y: int, dx: int, dy: int) -> None: ...
+
+    def on_camera_move(self, x: float, y: float, width: float, height: float) -> None: ...
+
+
+class Recording:
+    """The input events and camera moves of a game session, with the index
+    of the tick (see GameView#tick_rate) before which each of them happened.
+    Along with the first map, the seed of the game (see Map#random) and its
+    activation radius, it is enough to play the session again, see
+    Recording#replay.
+    """
+
+    map: str
+    """The path of the first map, starting from the "assets/maps" folder
+    """
+    tick_rate: float
+    """The tick rate of the session
+    """
+    seed: int
+    """The seed of the random numbers of the maps of the session
+    """
+    activation_radius: float | None
+    """The activation radius of the maps of the session, see Map#activation_radius
+    """
+    events: list[tuple[int, str, tuple[float, ...]]]
+    """The (tick, event, arguments) of every event, by tick
+    """
+
+    def __init__(
+        self,
+        map: str,
+        tick_rate: float,
+        seed: int,
+        activation_radius: float | None = None,
+    ) -> None:
+        """Creates an empty recording.
+
+        Args:
+            map (str): The path of the first map, starting from the "assets/maps" folder
+            tick_rate (float): The tick rate of the session
+            seed (int): The seed of the random numbers of the maps of the session
+            activation_radius (float | None, optional): The activation radius of the
+            maps of the session. Defaults to None (always active).
+        """
+        self.map = map
+        self.tick_rate = tick_rate
+        self.seed = seed
+        self.activation_radius = activation_radius
+        self.events = []
+
+    def add(self, tick: int, event: str, *args: float) -> None:
+        """Records an event.
+
+        Args:
+            tick (int): The index of the next tick
+            event (str): The name of the handler of the event, see EVENTS
+            and CAMERA_EVENT
+            *args (float): The arguments of the handler
+        """
+        self.events.append((tick, event, args))
+
+    @property
+    def ticks(self) -> int:
+        """The number of ticks up to the last event (included)
+        """
+        return self.events[-1][0] + 1 if self.events else 0
+
+    def save(self, path: Path) -> None:
+        """Writes the recording, a few bytes per event.
+
+        Args:
+            path (Path): The path of the file
+        """
+        map_bytes = self.map.encode("utf-8")
+        radius = math.nan if self.activation_radius is None else self.activation_radius
+        chunks = [
+            _HEADER.pack(
+                MAGIC, VERSION, self.tick_rate, self.seed, radius, len(map_bytes)
+            ),
+            map_bytes,
+        ]
+        for tick, event, args in self.events:
+            if event == CAMERA_EVENT:
+                chunks.append(_EVENT.pack(tick, len(EVENTS)))
+                chunks.append(_CAMERA.pack(*args))
+                continue
+            chunks.append(_EVENT.pack(tick, EVENTS.index(event)))
+            chunks.append(_INPUT.pack(*map(int, args), *(0,) * (4 - len(args))))
+        path.write_bytes(b"".join(chunks))
+
+    @staticmethod
+    def load(path: Path) -> Recording:
+        """Reads a recording.
+
+        Args:
+            path (Path): The path of the file
+
+        Raises:
+            ValueError: The file is not a recording (of this version), or is truncated
+
+        Returns:
+            Recording: The recording
+        """
+        buffer = path.read_bytes()
+        try:
+            magic, version, tick_rate, seed, radius, map_size = _HEADER.unpack_from(
+                buffer
+            )
+        except struct.error as error:
+            raise ValueError(f"'{path}' is not a recording") from error
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{path}' is not a recording of version {VERSION}")
+
+        offset = _HEADER.size
+        recording = Recording(
+            buffer[offset : offset + map_size].decode("utf-8"),
+            tick_rate,
+            seed,
+            None if math.isnan(radius) else radius,
+        )
+        offset += map_size
+        try:
+            while offset < len(buffer):
+                tick, kind = _EVENT.unpack_from(buffer, offset)
+                offset += _EVENT.size
+                if kind == len(EVENTS):
+                    camera = _CAMERA.unpack_from(buffer, offset)
+                    offset += _CAMERA.size
+                    recording.add(tick, CAMERA_EVENT, *camera)
+                    continue
+
+                event = EVENTS[kind]
+                args = _INPUT.unpack_from(buffer, offset)
+                offset += _INPUT.size
+                # Key events only have two arguments
+                arity = 2 if event in ("on_key_press", "on_key_release") else 4
+                recording.add(tick, event, *args[:arity])
+        except (struct.error, IndexError) as error:
+            raise ValueError(f"'{path}' is a truncated recording") from error
+        return recording
+
+    def replay(
+        self, handler: InputHandler, step: Callable[[], None], ticks: int | None = None
+    ) -> list[float]:
+        """Plays the recording again : before every tick, the events of
+        that tick are given to the handler.
+
+        Args:
+            handler (InputHandler): The game receiving the events
+            step (Callable[[], None]): Simulates one tick of the game, with
+            a delta time of 1 / tick_rate
+            ticks (int | None, optional): The number of ticks to play. Defaults
+            to None (up to the last event).
+
+        Returns:
+            list[float]: The time (in seconds) every tick took, events included
+        """
+        durations: list[float] = []
+        events = self.__events()
+        pending = next(events, None)
+        for tick in range(self.ticks if ticks is None else ticks):
+            start = time.perf_counter()
+            while pending is not None and pending[0] == tick:
+                getattr(handler, pending[1])(*pending[2])
+                pending = next(events, None)
+            step()
+            durations.append(time.perf_counter() - start)
+        return durations
+
+    def __events(self) -> Iterator[tuple[int, str, tuple[float, ...]]]:
+        return iter(sorted(self.events, key=lambda event: event[0]))
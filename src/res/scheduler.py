@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import time
+import typing
+from typing import Iterable
+
+if typing.TYPE_CHECKING:
+    from src.entities.gameobject import GameObject
+
+
+class UpdateScheduler:
+    """Updates gameobjects at their own rate (see GameObject#update_rate)
+    instead of every tick, giving them the time elapsed since their last
+    update. Within a frame budget, the objects having a rate are the low
+    priority ones : when the frame runs over, they wait for a later tick.
+    """
+
+    __elapsed: dict[GameObject, float]
+    """The time (in seconds) since the last update of every object
+    having a rate
+    """
+    __deferred: int
+    """The number of objects that were due but deferred, on the last update
+    """
+
+    def __init__(self) -> None:
+        """Creates a scheduler. An object having a rate is first updated
+        once its period went by, from the first tick it was seen at."""
+        self.__elapsed = {}
+        self.__deferred = 0
+
+    @property
+    def deferred(self) -> int:
+        """The number of objects that were due but deferred, on the last update
+        """
+        return self.__deferred
+
+    def forget(self, object: GameObject) -> None:
+        """Stops tracking an object, when it is destroyed.
+
+        Args:
+            object (GameObject): The object
+        """
+        self.__elapsed.pop(object, None)
+
+    def update(
+        self,
+        objects: Iterable[GameObject],
+        delta_time: float,
+        deadline: float | None = None,
+    ) -> None:
+        """Updates, for one tick, the objects updated every tick and the
+        ones whose rate is due. The due ones are updated from the longest
+        waiting, so that none is deferred forever.
+
+        Args:
+            objects (Iterable[GameObject]): The objects of the map
+            delta_time (float): The time of a tick, in seconds
+            deadline (float | None, optional): The time (see time.perf_counter)
+            after which the due objects are deferred. Defaults to None (never).
+        """
+        due: list[tuple[float, GameObject]] = []
+        for object in list(objects):
+            if object.is_destroyed:
+                continue  # Destroyed by an object updated before it
+            rate = object.update_rate
+            if rate is None:
+                object.update(delta_time)
+                continue
+
+            elapsed = self.__elapsed.get(object, 0) + delta_time
+            # Tolerates the rounding of the sum of the ticks
+            if elapsed * rate < 1 - 1e-6:
+                self.__elapsed[object] = elapsed
+            else:
+                due.append((elapsed, object))
+
+        due.sort(key=lambda waiting: waiting[0], reverse=True)
+        self.__deferred = 0
+        for i, (elapsed, object) in enumerate(due):
+            if deadline is not None and time.perf_counter() > deadline:
+                self.__deferred = len(due) - i
+                self.__elapsed.update((object, elapsed) for elapsed, object in due[i:])
+                return
+
+            if object.is_destroyed:
+                continue  # Destroyed by an object updated before it
+            self.__elapsed[object] = 0
+            object.update(elapsed)
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import math
+import typing
+from typing import Callable, Iterator
+
+import arcade
+
+from src.res.array2d import Position
+
+if typing.TYPE_CHECKING:
+    from src.entities.gameobject import GameObject
+
+
+class ChunkStreamer:
+    """Streams cells of a map by square chunks : only the chunks around
+    the camera exist as gameobjects, the others are just kept as
+    (representation, position) records.
+    """
+
+    chunk_size: int
+    """The size of a chunk, in cells
+    """
+    margin: int
+    """How many chunks around the view are kept loaded
+    """
+
+    __cell_size: int
+    """The size of a cell, in pixels
+    """
+    __create: Callable[[str, Position], GameObject]
+    """Creates the gameobject of a cell
+    """
+    __destroy: Callable[[GameObject], None]
+    """Removes the gameobject of a cell from the map
+    """
+    __chunks: dict[Position, list[tuple[str, Position]]]
+    """The cells of every chunk, by chunk coordinate
+    """
+    __loaded: dict[Position, list[GameObject]]
+    """The gameobjects of the currently loaded chunks
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        cell_size: int,
+        create: Callable[[str, Position], GameObject],
+        destroy: Callable[[GameObject], None],
+        margin: int = 1,
+    ) -> None:
+        """Creates an empty streamer.
+
+        Args:
+            chunk_size (int): The size of a chunk, in cells
+            cell_size (int): The size of a cell, in pixels
+            create (Callable[[str, Position], GameObject]): Creates (and adds to the map)
+            the gameobject of a cell
+            destroy (Callable[[GameObject], None]): Removes a gameobject from the map
+            margin (int, optional): How many chunks around the view are kept loaded. Defaults to 1.
+        """
+        self.chunk_size = chunk_size
+        self.margin = margin
+        self.__cell_size = cell_size
+        self.__create = create
+        self.__destroy = destroy
+        self.__chunks = {}
+        self.__loaded = {}
+
+    def add(self, char: str, pos: Position) -> None:
+        """Registers a cell to be streamed.
+
+        Args:
+            char (str): The representation of the cell
+            pos (Position): The position of the cell, in map coordinates
+        """
+        chunk = (pos[0] // self.chunk_size, pos[1] // self.chunk_size)
+        self.__chunks.setdefault(chunk, []).append((char, pos))
+
+    @property
+    def reach(self) -> int:
+        """How far around the view the terrain is always loaded, in pixels
+        """
+        return self.margin * self.chunk_size * self.__cell_size
+
+    @property
+    def loaded_chunks(self) -> set[Position]:
+        """The coordinates of the currently loaded chunks
+        """
+        return set(self.__loaded)
+
+    def chunks_around(self, view: arcade.types.Rect, margin: int) -> set[Position]:
+        """The chunks intersecting with a view, in world coordinates,
+        with a margin in chunks.
+
+        Args:
+            view (arcade.types.Rect): The view in world coordinates
+            margin (int): The number of additional chunks around the view
+
+        Returns:
+            set[Position]: The chunk coordinates
+        """
+        size = self.chunk_size * self.__cell_size
+        left = math.floor(view.left / size) - margin
+        right = math.floor(view.right / size) + margin
+        bottom = math.floor(view.bottom / size) - margin
+        top = math.floor(view.top / size) + margin
+        return {
+            (x, y)
+            for x in range(left, right + 1)
+            for y in range(bottom, top + 1)
+            if (x, y) in self.__chunks
+        }
+
+    def update(self, view: arcade.types.Rect) -> None:
+        """Loads the chunks within the margin of the view, and unloads the
+        ones that went further than one more chunk (so that moving back and
+        forth on a chunk border does not reload it every frame).
+
+        Args:
+            view (arcade.types.Rect): The view (camera), in world coordinates
+        """
+        for chunk in self.chunks_around(view, self.margin) - self.__loaded.keys():
+            self.__loaded[chunk] = [
+                self.__create(char, pos) for char, pos in self.__chunks[chunk]
+            ]
+
+        kept = self.chunks_around(view, self.margin + 1)
+        for chunk in self.__loaded.keys() - kept:
+            for object in self.__loaded.pop(chunk):
+                self.__destroy(object)
+
+
+class EntityActivator:
+    """Activates entities only around the camera. Entities start as spawn
+    (representation, position) records, are created when the camera comes
+    within the activation radius, and are put to sleep (kept, but neither
+    updated nor drawn) once they are far away again.
+    """
+
+    radius: float
+    """How far around the view entities are active, in pixels
+    """
+
+    __cell_size: int
+    """The size of a cell, in pixels
+    """
+    __create: Callable[[str, Position], list[GameObject]]
+    """Creates (and adds to the map) the gameobjects of a spawn record
+    """
+    __sleep: Callable[[GameObject], None]
+    """Removes an entity from the updated objects of the map
+    """
+    __wake: Callable[[GameObject], None]
+    """Adds a sleeping entity back to the updated objects of the map
+    """
+    __records: dict[Position, list[tuple[str, Position]]]
+    """The spawn records not created yet, by bucket
+    """
+    __sleeping: dict[Position, list[GameObject]]
+    """The sleeping entities, by bucket of their position when put to sleep
+    """
+    __active: dict[GameObject, None]
+    """The active entities, in the order they were activated : the order
+    they are put to sleep and woken up in, which must not depend on the
+    process for a replay to be the same (see Recording)
+    """
+
+    def __init__(
+        self,
+        radius: float,
+        cell_size: int,
+        create: Callable[[str, Position], list[GameObject]],
+        sleep: Callable[[GameObject], None],
+        wake: Callable[[GameObject], None],
+    ) -> None:
+        """Creates an activator without any entity.
+
+        Args:
+            radius (float): How far around the view entities are active, in pixels
+            cell_size (int): The size of a cell, in pixels
+            create (Callable[[str, Position], list[GameObject]]): Creates (and adds
+            to the map) the gameobjects of a spawn record
+            sleep (Callable[[GameObject], None]): Removes an entity from the updated objects
+            wake (Callable[[GameObject], None]): Adds a sleeping entity back to the updated objects
+        """
+        self.radius = radius
+        self.__cell_size = cell_size
+        self.__create = create
+        self.__sleep = sleep
+        self.__wake = wake
+        self.__records = {}
+        self.__sleeping = {}
+        self.__active = {}
+
+    def __bucket(self, x: float, y: float) -> Position:
+        # Buckets as large as the radius : only a few around the view
+        return (math.floor(x / self.radius), math.floor(y / self.radius))
+
+    def __buckets(self, area: arcade.types.Rect) -> Iterator[Position]:
+        left, bottom = self.__bucket(area.left, area.bottom)
+        right, top = self.__bucket(area.right, area.top)
+        for x in range(left, right + 1):
+            for y in range(bottom, top + 1):
+                yield (x, y)
+
+    def add(self, char: str, pos: Position) -> None:
+        """Registers the spawn record of an entity.
+
+        Args:
+            char (str): The representation of the entity
+            pos (Position): The position of the entity, in map coordinates
+        """
+        bucket = self.__bucket(pos[0] * self.__cell_size, pos[1] * self.__cell_size)
+        self.__records.setdefault(bucket, []).append((char, pos))
+
+    def remove(self, pos: Position) -> None:
+        """Removes the spawn records of a cell, if not created yet.
+
+        Args:
+            pos (Position): The position of the cell, in map coordinates
+        """
+        bucket = self.__bucket(pos[0] * self.__cell_size, pos[1] * self.__cell_size)
+        records = self.__records.get(bucket)
+        if records:
+            self.__records[bucket] = [record for record in records if record[1] != pos]
+
+    def forget(self, object: GameObject) -> None:
+        """Stops tracking an entity, when it is destroyed.
+
+        Args:
+            object (GameObject): The entity
+        """
+        if object in self.__active:
+            del self.__active[object]
+            return
+
+        # Not updated while sleeping : still in the bucket of its position
+        sleeping = self.__sleeping.get(self.__bucket(*object.position))
+        if sleeping and object in sleeping:
+            sleeping.remove(object)
+
+    @property
+    def active(self) -> list[GameObject]:
+        """The active entities, in the order they were activated
+        """
+        return list(self.__active)
+
+    @property
+    def pending(self) -> int:
+        """The number of spawn records not created yet
+        """
+        return sum(len(records) for records in self.__records.values())
+
+    @property
+    def sleeping(self) -> int:
+        """The number of sleeping entities
+        """
+        return sum(len(objects) for objects in self.__sleeping.values())
+
+    def update(self, view: arcade.types.Rect) -> None:
+        """Creates or wakes the entities within the radius of the view, and
+        puts to sleep the active ones that went further than twice the
+        radius (so that they do not flicker on the border).
+
+        Args:
+            view (arcade.types.Rect): The view (camera), in world coordinates
+        """
+        near = arcade.types.LRBT(
+            view.left - self.radius,
+            view.right + self.radius,
+            view.bottom - self.radius,
+            view.top + self.radius,
+        )
+        far = arcade.types.LRBT(
+            view.left - 2 * self.radius,
+            view.right + 2 * self.radius,
+            view.bottom - 2 * self.radius,
+            view.top + 2 * self.radius,
+        )
+
+        for bucket in self.__buckets(near):
+            records = self.__records.get(bucket)
+            if records:
+                remaining: list[tuple[str, Position]] = []
+                for char, pos in records:
+                    x, y = pos[0] * self.__cell_size, pos[1] * self.__cell_size
+                    if near.point_in_rect((x, y)):
+                        self.__active.update(
+                            (object, None) for object in self.__create(char, pos)
+                        )
+                    else:
+                        remaining.append((char, pos))
+                if remaining:
+                    self.__records[bucket] = remaining
+                else:
+                    del self.__records[bucket]
+
+            sleeping = self.__sleeping.get(bucket)
+            if sleeping:
+                asleep: list[GameObject] = []
+                for object in sleeping:
+                    if near.point_in_rect(object.position):
+                        self.__wake(object)
+                        self.__active[object] = None
+                    else:
+                        asleep.append(object)
+                if asleep:
+                    self.__sleeping[bucket] = asleep
+                else:
+                    del self.__sleeping[bucket]
+
+        for object in [o for o in self.__active if not far.point_in_rect(o.position)]:
+            del self.__active[object]
+            self.__sleep(object)
+            self.__sleeping.setdefault(self.__bucket(*object.position), []).append(
+                object
+            )
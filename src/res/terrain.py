@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import math
+import typing
+from typing import Iterator
+
+import arcade
+
+from src.res.array2d import Position
+
+if typing.TYPE_CHECKING:
+    from src.entities.gameobject import GameObject
+
+
+class TerrainGrid:
+    """The occupancy grid of the static terrain (walls, closed gates), by
+    cell of the map. The terrain being aligned to the grid, finding the
+    blocks around a point, a rect or a sprite only takes a few cell lookups,
+    and the blocks never have to be rehashed as nothing moves.
+    """
+
+    cell_size: int
+    """The size of a cell, in pixels
+    """
+
+    __cells: dict[Position, list[GameObject]]
+    """The blocks overlapping every occupied cell
+    """
+    __occupied: dict[GameObject, list[Position]]
+    """The cells every block overlaps, to remove it
+    """
+
+    def __init__(self, cell_size: int) -> None:
+        """Creates an empty grid.
+
+        Args:
+            cell_size (int): The size of a cell, in pixels
+        """
+        self.cell_size = cell_size
+        self.__cells = {}
+        self.__occupied = {}
+
+    def __len__(self) -> int:
+        return len(self.__occupied)
+
+    def __cell(self, x: float, y: float) -> Position:
+        # Cells are centered on their map coordinate times the cell size
+        half = self.cell_size / 2
+        return (
+            math.floor((x + half) / self.cell_size),
+            math.floor((y + half) / self.cell_size),
+        )
+
+    def __range(self, area: arcade.types.Rect) -> Iterator[Position]:
+        left, bottom = self.__cell(area.left, area.bottom)
+        right, top = self.__cell(area.right, area.top)
+        for x in range(left, right + 1):
+            for y in range(bottom, top + 1):
+                yield (x, y)
+
+    def add(self, block: GameObject) -> None:
+        """Adds a block, in all the cells its hit box overlaps.
+
+        Args:
+            block (GameObject): The block, that must not move while in the grid
+        """
+        # A block filling its cell exactly only touches the next ones
+        epsilon = 1e-6
+        cells = list(
+            self.__range(
+                arcade.types.LRBT(
+                    block.left, block.right - epsilon, block.bottom, block.top - epsilon
+                )
+            )
+        )
+        self.__occupied[block] = cells
+        for cell in cells:
+            self.__cells.setdefault(cell, []).append(block)
+
+    def remove(self, block: GameObject) -> None:
+        """Removes a block, if in the grid.
+
+        Args:
+            block (GameObject): The block
+        """
+        for cell in self.__occupied.pop(block, ()):
+            blocks = self.__cells[cell]
+            blocks.remove(block)
+            if not blocks:
+                del self.__cells[cell]
+
+    def at_point(self, point: arcade.types.Point2) -> list[GameObject]:
+        """The blocks containing a point.
+
+        Args:
+            point (arcade.types.Point2): The point, in world coordinates
+
+        Returns:
+            list[GameObject]: The blocks
+        """
+        return [
+            block
+            for block in self.__cells.get(self.__cell(*point), ())
+            if block.collides_with_point(point)
+        ]
+
+    def in_rect(self, area: arcade.types.Rect) -> list[GameObject]:
+        """The blocks whose cells overlap a rect : a broadphase, the hit
+        boxes of the blocks are not checked.
+
+        Args:
+            area (arcade.types.Rect): The rect, in world coordinates
+
+        Returns:
+            list[GameObject]: The blocks, each listed once
+        """
+        blocks: dict[GameObject, None] = {}
+        for cell in self.__range(area):
+            for block in self.__cells.get(cell, ()):
+                blocks[block] = None
+        return list(blocks)
+
+    def near(self, sprite: arcade.BasicSprite) -> list[GameObject]:
+        """The blocks whose cells overlap the hit box of a sprite, see
+        TerrainGrid#in_rect.
+
+        Args:
+            sprite (arcade.BasicSprite): The sprite
+
+        Returns:
+            list[GameObject]: The blocks, each listed once
+        """
+        return self.in_rect(sprite.rect)
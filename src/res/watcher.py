@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+
+class MapWatcher:
+    """Watches a directory of maps for edits, by polling the modification
+    time and size of its files every few seconds (no OS-specific API).
+    """
+
+    directory: Path
+    """The watched directory
+    """
+    interval: float
+    """The time between two polls, in seconds
+    """
+
+    __pattern: str
+    """The glob pattern of the watched files
+    """
+    __elapsed: float
+    """The time since the last poll, in seconds
+    """
+    __signatures: dict[Path, tuple[int, int]]
+    """The (mtime, size) of every watched file at the last poll
+    """
+
+    def __init__(
+        self, directory: Path, interval: float = 0.5, pattern: str = "*.txt"
+    ) -> None:
+        """Starts watching a directory. The files already there are not
+        considered changed.
+
+        Args:
+            directory (Path): The directory to watch
+            interval (float, optional): The time between two polls, in seconds. Defaults to 0.5.
+            pattern (str, optional): The glob pattern of the watched files. Defaults to "*.txt".
+        """
+        self.directory = directory
+        self.interval = interval
+        self.__pattern = pattern
+        self.__elapsed = 0
+        self.__signatures = self.__scan()
+
+    def __scan(self) -> dict[Path, tuple[int, int]]:
+        signatures: dict[Path, tuple[int, int]] = {}
+        for path in self.directory.glob(self.__pattern):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Removed (or being replaced) while scanning
+            signatures[path.resolve()] = (stat.st_mtime_ns, stat.st_size)
+        return signatures
+
+    def changes(self) -> list[Path]:
+        """Polls the directory right away.
+
+        Returns:
+            list[Path]: The (resolved) files created or modified since the last poll
+        """
+        self.__elapsed = 0
+        signatures = self.__scan()
+        changed = [
+            path
+            for path, signature in signatures.items()
+            if self.__signatures.get(path) != signature
+        ]
+        self.__signatures = signatures
+        return changed
+
+    def poll(self, delta_time: float) -> list[Path]:
+        """Polls the directory if the interval elapsed, to be called every frame.
+
+        Args:
+            delta_time (float): The time since the last call, in seconds
+
+        Returns:
+            list[Path]: The (resolved) files created or modified since the last poll
+        """
+        self.__elapsed += delta_time
+        if self.__elapsed < self.interval:
+            return []
+        return self.changes()
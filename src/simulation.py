@@ -0,0 +1,240 @@
+"""Runs the game without any window, GL context or audio device, as fast
+as the CPU allows : for gameplay simulations, bots and benchmarks on
+machines without display.
+
+Should be imported before arcade (so before anything else of the game) :
+
+    from src.simulation import Simulation
+
+    simulation = Simulation("map1.txt")
+    simulation.on_key_press(arcade.key.RIGHT, 0)
+    simulation.run(10)
+
+Or from the command line : `python -m src.simulation map1.txt --seconds 60`,
+or `python -m src.simulation --replay session.rec` to play a recording
+again (see src.res.replay) and profile its ticks.
+"""
+
+import argparse
+import math
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pyglet
+
+# Without display : no (shadow) window, and so no GL context, is created when
+# arcade is imported, and sounds are played on the silent driver. Too late
+# (and not wanted) when a real window already imported arcade.
+if "arcade" not in sys.modules:
+    pyglet.options["shadow_window"] = False
+    pyglet.options["audio"] = ("silent",)
+
+import arcade
+
+from src.res.camera import HeadlessCamera
+from src.res.map import Map
+from src.res.replay import Recording
+
+
+class Simulation:
+    """Stands in for the GameView (see src.res.map.Game) : updates a map by
+    fixed ticks, without drawing it. Input is given through the same event
+    handlers as the GameView.
+    """
+
+    map: Map
+    """The simulated map
+    """
+    camera: HeadlessCamera
+    """The camera, for the streaming of the map and the aiming of the weapons.
+    It follows the player, unless moved by a recording (see
+    Simulation#on_camera_move).
+    """
+    follows_player: bool
+    """Whether the camera is moved onto the player at every tick, instead
+    of by the recording being replayed
+    """
+    score: int
+    """The current score of the player, saved
+    between maps.
+    """
+    tick_rate: float
+    """How many ticks are simulated per second of game time
+    """
+    ticks: int
+    """The number of ticks simulated so far
+    """
+
+    TICK_RATE = 60
+    """The default tick rate, the one of the GameView
+    """
+    VIEW_SIZE = (1280, 720)
+    """The size (in pixels) of the view of the camera, the one of the window of the game
+    """
+
+    def __init__(
+        self,
+        path: str = "map1.txt",
+        tick_rate: float = TICK_RATE,
+        activation_radius: float | None = None,
+        seed: int | None = None,
+    ) -> None:
+        """Loads a map to simulate.
+
+        Args:
+            path (str, optional): The path of the map, starting from the "assets/maps"
+            folder. Defaults to "map1.txt".
+            tick_rate (float, optional): How many ticks per second of game time.
+            Defaults to TICK_RATE.
+            activation_radius (float | None, optional): See Map#activation_radius.
+            Defaults to None (always active).
+            seed (int | None, optional): See Map#random. Defaults to None (seeded by
+            the system).
+        """
+        self.score = 0
+        self.ticks = 0
+        self.tick_rate = tick_rate
+        self.camera = HeadlessCamera(*self.VIEW_SIZE)
+        self.follows_player = True
+        self.map = Map([self], path, activation_radius=activation_radius, seed=seed)
+        self.camera.position = arcade.Vec2(*self.map.player.position)
+
+    def load(self, full_map_str: str) -> None:
+        """Replaces the map by one given as a string, see Map#force_load_map."""
+        self.map.force_load_map(full_map_str)
+        self.camera.position = arcade.Vec2(*self.map.player.position)
+
+    def step(self, ticks: int = 1) -> None:
+        """Simulates some ticks. A change of maps is completed before the
+        next tick, or the next event, after the tick it started in.
+
+        Args:
+            ticks (int, optional): The number of ticks. Defaults to 1.
+        """
+        delta_time = 1 / self.tick_rate
+        for _ in range(ticks):
+            self.__finish_transition()
+            self.map.update(delta_time)
+            if self.follows_player:
+                self.camera.position = arcade.Vec2(*self.map.player.position)
+                self.map.stream(self.camera.aabb())
+            self.ticks += 1
+
+    def __finish_transition(self) -> None:
+        """Completes the change of maps started by the last tick, if any."""
+        while not self.map.step_transition(math.inf):
+            time.sleep(0.001)  # Waiting for the background loader
+
+    def run(self, seconds: float) -> None:
+        """Simulates some game time, as fast as possible.
+
+        Args:
+            seconds (float): The game time, in seconds
+        """
+        self.step(round(seconds * self.tick_rate))
+
+    @staticmethod
+    def replay(recording: Recording, ticks: int | None = None) -> list[float]:
+        """Plays a recording again (see Recording#replay), on the map, tick rate,
+        seed and activation radius it was recorded with.
+
+        Args:
+            recording (Recording): The recording
+            ticks (int | None, optional): The number of ticks to play. Defaults
+            to None (up to the last event).
+
+        Returns:
+            list[float]: The time (in seconds) every tick took
+        """
+        simulation = Simulation(
+            recording.map,
+            recording.tick_rate,
+            recording.activation_radius,
+            recording.seed,
+        )
+        return recording.replay(simulation, simulation.step, ticks)
+
+    def on_key_press(self, symbol: int, modifiers: int) -> None:
+        """See GameView#on_key_press"""
+        self.__finish_transition()
+        for listeners in self.map.listeners("on_key_press"):
+            listeners.on_key_press(symbol, modifiers)
+
+    def on_key_release(self, symbol: int, modifiers: int) -> None:
+        """See GameView#on_key_release"""
+        self.__finish_transition()
+        for listeners in self.map.listeners("on_key_release"):
+            listeners.on_key_release(symbol, modifiers)
+
+    def on_mouse_press(self, x: int, y: int, button: int, modifiers: int) -> None:
+        """See GameView#on_mouse_press"""
+        self.__finish_transition()
+        for listeners in self.map.listeners("on_mouse_press"):
+            listeners.on_mouse_press(x, y, button, modifiers)
+
+    def on_mouse_release(self, x: int, y: int, button: int, modifiers: int) -> None:
+        """See GameView#on_mouse_release"""
+        self.__finish_transition()
+        for listeners in self.map.listeners("on_mouse_release"):
+            listeners.on_mouse_release(x, y, button, modifiers)
+
+    def on_mouse_motion(self, x: int, y: int, dx: int, dy: int) -> None:
+        """See GameView#on_mouse_motion"""
+        self.__finish_transition()
+        for listeners in self.map.listeners("on_mouse_motion"):
+            listeners.on_mouse_motion(x, y, dx, dy)
+
+    def on_camera_move(self, x: float, y: float, width: float, height: float) -> None:
+        """Moves the camera as it moved in a recorded game, streaming the map
+        around it : the camera stops following the player.
+
+        Args:
+            x (float): The center of the view, in x
+            y (float): The center of the view, in y
+            width (float): The width of the view, in pixels
+            height (float): The height of the view, in pixels
+        """
+        self.__finish_transition()
+        self.follows_player = False
+        self.camera.position = arcade.Vec2(x, y)
+        self.camera.width = width
+        self.camera.height = height
+        self.map.stream(self.camera.aabb())
+
+
+def main() -> None:
+    """Simulates a map without input (or replays a recording), printing
+    how fast it ran."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("map", nargs="?", default="map1.txt")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--tick-rate", type=float, default=Simulation.TICK_RATE)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--replay", type=Path, default=None)
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        durations = Simulation.replay(Recording.load(args.replay))
+        quantiles = statistics.quantiles(durations, n=100)
+        print(
+            f"{len(durations)} ticks in {sum(durations):.3f}s : "
+            f"mean {statistics.fmean(durations) * 1000:.3f}ms, "
+            f"p50 {quantiles[49] * 1000:.3f}ms, p95 {quantiles[94] * 1000:.3f}ms, "
+            f"max {max(durations) * 1000:.3f}ms"
+        )
+        return
+
+    simulation = Simulation(args.map, args.tick_rate, seed=args.seed)
+    start = time.perf_counter()
+    simulation.run(args.seconds)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{simulation.ticks} ticks in {elapsed:.3f}s "
+        f"({args.seconds / elapsed:.1f}x real time), score {simulation.score}"
+    )
+
+
+if __name__ == "__main__":
+    main()
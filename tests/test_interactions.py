@@ -2,8 +2,22 @@ import textwrap
 from typing import Any, Iterable, Iterator
 
 import arcade
+import pytest
+from arcade.sprite_list.spatial_hash import SpatialHash
 
 from src.gameview import GameView
+from src.entities.coin import Coin
+from src.entities.gameobject import DamageSource, GameObject
+from src.entities.monster import Bat, Monster, Slime
+from src.entities.wall import CHAR_INFO, Lava
+from src.res.map import Layer
+
+
+def get_first_of_type[T](tp: type[T], objects: Iterator[GameObject]) -> T:
+    for obj in objects:
+        if isinstance(obj, tp):
+            return obj
+    assert False
 
 
 def iter_count(iter: Iterator[Any] | Iterable[Any]) -> int:
@@ -88,3 +102,333 @@ def test_next_map(window: arcade.Window) -> None:
     assert iter_count(view.map.game_objects) == 2 + 1
     window.test(20)
     assert iter_count(view.map.game_objects) != 2 + 1  # Next map was loaded
+
+
+def test_map_transition_spread_over_frames(window: arcade.Window) -> None:
+    view = GameView()
+    window.show_view(view)
+
+    view.map.start_transition("map2.txt")
+    assert view.map.is_loading
+    assert iter_count(view.map.event_listeners) == 0
+
+    steps = 1
+    while not view.map.step_transition(0):  # One pause at a time
+        steps += 1
+    assert steps > 1
+    assert not view.map.is_loading
+    assert iter_count(view.map.event_listeners) == 2
+
+    # Driven by the view, which fades in once loaded
+    view.map.start_transition("map1.txt")
+    while view.map.is_loading:
+        view.on_update(1 / 60)
+    assert view.fade == 1
+
+
+def test_objects_are_pooled(window: arcade.Window) -> None:
+    view = GameView()
+
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 3
+        height: 2
+        ---
+        S
+        ===
+        ---
+        """)
+    )
+    window.show_view(view)
+    player = view.map.player
+    sword = player.weapon
+
+    # Weapon swaps reuse the weapons
+    view.on_mouse_press(0, 0, arcade.MOUSE_BUTTON_RIGHT, 0)
+    bow = player.weapon
+    view.on_mouse_press(0, 0, arcade.MOUSE_BUTTON_RIGHT, 0)
+    assert player.weapon is sword
+    view.on_mouse_press(0, 0, arcade.MOUSE_BUTTON_RIGHT, 0)
+    assert player.weapon is bow
+
+    # So do respawns, with a fresh state
+    player.health_points = 1
+    player.center_x += 50
+    player.damage(None, DamageSource.VOID, float("inf"))
+    assert view.map.player is player
+    assert player.health_points == player.max_hp
+    assert player.position == view.map.player_spawn_point
+    assert iter_count(view.map.event_listeners) == 2
+
+    # And reloads
+    blocks = set(view.map.physics_colliders_list)
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 3
+        height: 2
+        ---
+          S
+        xxx
+        ---
+        """)
+    )
+    assert set(view.map.physics_colliders_list) == blocks
+    assert view.map.player is player
+    # With the textures of the cache, not loaded again
+    crate = arcade.texture.default_texture_cache.load_or_get_texture(CHAR_INFO["x"])
+    assert all(block.texture is crate for block in blocks)
+
+    # A pooled class must be able to reset its objects
+    with pytest.raises(TypeError):
+
+        class Unresettable(GameObject, pooled=True):
+            pass
+
+
+def test_fixed_timestep(window: arcade.Window, monkeypatch: pytest.MonkeyPatch) -> None:
+    view = GameView()
+
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 3
+        height: 6
+        ---
+        S w
+
+
+
+
+        ===
+        ---
+        """)
+    )
+    window.show_view(view)
+    ticks: list[float] = []
+    update = view.map.update
+
+    def counted_update(delta_time: float, deadline: float | None = None) -> None:
+        ticks.append(delta_time)
+        update(delta_time, deadline)
+
+    monkeypatch.setattr(view.map, "update", counted_update)
+
+    # Two half frames make one tick
+    view.on_update(1 / 120)
+    assert ticks == []
+    assert view.interpolation == 0.5
+    view.on_update(1 / 120)
+    assert ticks == [1 / 60]
+
+    # A spike is only partly caught up
+    view.on_update(1)
+    assert len(ticks) == 1 + GameView.MAX_CATCH_UP_TICKS
+    assert view.interpolation == 1
+
+    # Falling player : drawn between its last two positions, then put back
+    view.tick_rate = 30
+    view.on_update(1 / 30)
+    view.on_update(1 / 60)
+    assert all(tick == 1 / 30 for tick in ticks[-2:])
+    position = view.map.player.position
+    bat = get_first_of_type(Bat, view.map.game_objects)
+    bat_position = bat.position
+    drawn: list[tuple[float, float]] = []
+    draw = arcade.SpriteList.draw
+
+    def spied_draw(self: arcade.SpriteList[Any], **kwargs: Any) -> None:
+        if view.map.player in self:
+            drawn.append(view.map.player.position)
+        draw(self, **kwargs)
+
+    # Without moving the sprites in the spatial hashes
+    moves: list[arcade.BasicSprite] = []
+    monkeypatch.setattr(SpatialHash, "move", lambda _, sprite: moves.append(sprite))
+    monkeypatch.setattr(arcade.SpriteList, "draw", spied_draw)
+    view.on_draw()
+    monkeypatch.undo()
+    assert view.map.player.position == position
+    assert drawn and drawn[0][1] > position[1]
+    assert moves == []
+    assert bat.position == bat_position
+    hashes = [
+        sprite_list.spatial_hash
+        for sprite_list in bat.sprite_lists
+        if sprite_list.spatial_hash is not None
+    ]
+    assert hashes and all(bat in h.get_sprites_near_sprite(bat) for h in hashes)
+
+
+def test_update_rates(window: arcade.Window, monkeypatch: pytest.MonkeyPatch) -> None:
+    view = GameView()
+
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 3
+        height: 3
+        ---
+        w *
+        S £
+        ===
+        ---
+        """)
+    )
+    window.show_view(view)
+    updates: dict[str, list[float]] = {"player": [], "bat": [], "coin": [], "lava": []}
+    for name, object in (
+        ("player", view.map.player),
+        ("bat", get_first_of_type(Bat, view.map.game_objects)),
+        ("coin", get_first_of_type(Coin, view.map.game_objects)),
+        ("lava", get_first_of_type(Lava, view.map.game_objects)),
+    ):
+        monkeypatch.setattr(object, "update", updates[name].append)
+
+    for _ in range(60):
+        view.map.update(1 / 60)
+    assert len(updates["player"]) == 60
+    assert len(updates["bat"]) == 30
+    assert len(updates["coin"]) == 10
+    assert len(updates["lava"]) == 60  # Hazards are never skipped
+    assert updates["bat"][-1] == pytest.approx(1 / 30)
+
+    # Over budget : only the objects updated every tick are
+    view.map.update(1 / 60, deadline=0)
+    view.map.update(1 / 60, deadline=0)
+    assert len(updates["player"]) == 62
+    assert len(updates["bat"]) == 30
+
+    # Then given all the time they waited for
+    view.map.update(1 / 60)
+    assert updates["bat"][-1] == pytest.approx(3 / 60)
+
+
+def test_coin_pickup_while_falling(window: arcade.Window) -> None:
+    view = GameView()
+
+    view.map.activation_radius = None
+    rows = ["S"] + [""] * 15 + ["*", "", "="]
+    view.map.force_load_map("width: 1\nheight: 19\n---\n" + "\n".join(rows) + "\n---\n")
+    window.show_view(view)
+    coin = get_first_of_type(Coin, view.map.game_objects)
+    assert coin.update_rate is not None
+
+    # Through the coin between two of its updates : still picked up
+    for _ in range(120):
+        view.map.update(1 / 60)
+    assert view.score == 1
+    assert coin.is_destroyed
+
+
+def test_listener_registry(window: arcade.Window) -> None:
+    view = GameView()
+    window.show_view(view)
+    player = view.map.player
+    weapon = player.weapon
+
+    # Only the events whose handler is overridden
+    assert view.map.listeners("on_key_press") == [player]
+    assert view.map.listeners("on_mouse_motion") == [weapon]
+    assert view.map.listeners("on_mouse_press") == [weapon, player]
+
+    player.event_listener = False
+    assert view.map.listeners("on_key_press") == []
+    assert view.map.listeners("on_mouse_press") == [weapon]
+    player.event_listener = True
+    assert view.map.listeners("on_key_press") == [player]
+
+    view.map.destroy(weapon)
+    assert view.map.listeners("on_mouse_motion") == []
+    assert iter_count(view.map.event_listeners) == 1
+
+
+def test_deferred_destroy(
+    window: arcade.Window, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    view = GameView()
+    view.map.activation_radius = None  # All the coins are created
+    # Enough coins for their list to be rebuilt, instead of removing them one by one
+    view.map.force_load_map(
+        f"width: 302\nheight: 2\n---\nS {"*" * 300}\n{"=" * 302}\n---\n"
+    )
+    window.show_view(view)
+    coins = [o for o in view.map.game_objects if isinstance(o, Coin)]
+    assert len(coins) == 300
+
+    removals: list[arcade.Sprite] = []
+    remove = arcade.SpriteList.remove
+
+    def counted_remove(self: arcade.SpriteList[Any], sprite: Any) -> None:
+        removals.append(sprite)
+        remove(self, sprite)
+
+    monkeypatch.setattr(arcade.SpriteList, "remove", counted_remove)
+    # A single coin : cheaper to remove than to rebuild its lists
+    coin = coins.pop()
+    coin.destroy()
+    view.map.update(1 / 60)
+    assert removals == [coin, coin]  # All objects and its layer
+    count = iter_count(view.map.game_objects)
+
+    def destroy_coins(delta_time: float) -> None:
+        for coin in coins:
+            coin.destroy()
+        # Still in the lists being updated, but neither updated nor collided with
+        assert iter_count(view.map.game_objects) == count
+        assert all(coin.is_destroyed for coin in coins)
+        collisions = view.map.check_for_collisions_all(coins[0])
+        assert not any(isinstance(o, Coin) for o in collisions)
+
+    monkeypatch.setattr(view.map.player, "update", destroy_coins)
+    view.map.update(1 / 60)
+    assert iter_count(view.map.game_objects) == count - 299
+    assert view.map.player in view.map.game_objects
+    assert not view.map.player.is_destroyed
+    assert removals == [coin, coin]  # Rebuilt without the other ones
+
+    # Destroyed then added back : moved, but not given back to its pool
+    weapon = view.map.player.weapon
+
+    def move_weapon(delta_time: float) -> None:
+        weapon.destroy()
+        view.map.add_objects([weapon])
+
+    monkeypatch.setattr(view.map.player, "update", move_weapon)
+    view.map.update(1 / 60)
+    assert not weapon.is_destroyed
+    assert type(weapon).acquire([view.map]) is not weapon
+
+
+def test_collision_layers(window: arcade.Window) -> None:
+    view = GameView()
+
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 3
+        height: 2
+        ---
+        S
+        ===
+        ---
+        """)
+    )
+    window.show_view(view)
+    player = view.map.player
+    x, y = player.position
+    coin = Coin([view.map], scale=0.5, center_x=x, center_y=y)
+    slime = Slime([view.map], scale=0.5, center_x=x, center_y=y)
+    view.map.add_objects([coin, slime])
+
+    assert view.map.check_for_collisions_all(player, Layer.ENEMIES) == [slime]
+    assert view.map.check_for_collisions_all(player, Layer.INTERACTABLES) == [coin]
+    assert {coin, slime} <= set(view.map.check_for_collisions_all(player))
+    assert view.map.check_for_collisions_all(
+        player, Layer.ALL, lambda other: isinstance(other, Monster)
+    ) == [slime]
+
+    assert view.map.collides_with_any(player, Layer.ENEMIES | Layer.HAZARDS)
+    assert not view.map.collides_with_any(player, Layer.HAZARDS | Layer.PROJECTILES)
+    # The player stands on the ground, a bit lower would be in it
+    player.center_y -= 8
+    assert view.map.collides_with_any(player, Layer.TERRAIN)
+
+    view.map.destroy(slime)
+    assert not view.map.collides_with_any(player, Layer.ENEMIES)
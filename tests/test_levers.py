@@ -1,5 +1,5 @@
 import textwrap
-from typing import Iterator, Type, TypeVar, cast
+from typing import Any, Iterable, Iterator, Type, TypeVar, cast
 
 import arcade
 
@@ -17,6 +17,10 @@ def get_first_of_type(tp: Type[T], objects: Iterator[GameObject]) -> T:
     assert False
 
 
+def iter_count(iter: Iterator[Any] | Iterable[Any]) -> int:
+    return sum(1 for _ in iter)
+
+
 def test_gate_def_open(window: arcade.Window) -> None:
     view = GameView()
 
@@ -153,6 +157,10 @@ def test_switch_actually_works_as_a_switch(window: arcade.Window) -> None:
 
     assert not get_first_of_type(Switch, view.map.game_objects).isOn
     assert not get_first_of_type(Gate, view.map.game_objects).isOpen
+    # Linked once the map is built
+    assert get_first_of_type(Switch, view.map.game_objects).gates == {
+        (2, 1): get_first_of_type(Gate, view.map.game_objects)
+    }
 
     view.on_mouse_press(
         int(window.center_x + 100), int(window.center_y), arcade.MOUSE_BUTTON_LEFT, 0
@@ -179,3 +187,45 @@ def test_switch_actually_works_as_a_switch(window: arcade.Window) -> None:
 
     assert not get_first_of_type(Switch, view.map.game_objects).isOn
     assert not get_first_of_type(Gate, view.map.game_objects).isOpen
+
+
+def test_object_indexes(window: arcade.Window) -> None:
+    view = GameView()
+
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 4
+        height: 2
+        switches:
+          - x: 1
+            y: 1
+        gates:
+          - x: 2
+            y: 1
+        ---
+        S^|
+        ====
+        ---
+        """)
+    )
+    window.show_view(view)
+
+    gate = view.map.object_at_cell((2, 1), Gate)
+    assert gate is not None and not gate.isOpen
+    assert view.map.objects_of_type(Gate) == [gate]
+    assert view.map.object_at_cell((1, 1), Gate) is None
+    assert isinstance(view.map.object_at_cell((1, 1), GameObject), Switch)
+    assert len(view.map.objects_of_type(GameObject)) == iter_count(
+        view.map.game_objects
+    )
+
+    switch = view.map.object_at_cell((1, 1), Switch)
+    assert switch is not None and switch.gates == {}  # No action in the header
+
+    # Still found once moved between the lists of the map
+    gate.update_gate(True)
+    assert view.map.object_at_cell((2, 1), Gate) is gate
+
+    view.map.destroy(gate)
+    assert view.map.objects_of_type(Gate) == []
+    assert view.map.object_at_cell((2, 1), Gate) is None
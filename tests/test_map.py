@@ -1,3 +1,4 @@
+import pathlib
 import textwrap
 from typing import Any, Iterable, Iterator
 
@@ -5,6 +6,11 @@ import arcade
 import pytest
 
 from src.gameview import GameView
+from src.res.array2d import Array2D, PathGroups, SparseTileArray2D, TileArray2D
+from src.res.camera import HeadlessCamera
+from src.res.map import Map
+from src.res.mapcache import MapLoader, compiled_path, load_compiled
+from src.res.watcher import MapWatcher
 
 
 def iter_count(iter: Iterator[Any] | Iterable[Any]) -> int:
@@ -101,7 +107,7 @@ def test_throws_errors(window: arcade.Window) -> None:
         )
 
     # No next-map
-    with pytest.raises(AttributeError):
+    with pytest.raises(ValueError):
         view.map.force_load_map(
             textwrap.dedent("""
                 width: 5
@@ -111,3 +117,353 @@ def test_throws_errors(window: arcade.Window) -> None:
                 ---
                 """)
         )
+
+
+def test_malformed_header(window: arcade.Window) -> None:
+    view = GameView()
+
+    for header in (
+        "height: 1",  # Missing width
+        "width: five\nheight: 1",
+        "width: 5\nheight: 1\ncolor: red",
+        "width: 5\nheight: 1\ngates:\n  - x: 1\n    y: 0\n    state: ajar",
+        "width: 5\nheight: 1\nswitches:\n  - x: 1\n    y: 0\n    switch_on:\n      - action: open-gate",
+        "width: 5\nheight: 1\ngates:\n  - {x: 1, y: 0}\n  - {x: 1, y: 0}",
+        "width: [5",
+    ):
+        with pytest.raises(ValueError, match="Invalid map header"):
+            view.map.force_load_map(f"{header}\n---\nS====\n---\n")
+
+    info = Map.Metadata.from_header(
+        {
+            "width": 5,
+            "height": 1,
+            "gates": [{"x": 1, "y": 0, "state": "open"}],
+            "switches": [{"x": 2, "y": 0, "state": True}],
+        }
+    )
+    assert info.next_map is None
+    assert info.gates[(1, 0)].state == Map.Metadata.GatePosition.State.open
+    assert info.switches[(2, 0)].state == Map.Metadata.SwitchPosition.State.on
+    assert info.switches[(2, 0)].switch_on == []
+
+
+def test_broken_links() -> None:
+    map = textwrap.dedent("""
+        width: 5
+        height: 2
+        switches:
+          - x: 1
+            y: 1
+            switch_on:
+              - action: open-gate
+                x: 3
+                y: 1
+              - action: disable
+            switch_off:
+              - action: close-gate
+                x: 4
+                y: 1
+          - x: 0
+            y: 0
+        gates:
+          - x: 2
+            y: 0
+        ---
+        S^^|
+        =====
+        ---
+        """)
+
+    # All at once, before any gameobject is created
+    with pytest.raises(ValueError, match="Invalid map links") as error:
+        Map.parse(map)
+    message = str(error.value)
+    assert "no switch on the grid at x:'0', y:'0'" in message
+    assert "no gate on the grid at x:'2', y:'0'" in message
+    assert "switch at x:'2', y:'1' is not in the header" in message
+    assert "targets x:'4', y:'1', which is not a gate" in message
+    assert "x:'3'" not in message
+
+
+def test_compiled_map_cache(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "map.txt"
+    path.write_text(
+        textwrap.dedent("""
+        width: 5
+        height: 3
+        gates:
+          - x: 2
+            y: 2
+            state: open
+        switches:
+          - x: 1
+            y: 2
+            state: on
+            switch_on:
+              - action: open-gate
+                x: 2
+                y: 2
+            switch_off:
+              - action: close-gate
+                x: 2
+                y: 2
+              - action: disable
+        next_map: map1.txt
+        ---
+        S^|£
+        ===→
+        o*xE
+        ---
+        """),
+        encoding="utf-8",
+    )
+
+    parsed = load_compiled(path)
+    assert compiled_path(path).exists()
+
+    # Up to date : loaded without any text parsing nor validation
+    def no_parsing(*args: object) -> Map.Data:
+        assert False
+
+    monkeypatch.setattr(Map, "parse", no_parsing)
+    monkeypatch.setattr(Map.Metadata, "from_header", no_parsing)
+    cached = load_compiled(path)
+
+    assert cached.array.data == parsed.array.data
+    assert cached.groups.labels == parsed.groups.labels
+    assert [t.offsets for t in cached.groups.trajectories] == [
+        t.offsets for t in parsed.groups.trajectories
+    ]
+    assert cached.header == parsed.header
+    assert cached.info.next_map == "map1.txt"
+    assert cached.info.gates[(2, 2)].state == "open"
+    switch = cached.info.switches[(1, 2)]
+    assert switch.state == "on"
+    assert [(a.action, a.x, a.y) for a in switch.switch_on] == [("open-gate", 2, 2)]
+    assert [(a.action, a.x, a.y) for a in switch.switch_off] == [
+        ("close-gate", 2, 2),
+        ("disable", None, None),
+    ]
+
+    # Outdated : the map is parsed again
+    monkeypatch.undo()
+    path.write_text(path.read_text(encoding="utf-8").replace("o*", "*o"), "utf-8")
+    assert load_compiled(path).array.at((1, 0)) == "o"
+
+
+def test_chunk_streaming(window: arcade.Window) -> None:
+    view = GameView()
+    view.map.chunk_size = 4
+
+    view.map.force_load_map(
+        textwrap.dedent(f"""
+        width: 64
+        height: 2
+        next_map: map1.txt
+        ---
+        S{" " * 39}o
+        ================================================================
+        ---
+        """)
+    )
+    window.show_view(view)
+
+    def slimes() -> int:
+        return sum(type(o).__name__ == "Slime" for o in view.map.game_objects)
+
+    # Chunks 0 and 1 (one chunk of margin around the player)
+    assert len(view.map.physics_colliders_list) == 8
+    assert slimes() == 0  # No terrain under it
+
+    view.map.stream(arcade.types.XYWH(40 * 64, 64, 0, 0))
+    xs = {int(block.center_x) // 64 for block in view.map.physics_colliders_list}
+    assert xs == set(range(36, 48))
+    assert slimes() == 1
+
+    # Asleep before its terrain is unloaded
+    view.map.stream(arcade.types.XYWH(40 * 64 + 200, 64, 0, 0))
+    assert slimes() == 0
+    assert 40 in {int(b.center_x) // 64 for b in view.map.physics_colliders_list}
+
+
+def test_map_loader_lru(tmp_path: pathlib.Path) -> None:
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"map{i}.txt"
+        path.write_text(
+            textwrap.dedent(f"""
+            width: 3
+            height: 1
+            ---
+            S{"=" * i}
+            ---
+            """),
+            encoding="utf-8",
+        )
+        paths.append(path)
+
+    loader = MapLoader(capacity=2)
+
+    first = loader.load(paths[0])
+    assert loader.load(paths[0]) is first  # From memory
+
+    loader.prefetch(paths[1])
+    prefetched = loader.load(paths[1])
+    assert prefetched.array.at((1, 0)) == "="
+    assert loader.load(paths[1]) is prefetched
+
+    loader.load(paths[0])  # paths[1] is now the least recently used
+    loader.load(paths[2])
+    assert loader.cached == [paths[0], paths[2]]
+
+
+def test_sparse_map() -> None:
+    lines = [" " * 5000 + "S", "=" * 10 + " " * 9980 + "x→", ""] + [""] * 197
+    lines.reverse()
+    dense = TileArray2D.from_lines(lines, 10000, 200, sparse=False)
+    sparse = TileArray2D.from_lines(lines, 10000, 200)
+    assert isinstance(sparse, SparseTileArray2D)
+
+    assert list(sparse.tiles()) == list(dense.tiles())
+    assert list(sparse.items()) == list(dense.tiles())  # Empty runs skipped
+    assert list(sparse.rows()) == list(dense.rows())
+    for pos in [(0, 198), (9, 198), (10, 198), (9990, 198), (9991, 198), (5000, 199), (0, 0)]:
+        assert sparse.at(pos) == dense.at(pos)
+    assert sparse.at((10000, 0)) is None
+    with pytest.raises(TypeError):
+        TileArray2D(lines)  # type: ignore[abstract]
+    assert sparse.at_position_with_direction((9990, 198), Array2D.Direction.E) == "→"
+
+    groups = PathGroups.from_map(sparse)
+    assert groups.labels == PathGroups.from_map(dense).labels
+    assert len(groups.trajectory((9990, 198))) == 2
+
+
+def test_hot_reload(window: arcade.Window) -> None:
+    view = GameView()
+    map = textwrap.dedent("""
+        width: 7
+        height: 3
+        next_map: map1.txt
+        ---
+        S    *
+        xx  ==
+        ---
+        """)
+    view.map.force_load_map(map)
+    window.show_view(view)
+    window.test(5)
+
+    player = view.map.player
+    position = player.position
+    blocks = {
+        (round(block.center_x), round(block.center_y)): block
+        for block in view.map.physics_colliders_list
+    }
+
+    # A coin is added, the grass starts moving
+    view.map.apply_changes(
+        Map.parse(map.replace("S    *", "S  * *").replace("xx  ==", "xx  ==→"))
+    )
+    assert view.map.player is player and player.position == position
+    view.map.stream(view.camera.aabb())  # Activates the new coin
+    assert sum(type(o).__name__ == "Coin" for o in view.map.game_objects) == 2
+    new_blocks = {
+        (round(block.center_x), round(block.center_y)): block
+        for block in view.map.physics_colliders_list
+    }
+    assert new_blocks.keys() == blocks.keys()
+    assert new_blocks[(0, 0)] is blocks[(0, 0)]  # Untouched crate
+    assert not new_blocks[(256, 0)].is_static
+
+
+def test_map_watcher(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "map.txt"
+    path.write_text("a", encoding="utf-8")
+    watcher = MapWatcher(tmp_path, interval=1)
+    assert watcher.changes() == []
+
+    path.write_text("ab", encoding="utf-8")
+    assert watcher.poll(0.5) == []  # Not polled yet
+    assert watcher.poll(0.5) == [path.resolve()]
+    assert watcher.changes() == []
+
+
+def test_lazy_activation(window: arcade.Window) -> None:
+    view = GameView()
+    view.map.activation_radius = 256
+
+    view.map.force_load_map(
+        textwrap.dedent(f"""
+        width: 100
+        height: 2
+        next_map: map1.txt
+        ---
+        S *{" " * 46}o{" " * 49}
+        {"=" * 100}
+        ---
+        """)
+    )
+
+    def count(name: str) -> int:
+        return sum(type(o).__name__ == name for o in view.map.game_objects)
+
+    # Only what is around the player exists
+    assert count("Coin") == 1
+    assert count("Slime") == 0
+
+    view.map.stream(arcade.types.XYWH(50 * 64, 64, 800, 600))
+    assert count("Slime") == 1
+    assert count("Coin") == 0  # Asleep
+    slime = next(o for o in view.map.game_objects if type(o).__name__ == "Slime")
+
+    view.map.stream(arcade.types.XYWH(0, 64, 800, 600))
+    assert count("Coin") == 1
+    assert count("Slime") == 0
+
+    view.map.stream(arcade.types.XYWH(50 * 64, 64, 800, 600))
+    assert next(o for o in view.map.game_objects if type(o).__name__ == "Slime") is slime
+
+
+def test_activation_order(window: arcade.Window) -> None:
+    view = GameView()
+    view.map.activation_radius = 256
+
+    view.map.force_load_map(
+        textwrap.dedent(f"""
+        width: 100
+        height: 2
+        ---
+        S{"*" * 20}{" " * 79}
+        {"=" * 100}
+        ---
+        """)
+    )
+
+    def coins() -> list[tuple[float, float]]:
+        return [o.position for o in view.map.game_objects if type(o).__name__ == "Coin"]
+
+    # Put to sleep and woken up in the order they were created, whatever
+    # their hashes : the same in every process, for the replays
+    view.map.stream(arcade.types.XYWH(0, 64, 2800, 600))
+    created = coins()
+    assert len(created) == 20
+    view.map.stream(arcade.types.XYWH(90 * 64, 64, 0, 0))
+    assert coins() == []
+    view.map.stream(arcade.types.XYWH(0, 64, 2800, 600))
+    assert coins() == created
+
+
+def test_view_around_camera(window: arcade.Window) -> None:
+    view = GameView()
+    window.show_view(view)
+
+    # What is streamed is all around the camera, not only up and right of it
+    for camera in (view.camera, HeadlessCamera(*window.size)):
+        camera.position = arcade.Vec2(1000, 500)
+        area = camera.aabb()
+        assert area.center == (1000, 500)
+        assert area.size == window.size
@@ -105,4 +105,234 @@ def test_throws_errors() -> None:
                 ↓
                 ---
                 """)
-        )
\ No newline at end of file
+        )
+
+# only the moving group is given to the physics engine as platforms
+def test_static_blocks_are_walls(window: arcade.Window) -> None:
+    view = GameView()
+
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 4
+        height: 3
+        next_map: map1.txt
+        ---
+        ↑  S
+        =  x
+        ↓===
+        ---
+        """)
+    )
+    window.show_view(view)
+
+    assert sum(len(walls) for walls in view.map.physics_engine.walls) == 4
+    assert sum(len(platforms) for platforms in view.map.physics_engine.platforms) == 1
+    assert len(view.map.physics_colliders_list) == 5
+
+
+# big groups are loaded without hitting the recursion limit, and share one path
+def test_wide_moving_group(window: arcade.Window) -> None:
+    view = GameView()
+    width = 3000
+
+    view.map.force_load_map(
+        textwrap.dedent(f"""
+        width: {width + 2}
+        height: 2
+        next_map: map1.txt
+        ---
+        S
+        {"=" * width}→→
+        ---
+        """)
+    )
+    window.show_view(view)
+
+    assert sum(len(platforms) for platforms in view.map.physics_engine.platforms) == width
+    lengths = {len(block.path.positions) for block in view.map.physics_colliders_list}  # type: ignore[attr-defined]
+    assert lengths == {3}
+
+# every group is moved as a whole, by one platform group shared by its blocks
+def test_platform_groups(window: arcade.Window) -> None:
+    from src.entities.wall import MovingPlatform
+
+    view = GameView()
+
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 6
+        height: 3
+        next_map: map1.txt
+        ---
+        ==↑  S
+        ==  ←x
+        ↓ ===
+        ---
+        """)
+    )
+    window.show_view(view)
+    blocks = [block for block in view.map.game_objects if isinstance(block, MovingPlatform)]
+    start = {block: block.position for block in blocks}
+
+    groups = {block.group for block in blocks if not block.is_static}
+    assert len(groups) == 2
+    assert all(block.group is None for block in blocks if block.is_static)
+    assert sum(len(group.members) for group in groups if group is not None) == 4 + 1
+
+    window.test(20)
+    for group in groups:
+        assert group is not None
+        moves = {
+            (block.center_x - start[block][0], block.center_y - start[block][1])
+            for block in group.members
+        }
+        assert len(moves) == 1 and moves != {(0, 0)}
+
+    # destroyed blocks leave their group
+    block = groups.pop().members[0]  # type: ignore[union-attr]
+    group = block.group
+    block.destroy()
+    assert block.group is None and group is not None and block not in group.members
+
+# groups joined only through a lower row are labelled as one, each with its own trajectory
+def test_group_labels() -> None:
+    from src.res.map import Map
+
+    data = Map.parse(
+        textwrap.dedent("""
+        width: 8
+        height: 4
+        next_map: map1.txt
+        ---
+        x  x  =
+        x  x  =→
+        xxxx
+              #
+        ---
+        """)
+    )
+    labels = data.groups.labels
+    # the map is stored bottom-up
+    assert labels[(0, 3)] == labels[(3, 3)] == labels[(1, 1)]
+    assert labels[(6, 3)] == labels[(6, 2)] != labels[(0, 3)]
+    assert labels[(6, 0)] not in (labels[(0, 3)], labels[(6, 3)])
+    assert len(data.groups.trajectories) == 3
+    assert len(data.groups.trajectory((0, 3))) == 1
+    assert len(data.groups.trajectory((6, 3))) == 2
+
+# the position of a group at any time matches the step by step path
+def test_trajectory_offset_at() -> None:
+    from src.res.array2d import Path, Trajectory
+
+    for start in range(4):
+        trajectory = Trajectory([(0, y - start) for y in range(4)], start)
+        path = Path(trajectory, (0, 0))
+        assert trajectory.period == 6
+        for step in range(1, 20):
+            assert trajectory.offsets[trajectory.index_at(step)] == path.go_next()
+
+        assert trajectory.offset_at(0) == (0, 0)
+        assert trajectory.offset_at(trajectory.period * 1000) == (0, 0)
+
+    trajectory = Trajectory([(0, 0), (1, 0), (2, 0)], 0)
+    assert trajectory.offset_at(2.5) == (1.5, 0)  # on its way back
+    assert Trajectory([(0, 0)], 0).offset_at(12.3) == (0, 0)
+
+
+# a group can jump to any time, its blocks joining it on the next tick
+def test_platform_group_seek(window: arcade.Window) -> None:
+    from src.entities.wall import MovingPlatform
+
+    view = GameView()
+
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 4
+        height: 2
+        next_map: map1.txt
+        ---
+        S
+        =→→
+        ---
+        """)
+    )
+    window.show_view(view)
+    block = next(b for b in view.map.game_objects if isinstance(b, MovingPlatform))
+    assert block.group is not None
+    x = block.center_x
+
+    block.group.seek(3 - 1 / 60)
+    view.map.update(1 / 60)
+    assert block.center_x == pytest.approx(x + 64)  # back from the end
+
+
+def test_terrain_grid(window: arcade.Window) -> None:
+    from src.entities.gates_lever import Gate
+    from src.entities.wall import MovingPlatform
+
+    view = GameView()
+
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 4
+        height: 3
+        gates:
+          - x: 3
+            y: 1
+        ---
+        ↑  S
+        =  |
+        ↓===
+        ---
+        """)
+    )
+    window.show_view(view)
+
+    wall = view.map.object_at_cell((1, 0), MovingPlatform)
+    assert wall is not None
+    assert view.map.terrain_at((64, 0)) == [wall]
+    assert view.map.terrain_at((64, 128)) == []
+    walls = view.map.terrain_in(arcade.types.LRBT(60, 130, -10, 10))
+    assert len(walls) == 2 and wall in walls
+
+    # Closed gates are terrain, open ones are not
+    gate = view.map.object_at_cell((3, 1), Gate)
+    assert gate is not None
+    assert view.map.terrain_at((192, 64)) == [gate]
+    gate.update_gate(True)
+    assert view.map.terrain_at((192, 64)) == []
+    gate.update_gate(False)
+    assert view.map.terrain_at((192, 64)) == [gate]
+
+    # Moving platforms are found where they went
+    window.test(30)
+    platform = view.map.object_at_cell((0, 1), MovingPlatform)
+    assert platform is not None and platform.center_y != 64
+    assert view.map.terrain_at(platform.position) == [platform]
+
+
+def test_passthrough_blocks_follow_group(window: arcade.Window) -> None:
+    from src.entities.wall import Lava, MovingPlatform
+
+    view = GameView()
+    view.tick_rate = 30
+
+    view.map.force_load_map(
+        textwrap.dedent("""
+        width: 4
+        height: 3
+        ---
+        S
+        =£→→
+        ---
+        """)
+    )
+    window.show_view(view)
+    block = view.map.object_at_cell((0, 0), MovingPlatform)
+    lava = view.map.object_at_cell((1, 0), Lava)
+    assert block is not None and lava is not None
+
+    # Lava rides on its block at every tick, whatever the tick rate
+    for _ in range(20):
+        view.map.update(1 / view.tick_rate)
+        assert lava.center_x - block.center_x == pytest.approx(64)
@@ -0,0 +1,206 @@
+import os
+import pathlib
+import subprocess
+import sys
+import textwrap
+
+import arcade
+
+from src.gameview import GameView
+from src.res.map import Map
+from src.res.replay import CAMERA_EVENT, Recording
+from src.simulation import Simulation
+
+SCRIPT = textwrap.dedent('''
+    import textwrap
+
+    from src.simulation import Simulation  # Before arcade
+
+    import arcade
+
+    # Sounds are only loaded when played
+    loaded = []
+    Sound = arcade.Sound
+    arcade.Sound = lambda path: loaded.append(path) or Sound(path)
+
+    simulation = Simulation()
+    simulation.load(textwrap.dedent("""
+        width: 6
+        height: 2
+        ---
+        S ** o
+        ======
+        ---
+        """))
+    simulation.on_key_press(arcade.key.RIGHT, 0)
+    simulation.run(1)
+    print(simulation.ticks, simulation.score, *loaded)
+''')
+
+
+def test_simulation_without_display() -> None:
+    # A fresh interpreter, without display nor arcade's headless (EGL) mode
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("DISPLAY", "WAYLAND_DISPLAY", "ARCADE_HEADLESS")
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+
+    assert result.returncode == 0, result.stderr
+    ticks, score, *loaded = result.stdout.split()
+    assert ticks == "60"
+    assert score == "2"
+    # Once for both coins, and for the slime hurting the player
+    assert loaded == [":resources:sounds/coin1.wav", ":resources:/sounds/hurt3.wav"]
+
+
+def test_recording_replay(window: arcade.Window, tmp_path: pathlib.Path) -> None:
+    view = GameView(Recording("map1.txt", 60, 1234, GameView.ACTIVATION_RADIUS))
+    window.show_view(view)
+
+    view.on_key_press(arcade.key.RIGHT, 0)
+    window.test(30)
+    view.on_key_press(arcade.key.UP, 0)
+    window.test(5)
+    view.on_key_release(arcade.key.UP, 0)
+    view.on_key_release(arcade.key.RIGHT, 0)
+    view.on_mouse_press(10, 20, arcade.MOUSE_BUTTON_LEFT, 0)
+
+    assert view.recording is not None
+    path = tmp_path / "session.rec"
+    view.recording.save(path)
+    recording = Recording.load(path)
+    assert (recording.map, recording.tick_rate, recording.seed) == ("map1.txt", 60, 1234)
+    assert recording.activation_radius == GameView.ACTIVATION_RADIUS
+    assert recording.events == view.recording.events
+    ticks = [tick for tick, event, _ in recording.events if event != CAMERA_EVENT]
+    assert ticks[0] == 0 and ticks[2] - ticks[1] == 5 and ticks[2] == ticks[3] == ticks[4]
+
+    # Same seed and same input : the same game, bats included
+    events = [event for event in recording.events if event[1] != CAMERA_EVENT]
+    recording = Recording("map2.txt", 60, 99)
+    recording.events = events
+    states = []
+    for _ in range(2):
+        simulation = Simulation(recording.map, recording.tick_rate, seed=recording.seed)
+        durations = recording.replay(simulation, simulation.step, ticks=120)
+        assert len(durations) == simulation.ticks == 120
+        states.append(
+            [(type(o).__name__, o.position) for o in simulation.map.game_objects]
+        )
+    assert states[0] == states[1]
+    assert any(name == "Bat" for name, _ in states[0])
+
+
+def test_live_session_replay(window: arcade.Window) -> None:
+    # Bats only active around the lagging camera, aiming through it
+    view = GameView(Recording("map2.txt", 60, 7, GameView.ACTIVATION_RADIUS))
+    window.show_view(view)
+    view.on_key_press(arcade.key.RIGHT, 0)
+    window.test(40)
+    view.on_mouse_press(0, 0, arcade.MOUSE_BUTTON_RIGHT, 0)  # The bow
+    view.on_mouse_motion(700, 500, 0, 0)
+    view.on_mouse_press(700, 500, arcade.MOUSE_BUTTON_LEFT, 0)
+    window.test(20)
+
+    recording = view.recording
+    assert recording is not None
+    simulation = Simulation(
+        recording.map, recording.tick_rate, recording.activation_radius, recording.seed
+    )
+    recording.replay(simulation, simulation.step, view.ticks)
+    for tick, event, args in recording.events:
+        if tick == view.ticks:  # After the last tick
+            getattr(simulation, event)(*args)
+
+    def state(map: Map) -> list[tuple[str, tuple[float, float]]]:
+        return sorted((type(o).__name__, o.position) for o in map.game_objects)
+
+    assert state(simulation.map) == state(view.map)
+    assert any(name == "Arrow" for name, _ in state(view.map))
+    assert simulation.map.random.getstate() == view.map.random.getstate()
+
+
+def test_playtests(tmp_path: pathlib.Path) -> None:
+    from src.playtest import random_input, run_playtests
+
+    (tmp_path / "straight.txt").write_text(textwrap.dedent("""
+        width: 6
+        height: 2
+        next_map: map1.txt
+        ---
+        S *  E
+        ======
+        ---
+        """))
+    (tmp_path / "broken.txt").write_text("width: 6\n---\nS\n---\n")
+    script = Recording("", 60, 0)
+    script.add(0, "on_key_press", arcade.key.RIGHT, 0)
+    script.save(tmp_path / "right.rec")
+
+    report = run_playtests(
+        [str(tmp_path / "straight.txt"), str(tmp_path / "broken.txt")],
+        [0, 1],
+        120,
+        tmp_path / "right.rec",
+        workers=2,
+    )
+    straight = report["maps"][str(tmp_path / "straight.txt")]
+    assert straight == {
+        "runs": 2,
+        "exits": 2,
+        "coins": 1,
+        "coins_total": 1,
+        "deaths": 0,
+        "errors": [],
+    }
+    runs = [run for run in report["runs"] if run["map"].endswith("straight.txt")]
+    assert all(0 < run["ticks"] < 120 for run in runs)
+    broken = report["maps"][str(tmp_path / "broken.txt")]
+    assert broken["exits"] == 0 and len(broken["errors"]) == 2
+
+    # Random input is reproducible from its seed, and can be replayed on its map
+    recording = random_input("map1.txt", 3, 600, 60)
+    assert recording.events == random_input("map1.txt", 3, 600, 60).events
+    assert recording.events != random_input("map1.txt", 4, 600, 60).events
+    recording.save(tmp_path / "random.rec")
+    assert Recording.load(tmp_path / "random.rec").map == "map1.txt"
+
+
+def test_tick_rate_keeps_speed(window: arcade.Window) -> None:
+    moves = []
+    for tick_rate in (60, 30):
+        simulation = Simulation(tick_rate=tick_rate)
+        simulation.load(
+            textwrap.dedent(f"""
+            width: 40
+            height: 2
+            ---
+            S
+            {"=" * 40}
+            ---
+            """)
+        )
+        start = simulation.map.player.position
+        simulation.on_key_press(arcade.key.RIGHT, 0)
+        simulation.run(1)
+        simulation.on_key_press(arcade.key.UP, 0)
+        peak = start[1]
+        for _ in range(tick_rate // 2):
+            simulation.step()
+            peak = max(peak, simulation.map.player.center_y)
+        moves.append((simulation.map.player.center_x - start[0], peak - start[1]))
+
+    # Same speeds and jumps, in fewer steps
+    (run, jump), (slow_run, slow_jump) = moves
+    assert run > 0 and jump > 0
+    assert abs(slow_run - run) < 0.05 * run
+    assert abs(slow_jump - jump) < 0.15 * jump